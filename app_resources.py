@@ -0,0 +1,146 @@
+# app_resources.py
+"""모든 페이지가 공유하는 프로세스 전역 리소스 (st.cache_resource)
+
+스크립트가 다시 실행되어도 세션/클라이언트를 새로 만들지 않으므로
+TCP+TLS 핸드셰이크 없이 keep-alive 커넥션을 재사용한다.
+풀 크기와 타임아웃은 secrets.toml 의 [http] 섹션으로 조정할 수 있다.
+"""
+import streamlit as st
+
+from completion_cache import CompletionCache, MemoryLRUCache, SQLiteCache
+from conversation_store import ConversationStore
+from doc_retrieval import DocumentIndex
+from document_cache import DocumentCache
+from image_prep import ImagePrepSettings
+from parse_results import SessionResults
+from request_scheduler import RequestScheduler, SchedulerSettings
+from search_index import FullTextIndex
+from solar_chat import embed_texts
+from telemetry import start_metrics_server
+from upload_stream import UploadSource
+from upstage_http import BASE_URL, HttpSettings, create_openai_client, create_session
+
+
+def get_http_settings():
+    return HttpSettings.from_mapping(st.secrets.get("http"))
+
+
+def get_image_prep_settings():
+    """업로드 전 이미지 축소 기본값 (secrets [image_prep]: target_dpi, jpeg_quality, min_bytes, min_savings, upload_mbps)"""
+    return ImagePrepSettings.from_mapping(st.secrets.get("image_prep"))
+
+
+@st.cache_resource
+def get_http_session():
+    """document-digitization 호출용 공유 requests 세션"""
+    return create_session(get_http_settings())
+
+
+@st.cache_resource
+def get_openai_client():
+    """채팅용 공유 Solar(OpenAI 호환) 클라이언트"""
+    # 재시도는 get_request_scheduler()가 담당하므로 클라이언트 자체 재시도는 끔
+    return create_openai_client(st.secrets["upstage_api_key"], get_http_settings(), BASE_URL, max_retries=0)
+
+
+@st.cache_resource
+def get_completion_cache():
+    """채팅 응답 캐시 (secrets에 completion_cache_db가 있으면 SQLite 디스크 캐시 병행)"""
+    disk_path = st.secrets.get("completion_cache_db")
+    return CompletionCache(
+        memory=MemoryLRUCache(maxsize=512, ttl=3600),
+        disk=SQLiteCache(disk_path) if disk_path else None
+    )
+
+
+@st.cache_resource
+def get_document_cache():
+    """문서 파싱/OCR 결과 디스크 캐시 (secrets [document_cache]: path, max_mb, compress_level)"""
+    config = dict(st.secrets.get("document_cache") or {})
+    return DocumentCache(
+        config.get("path", "document_cache.db"),
+        max_bytes=int(config.get("max_mb", 512) * 1024 * 1024),
+        compress_level=config.get("compress_level", 6)
+    )
+
+
+@st.cache_resource
+def get_search_index():
+    """파싱/OCR 결과 전문 검색 인덱스 (secrets [search_index]: path, 모든 세션이 공유)"""
+    config = dict(st.secrets.get("search_index") or {})
+    return FullTextIndex(config.get("path", "search_index.db"))
+
+
+@st.cache_resource
+def get_request_scheduler():
+    """모든 페이지의 Upstage 호출이 공유하는 속도 제한/재시도 스케줄러 (secrets [scheduler])"""
+    return RequestScheduler(SchedulerSettings.from_mapping(st.secrets.get("scheduler")))
+
+
+@st.cache_resource
+def get_conversation_store():
+    """SQLite 대화 저장소 (secrets [conversations]: path, window_size, idle_ttl, max_resident_mb)"""
+    config = dict(st.secrets.get("conversations") or {})
+    return ConversationStore(
+        config.get("path", "conversations.db"),
+        window_size=config.get("window_size", 40),
+        idle_ttl=config.get("idle_ttl", 1800),
+        max_resident_bytes=int(config.get("max_resident_mb", 64) * 1024 * 1024)
+    )
+
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """secrets [telemetry] metrics_port 가 있으면 Prometheus /metrics 서버를 프로세스당 한 번 시작"""
+    port = (st.secrets.get("telemetry") or {}).get("metrics_port")
+    return start_metrics_server(int(port)) if port else None
+
+
+def profiler_enabled():
+    """구간별 실행 시간 패널 표시 여부 (secrets [profiler] enabled = true 이거나 URL 에 ?profile=1)"""
+    return bool((st.secrets.get("profiler") or {}).get("enabled")) or st.query_params.get("profile") == "1"
+
+
+def get_document_index():
+    """파싱한 문서의 검색 인덱스 (브라우저 세션 단위, 페이지 간 공유)
+
+    secrets [retrieval] embeddings = true 이면 BM25에 임베딩 검색을 결합한다.
+    """
+    if "document_index" not in st.session_state:
+        embed_fn = None
+        if (st.secrets.get("retrieval") or {}).get("embeddings"):
+            client, scheduler = get_openai_client(), get_request_scheduler()
+
+            def embed_fn(texts, kind):
+                return embed_texts(client, texts, kind, scheduler)
+        st.session_state.document_index = DocumentIndex(embed_fn=embed_fn)
+    return st.session_state.document_index
+
+
+def get_upload_digest(uploaded):
+    """업로드 파일 내용의 SHA-256 (브라우저 세션 단위로 업로드(file_id)마다 한 번만 계산)"""
+    digests = st.session_state.setdefault("upload_digests", {})
+    digest = digests.get(uploaded.file_id)
+    if digest is None:
+        digest = digests[uploaded.file_id] = UploadSource.from_file(uploaded, uploaded.name).sha256
+        uploaded.seek(0)
+        while len(digests) > 1000:  # 오래된 업로드부터 버림
+            digests.pop(next(iter(digests)))
+    return digest
+
+
+def get_parse_results():
+    """문서 파싱 결과 보관소 (브라우저 세션 단위, 최근 결과 최대 8개)
+
+    다운로드 버튼이나 편집으로 스크립트가 다시 실행되어도 결과가 유지된다.
+    """
+    if "parse_results" not in st.session_state:
+        st.session_state.parse_results = SessionResults(maxsize=8)
+    return st.session_state.parse_results
+
+
+def get_ocr_results():
+    """OCR 결과 보관소 (브라우저 세션 단위) - 텍스트 위주라 일괄 OCR 을 고려해 최근 300개까지 보관"""
+    if "ocr_results" not in st.session_state:
+        st.session_state.ocr_results = SessionResults(maxsize=300)
+    return st.session_state.ocr_results
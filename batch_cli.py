@@ -0,0 +1,265 @@
+# batch_cli.py
+"""문서 파싱/OCR 일괄 처리 CLI (Streamlit 비의존)
+
+페이지 01/02 와 같은 요청 파라미터(build_parse_params / OCR_PARAMS), 결과 캐시, 요청 스케줄러,
+후처리(ParsedDocument: 마크다운/표 CSV/텍스트/Word)로 디렉터리나 glob 에 해당하는 파일을
+동시에 처리하고 출력 디렉터리에 쓴다.
+- results.jsonl: 파일마다 한 줄 (상태, 소요 시간, 페이지/요소/표 수, 만든 파일, API 응답)
+- parse: <파일>.md, 표마다 <파일>.table_N.csv / ocr: <파일>.txt (--docx 면 <파일>.docx 도)
+  (<파일>은 확장자를 포함한 입력 기준 상대 경로라 a.pdf 와 a.png 가 겹치지 않음)
+- 다시 실행하면 results.jsonl 에 성공으로 기록된 파일(경로/크기/수정 시각/파라미터가 같은 것)은 건너뜀
+- --index 를 주면 결과를 전문 검색 인덱스에도 추가 (앱의 문서 검색 페이지와 같은 파일이면 바로 검색됨)
+- --downscale 이면 PNG/JPG 를 목표 해상도로 줄이고 다시 압축해 보냄 (image_prep, 파일마다 작업 스레드에서)
+
+예) python batch_cli.py parse "scans/**/*.pdf" --output out/nightly --workers 8
+    python batch_cli.py ocr scans/ --output out/ocr --docx --cache document_cache.db
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from document_api import (
+    BASE64_ENCODING_OPTIONS,
+    OCR_PARAMS,
+    build_parse_params,
+    iter_file_results,
+    record_document_usage,
+)
+from document_cache import DocumentCache, normalize_params
+from image_prep import ImagePrepSettings, prepare_image
+from parse_results import ParsedDocument, text_to_docx_bytes
+from request_scheduler import RequestScheduler, SchedulerSettings
+from search_index import FullTextIndex
+from upload_stream import UploadSource
+from upstage_http import BASE_URL, HttpSettings, create_session
+
+# 디렉터리를 넘겼을 때 처리할 확장자 (페이지의 업로드 허용 형식과 같음)
+EXTENSIONS = {
+    "parse": {"pdf", "png", "jpg", "jpeg", "hwp", "docx", "pptx", "xlsx"},
+    "ocr": {"pdf", "png", "jpg", "jpeg", "hwp", "docx"},
+}
+# --base64 값 -> 페이지의 "Base64 인코딩 옵션"
+BASE64_CHOICES = dict(zip(["none", "table", "text", "text-table", "all"], BASE64_ENCODING_OPTIONS))
+RESULTS_FILE = "results.jsonl"
+
+
+def _glob_root(pattern):
+    """glob 패턴에서 와일드카드가 나오기 전까지의 디렉터리 (출력 경로의 기준)"""
+    parts = []
+    for part in pattern.replace("\\", "/").split("/")[:-1]:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return "/".join(parts) or "."
+
+
+def collect_files(inputs, extensions):
+    """입력(디렉터리/glob/파일)을 [(절대 경로, 출력 기준 상대 경로), ...] 로 펼침"""
+    found = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, _, names in os.walk(item):
+                for name in names:
+                    if name.rsplit(".", 1)[-1].lower() in extensions:
+                        path = os.path.join(dirpath, name)
+                        found.setdefault(os.path.abspath(path), os.path.relpath(path, item))
+        elif glob.has_magic(item):
+            root = _glob_root(item)
+            for path in glob.glob(item, recursive=True):
+                if os.path.isfile(path):
+                    found.setdefault(os.path.abspath(path), os.path.relpath(path, root))
+        elif os.path.isfile(item):
+            found.setdefault(os.path.abspath(item), os.path.basename(item))
+        else:
+            print(f"입력을 찾을 수 없음: {item}", file=sys.stderr)
+    return sorted(found.items(), key=lambda item: item[1])
+
+
+def load_completed(results_path, params):
+    """이전 실행에서 성공한 파일 {상대 경로: (크기, 수정 시각)} (마지막 기록 기준, 중단으로 잘린 줄은 무시)"""
+    completed = {}
+    if not os.path.exists(results_path):
+        return completed
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok" and record.get("params") == params:
+                completed[record["path"]] = (record.get("size"), record.get("mtime_ns"))
+            else:
+                completed.pop(record.get("path"), None)
+    return completed
+
+
+def write_outputs(parsed, output_dir, base, mode, docx=False):
+    """모드별 산출물을 쓰고 출력 디렉터리 기준 경로 목록을 반환"""
+    written = []
+
+    def write(name, content):
+        path = os.path.join(output_dir, name)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content if isinstance(content, bytes) else content.encode("utf-8"))
+        written.append(name)
+
+    if mode == "ocr":
+        text = parsed.plain_text()
+        write(f"{base}.txt", text)
+        if docx:
+            write(f"{base}.docx", text_to_docx_bytes(text))
+    else:
+        write(f"{base}.md", parsed.markdown())
+        for i in range(len(parsed.tables())):
+            if not parsed.dataframe(i).empty:
+                write(f"{base}.table_{i + 1}.csv", parsed.csv_bytes(i))
+    return written
+
+
+def run(args):
+    if args.mode == "ocr":
+        data = dict(OCR_PARAMS)
+    else:
+        data = build_parse_params(args.ocr_mode, not args.no_coordinates, not args.no_chart,
+                                  [f for f in args.output_formats.split(",") if f], BASE64_CHOICES[args.base64])
+    params = normalize_params(data)
+
+    files = collect_files(args.inputs, EXTENSIONS[args.mode])
+    os.makedirs(args.output, exist_ok=True)
+    results_path = os.path.join(args.output, RESULTS_FILE)
+    completed = {} if args.force else load_completed(results_path, params)
+
+    pending = []
+    for path, rel in files:
+        stat = os.stat(path)
+        if completed.get(rel) == (stat.st_size, stat.st_mtime_ns):
+            continue
+        pending.append((path, rel, stat))
+    skipped = len(files) - len(pending)
+    print(f"대상 {len(files)}개 · 완료된 {skipped}개 건너뜀 · 처리 {len(pending)}개 (동시 {args.workers})")
+    if not pending:
+        return 0
+
+    api_key = args.api_key or os.environ.get("UPSTAGE_API_KEY")
+    if not api_key:
+        print("API 키가 없습니다: --api-key 또는 UPSTAGE_API_KEY 환경 변수", file=sys.stderr)
+        return 2
+    settings = SchedulerSettings()
+    if args.rate:
+        settings.rates["document"] = args.rate
+    scheduler = RequestScheduler(settings)
+    http = create_session(HttpSettings(pool_maxsize=max(args.workers, 10)))
+    cache = DocumentCache(args.cache) if args.cache else None
+    search_index = FullTextIndex(args.index) if args.index else None
+    prepare = None
+    if args.downscale:
+        prep_settings = ImagePrepSettings(target_dpi=args.target_dpi, jpeg_quality=args.jpeg_quality,
+                                          upload_mbps=args.upload_mbps)
+
+        def prepare(upload):
+            return prepare_image(upload, prep_settings)
+
+    uploads = [UploadSource.from_path(path) for path, _, _ in pending]
+    counts = {"ok": 0, "cached": 0, "failed": 0, "pages": 0, "bytes": 0, "saved_bytes": 0, "saved_seconds": 0.0}
+    start = time.perf_counter()
+    done = 0
+    interrupted = False
+    try:
+        with open(results_path, "a", encoding="utf-8") as out:
+            for item in iter_file_results(http, api_key, uploads, data, cache, args.refresh, args.workers,
+                                          base_url=args.base_url, scheduler=scheduler, prepare=prepare):
+                done += 1
+                uploads[item.index].close()
+                path, rel, stat = pending[item.index]
+                record = {"path": rel, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "params": params,
+                          "seconds": round(item.seconds, 3)}
+                if item.prepared is not None and item.prepared.applied:
+                    record.update(sent_bytes=item.prepared.sent_bytes, upload_seconds_saved=round(item.prepared.seconds_saved, 2))
+                    counts["saved_bytes"] += item.prepared.saved_bytes
+                    counts["saved_seconds"] += item.prepared.seconds_saved
+                if item.ok:
+                    parsed = ParsedDocument(item.result, os.path.basename(path), item.from_cache)
+                    if not item.from_cache:
+                        record_document_usage(item.result)
+                    try:
+                        outputs = write_outputs(parsed, args.output, rel, args.mode, args.docx)
+                        if search_index is not None:
+                            name = os.path.basename(path)
+                            search_index.add_document(f"{args.mode}:{name}:{stat.st_size}", name, item.result, args.mode)
+                    except Exception as e:
+                        record.update(status="error", error=f"출력 실패: {e}")
+                    else:
+                        record.update(status="ok", from_cache=item.from_cache, pages=parsed.pages,
+                                      elements=len(parsed.elements), tables=len(parsed.tables()), outputs=outputs)
+                        if not args.no_response:
+                            record["result"] = item.result
+                else:
+                    record.update(status="error", error=item.error)
+
+                if record["status"] == "ok":
+                    counts["ok"] += 1
+                    counts["cached"] += item.from_cache
+                    counts["pages"] += parsed.pages or 0
+                    counts["bytes"] += stat.st_size
+                    status = "캐시" if item.from_cache else "완료"
+                else:
+                    counts["failed"] += 1
+                    status = "실패"
+                # 한 줄씩 바로 기록해 중단되어도 끝난 파일은 다음 실행에서 건너뜀
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                line = f"[{done}/{len(pending)}] {status} {rel} ({item.seconds:.2f}s)"
+                print(line if record["status"] == "ok" else f"{line} - {record['error']}", flush=True)
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        for upload in uploads:
+            upload.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{'중단됨 · ' if interrupted else ''}처리 {done}개 (성공 {counts['ok']} · 캐시 {counts['cached']} · "
+          f"실패 {counts['failed']}) · 건너뜀 {skipped} · {elapsed:.1f}s · {done / elapsed if elapsed else 0:.2f} 파일/s · "
+          f"{counts['pages']}쪽 ({counts['pages'] / elapsed if elapsed else 0:.1f} 쪽/s) · "
+          f"{counts['bytes'] / 1024 / 1024:.1f}MB ({counts['bytes'] / 1024 / 1024 / elapsed if elapsed else 0:.2f} MB/s)")
+    if counts["saved_bytes"]:
+        print(f"이미지 축소: {counts['saved_bytes'] / 1024 / 1024:.1f}MB 절감 · "
+              f"업로드 약 {counts['saved_seconds']:.1f}초 절약 ({args.upload_mbps:g} Mbps 기준)")
+    if interrupted:
+        return 130
+    return 1 if counts["failed"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upstage 문서 파싱/OCR 일괄 처리")
+    parser.add_argument("mode", choices=["parse", "ocr"])
+    parser.add_argument("inputs", nargs="+", help="디렉터리, glob 패턴(** 지원) 또는 파일")
+    parser.add_argument("--output", "-o", required=True, help="출력 디렉터리 (results.jsonl 포함)")
+    parser.add_argument("--workers", type=int, default=8, help="동시 처리 파일 수")
+    parser.add_argument("--api-key", help="지정하지 않으면 UPSTAGE_API_KEY 환경 변수")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--rate", type=float, help="문서 요청 초당 상한 (기본: 스케줄러 기본값)")
+    parser.add_argument("--cache", help="결과 캐시 SQLite 경로 (앱과 같은 파일을 쓰면 결과를 공유)")
+    parser.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 호출해 덮어씀")
+    parser.add_argument("--force", action="store_true", help="results.jsonl 의 완료 기록을 무시하고 모두 처리")
+    parser.add_argument("--index", help="전문 검색 인덱스 SQLite 경로 (앱의 secrets [search_index] path 와 같으면 공유)")
+    parser.add_argument("--no-response", action="store_true", help="results.jsonl 에 API 응답 본문을 넣지 않음")
+    parser.add_argument("--docx", action="store_true", help="ocr: Word(.docx) 파일도 만듦")
+    parser.add_argument("--downscale", action="store_true", help="PNG/JPG 를 보내기 전에 축소/재압축 (방향 보정, 메타데이터 제거)")
+    parser.add_argument("--target-dpi", type=int, default=ImagePrepSettings.target_dpi, help="--downscale: A4 기준 목표 해상도")
+    parser.add_argument("--jpeg-quality", type=int, default=ImagePrepSettings.jpeg_quality, help="--downscale: JPEG 품질")
+    parser.add_argument("--upload-mbps", type=float, default=ImagePrepSettings.upload_mbps,
+                        help="--downscale: 절약 시간 추정에 쓰는 업로드 속도")
+    parser.add_argument("--ocr-mode", choices=["auto", "force"], default="auto", help="parse: OCR 모드")
+    parser.add_argument("--output-formats", default="html", help="parse: 쉼표로 구분 (html,text,markdown)")
+    parser.add_argument("--base64", choices=list(BASE64_CHOICES), default="none", help="parse: Base64 인코딩 대상")
+    parser.add_argument("--no-coordinates", action="store_true", help="parse: 좌표 정보 제외")
+    parser.add_argument("--no-chart", action="store_true", help="parse: 차트 인식 끄기")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
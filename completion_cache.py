@@ -0,0 +1,160 @@
+# completion_cache.py
+"""채팅 완성(chat completion) 응답 캐시
+
+키는 모델 + 정규화된 메시지 목록의 SHA-256 해시.
+메모리 LRU(TTL 포함) 1단계와 선택적인 SQLite 디스크 2단계로 구성되며,
+get/set 만 구현하면 어떤 백엔드든 끼워 넣을 수 있다.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_messages(messages):
+    """캐시 키 계산용으로 메시지를 정규화 (role/content만 남기고 줄바꿈 통일, 앞뒤 공백 제거)
+
+    내부 공백/줄바꿈/들여쓰기는 그대로 둔다 (코드 블록이나 표는 모양이 다르면 다른 질문).
+    """
+    normalized = []
+    for m in messages:
+        content = (m.get("content") or "").replace("\r\n", "\n").replace("\r", "\n").strip()
+        normalized.append({"role": m.get("role"), "content": content})
+    return normalized
+
+
+def make_cache_key(model, messages, **params):
+    """모델 + 정규화된 메시지 (+ 생성 파라미터)로 캐시 키 생성"""
+    payload = {"model": model, "messages": normalize_messages(messages), "params": params}
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryLRUCache:
+    """TTL이 있는 스레드 안전 메모리 LRU 캐시"""
+
+    def __init__(self, maxsize=512, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """TTL이 있는 SQLite 디스크 캐시 (프로세스 재시작 후에도 유지)"""
+
+    def __init__(self, path, ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+class CompletionCache:
+    """메모리 → 디스크 순서로 조회하는 2단계 응답 캐시 (적중/미스 카운터 포함)"""
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory if memory is not None else MemoryLRUCache()
+        self.disk = disk
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._count("disk_hits")
+                # 디스크에서 찾은 값은 메모리로 승격
+                self.memory.set(key, value)
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
@@ -0,0 +1,122 @@
+# context_window.py
+"""토큰 예산 기반 대화 컨텍스트 관리
+
+시스템 프롬프트와 최근 대화만 예산 안에서 그대로 보내고,
+예산 밖으로 밀려난 오래된 턴은 누적 요약(rolling summary)으로 접는다.
+요약은 새로 밀려난 메시지만 기존 요약에 덧붙이는 방식으로 점진적으로 갱신한다.
+"""
+import math
+import re
+
+# 한글/한자/가나는 대체로 글자당 1토큰, 그 밖의 문자는 약 4글자당 1토큰으로 추정
+_CJK_PATTERN = re.compile(r'[\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u4e00-\u9fff\uac00-\ud7af]')
+# 메시지마다 role/구분자에 붙는 고정 오버헤드
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "이전 대화 요약:\n"
+
+
+def estimate_tokens(text):
+    """텍스트의 토큰 수를 근사 (토크나이저 없이 문자 종류로 추정)"""
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    other = len(text) - cjk
+    return cjk + math.ceil(other / 4)
+
+
+def message_tokens(message):
+    """메시지 하나의 토큰 수 추정"""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def messages_tokens(messages):
+    """메시지 목록 전체의 토큰 수 추정"""
+    return sum(message_tokens(m) for m in messages)
+
+
+class ContextWindow:
+    """대화 기록을 토큰 예산 안으로 유지하는 컨텍스트 관리자
+
+    - budget_tokens: 요청 하나에 보낼 최대 토큰 수 (시스템 프롬프트와 요약 포함)
+    - low_watermark: 예산을 넘었을 때 이 비율까지 줄여서 요약 호출 빈도를 낮춤
+    - min_recent: 예산과 무관하게 항상 원문으로 보낼 최근 메시지 수
+    """
+
+    def __init__(self, budget_tokens=3000, low_watermark=0.75, min_recent=2):
+        self.budget_tokens = budget_tokens
+        self.low_watermark = low_watermark
+        self.min_recent = min_recent
+        self.summary = ""
+        # 시스템 메시지를 제외한 대화 중 요약에 이미 반영된 메시지 수
+        self.summarized_count = 0
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_count = 0
+
+    def _summary_message(self):
+        return {"role": "system", "content": SUMMARY_PREFIX + self.summary}
+
+    def _fits(self, fixed_tokens, history):
+        return fixed_tokens + messages_tokens(history) <= self.budget_tokens
+
+    def build(self, messages, summarize_fn, offset=0, prefix_tokens=0):
+        """요청에 보낼 메시지 목록과 통계를 반환
+
+        summarize_fn(previous_summary, new_messages) -> str 는 새로 밀려난
+        메시지만 받아 기존 요약을 갱신한 결과를 돌려줘야 한다.
+        대화 기록 일부만 넘기는 경우 offset은 system을 제외한 첫 메시지의
+        전체 대화 내 순번(summarized_count 이하여야 함), prefix_tokens는
+        넘기지 않은 앞부분의 토큰 수(절약량 계산용)다.
+        """
+        system = [m for m in messages[:1] if m.get("role") == "system"]
+        history = messages[len(system):]
+        # 이전에 요약한 메시지는 다시 보내지 않음 (요약은 항상 앞에서부터 단조 증가)
+        if self.summarized_count > offset + len(history):
+            self.reset()
+        recent = history[max(self.summarized_count - offset, 0):]
+
+        fixed_tokens = messages_tokens(system)
+        if self.summary:
+            fixed_tokens += message_tokens(self._summary_message())
+
+        newly_summarized = 0
+        if not self._fits(fixed_tokens, recent) and len(recent) > self.min_recent:
+            # low watermark까지 오래된 메시지를 밀어냄
+            target = self.budget_tokens * self.low_watermark - fixed_tokens
+            keep_tokens = 0
+            keep_from = len(recent)
+            for idx in range(len(recent) - 1, -1, -1):
+                tokens = message_tokens(recent[idx])
+                if len(recent) - idx > self.min_recent and keep_tokens + tokens > target:
+                    break
+                keep_tokens += tokens
+                keep_from = idx
+            evicted = recent[:keep_from]
+            if evicted:
+                self.summary = summarize_fn(self.summary, evicted)
+                self.summarized_count += len(evicted)
+                newly_summarized = len(evicted)
+                recent = recent[keep_from:]
+
+        request = list(system)
+        if self.summary:
+            request.append(self._summary_message())
+        request.extend(recent)
+
+        full_tokens = messages_tokens(messages) + prefix_tokens
+        sent_tokens = messages_tokens(request)
+        stats = {
+            "full_tokens": full_tokens,
+            "sent_tokens": sent_tokens,
+            "saved_tokens": max(full_tokens - sent_tokens, 0),
+            "summarized_messages": self.summarized_count,
+            "newly_summarized": newly_summarized,
+        }
+        return request, stats
+
+
+def format_for_summary(messages):
+    """요약 프롬프트용으로 메시지를 'role: content' 형태의 텍스트로 변환"""
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
@@ -0,0 +1,247 @@
+# conversation_store.py
+"""SQLite 기반 대화 저장소 (Streamlit 비의존)
+
+모든 메시지는 SQLite에 저장하고, 메모리에는 대화별 최근 메시지 창(window)만 둔다.
+- 오래된 메시지는 화면에서 스크롤을 올릴 때 fetch()로 필요한 구간만 읽는다
+- 일정 시간 쓰지 않은 대화는 메모리에서 내린다 (DB에는 남음)
+- 전체 상주 바이트가 상한을 넘으면 가장 오래 쓰지 않은 대화부터 내린다
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from context_window import message_tokens
+
+
+def _message_bytes(message):
+    return len(message["content"].encode("utf-8")) + len(message["role"])
+
+
+class _ResidentConversation:
+    """메모리에 올라와 있는 대화의 최근 메시지 창"""
+    __slots__ = ("messages", "start_seq", "count", "nbytes", "last_access")
+
+    def __init__(self, messages, start_seq, count):
+        self.messages = messages
+        self.start_seq = start_seq  # messages[0]의 전체 대화 내 순번
+        self.count = count          # 전체 메시지 수 (DB 기준)
+        self.nbytes = sum(_message_bytes(m) for m in messages)
+        self.last_access = time.monotonic()
+
+
+class ConversationStore:
+    """대화 기록 저장소
+
+    - window_size: 대화별로 메모리에 유지할 최근 메시지 수
+    - idle_ttl: 이 시간(초) 동안 접근이 없으면 메모리에서 내림
+    - max_resident_bytes: 전체 대화의 메모리 상주 바이트 상한
+    """
+
+    def __init__(self, path, window_size=40, idle_ttl=1800, max_resident_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.window_size = window_size
+        self.idle_ttl = idle_ttl
+        self.max_resident_bytes = max_resident_bytes
+        self._resident = OrderedDict()  # 최근 접근 순서 (LRU)
+        self._resident_bytes = 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                summary TEXT NOT NULL DEFAULT '',
+                summarized_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (conversation_id, seq)
+            );
+            """
+        )
+        self._conn.commit()
+
+    # ─── 대화 단위 ───────────────────────────────────────────────────────────
+    def create(self):
+        """새 대화를 만들고 id를 반환"""
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversations (id, created_at, updated_at) VALUES (?, ?, ?)",
+                (conversation_id, now, now),
+            )
+            self._conn.commit()
+        return conversation_id
+
+    def exists(self, conversation_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        return row is not None
+
+    def delete(self, conversation_id):
+        with self._lock:
+            self._drop_resident(conversation_id)
+            self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+            self._conn.commit()
+
+    # ─── 메모리 상주 창 ──────────────────────────────────────────────────────
+    def _drop_resident(self, conversation_id):
+        resident = self._resident.pop(conversation_id, None)
+        if resident is not None:
+            self._resident_bytes -= resident.nbytes
+
+    def _load_resident(self, conversation_id):
+        resident = self._resident.get(conversation_id)
+        if resident is None:
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()[0]
+            start = max(count - self.window_size, 0)
+            messages = self._fetch(conversation_id, start, count)
+            resident = _ResidentConversation(messages, start, count)
+            self._resident[conversation_id] = resident
+            self._resident_bytes += resident.nbytes
+        self._resident.move_to_end(conversation_id)
+        resident.last_access = time.monotonic()
+        return resident
+
+    def _trim(self, resident):
+        """창 크기를 넘는 오래된 메시지를 메모리에서 내림"""
+        overflow = len(resident.messages) - self.window_size
+        if overflow > 0:
+            dropped = resident.messages[:overflow]
+            del resident.messages[:overflow]
+            freed = sum(_message_bytes(m) for m in dropped)
+            resident.nbytes -= freed
+            self._resident_bytes -= freed
+            resident.start_seq += overflow
+
+    def _enforce_limits(self, keep=None):
+        """유휴 대화와 상한 초과분을 오래된 순서로 메모리에서 내림"""
+        now = time.monotonic()
+        for conversation_id in list(self._resident):
+            resident = self._resident[conversation_id]
+            over_cap = self._resident_bytes > self.max_resident_bytes
+            idle = now - resident.last_access > self.idle_ttl
+            if not (over_cap or idle):
+                break  # LRU 순서이므로 이후 대화는 더 최근에 쓰였음
+            if conversation_id != keep:
+                self._drop_resident(conversation_id)
+
+    def window(self, conversation_id):
+        """(시작 순번, 최근 메시지 목록 사본, 전체 메시지 수) 반환"""
+        with self._lock:
+            resident = self._load_resident(conversation_id)
+            result = (resident.start_seq, list(resident.messages), resident.count)
+            self._enforce_limits(keep=conversation_id)
+            return result
+
+    def append(self, conversation_id, role, content):
+        """메시지를 저장하고 창에 추가, 새 메시지의 순번을 반환"""
+        message = {"role": role, "content": content}
+        now = time.time()
+        with self._lock:
+            resident = self._load_resident(conversation_id)
+            seq = resident.count
+            self._conn.execute(
+                "INSERT INTO messages (conversation_id, seq, role, content, tokens, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (conversation_id, seq, role, content, message_tokens(message), now),
+            )
+            self._conn.execute(
+                "UPDATE conversations SET updated_at = ? WHERE id = ?", (now, conversation_id)
+            )
+            self._conn.commit()
+            resident.messages.append(message)
+            resident.count += 1
+            size = _message_bytes(message)
+            resident.nbytes += size
+            self._resident_bytes += size
+            self._trim(resident)
+            self._enforce_limits(keep=conversation_id)
+            return seq
+
+    def pop(self, conversation_id):
+        """마지막 메시지를 삭제 (실패한 요청 되돌리기용)"""
+        with self._lock:
+            resident = self._load_resident(conversation_id)
+            if resident.count == 0:
+                return
+            seq = resident.count - 1
+            self._conn.execute(
+                "DELETE FROM messages WHERE conversation_id = ? AND seq = ?", (conversation_id, seq)
+            )
+            self._conn.commit()
+            resident.count -= 1
+            if resident.messages and resident.start_seq + len(resident.messages) > seq:
+                dropped = resident.messages.pop()
+                size = _message_bytes(dropped)
+                resident.nbytes -= size
+                self._resident_bytes -= size
+
+    # ─── DB 조회 ────────────────────────────────────────────────────────────
+    def _fetch(self, conversation_id, start, end):
+        rows = self._conn.execute(
+            "SELECT role, content FROM messages WHERE conversation_id = ? AND seq >= ? AND seq < ? "
+            "ORDER BY seq",
+            (conversation_id, start, end),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def fetch(self, conversation_id, start, end):
+        """[start, end) 구간 메시지를 DB에서 읽음 (메모리에 상주시키지 않음)"""
+        with self._lock:
+            return self._fetch(conversation_id, max(start, 0), end)
+
+    def tokens_before(self, conversation_id, seq):
+        """순번 seq 이전 메시지들의 추정 토큰 합계"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(tokens), 0) FROM messages WHERE conversation_id = ? AND seq < ?",
+                (conversation_id, seq),
+            ).fetchone()
+        return row[0]
+
+    # ─── 누적 요약 (ContextWindow 상태) ──────────────────────────────────────
+    def load_summary(self, conversation_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, summarized_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        return row if row else ("", 0)
+
+    def save_summary(self, conversation_id, summary, summarized_count):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE conversations SET summary = ?, summarized_count = ? WHERE id = ?",
+                (summary, summarized_count, conversation_id),
+            )
+            self._conn.commit()
+
+    # ─── 상태 ────────────────────────────────────────────────────────────────
+    def evict_idle(self):
+        with self._lock:
+            self._enforce_limits()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident_conversations": len(self._resident),
+                "resident_messages": sum(len(r.messages) for r in self._resident.values()),
+                "resident_bytes": self._resident_bytes,
+                "max_resident_bytes": self.max_resident_bytes,
+            }
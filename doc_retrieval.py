@@ -0,0 +1,210 @@
+# doc_retrieval.py
+"""파싱된 문서에 대한 로컬 검색 인덱스 (Streamlit 비의존)
+
+document-digitization 결과(elements/markdown)를 청크로 나눠 BM25 인덱스에 넣고,
+질문과 관련된 상위 k개 청크만 채팅 요청에 넣는다.
+한국어는 조사/어미가 붙어 공백 단위 단어가 잘 맞지 않으므로
+한글 어절은 글자 bigram으로도 색인한다.
+임베딩 함수를 주면 BM25 순위와 임베딩 순위를 RRF로 결합한다.
+"""
+import html
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+_WORD_PATTERN = re.compile(r'\w+')
+_HANGUL_PATTERN = re.compile(r'[가-힣]')
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+# RRF(reciprocal rank fusion) 상수
+RRF_K = 60
+
+
+def tokenize_korean(text):
+    """한국어 친화 토큰화: 단어 + 한글 어절의 글자 bigram"""
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        if _HANGUL_PATTERN.search(word) and len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def strip_html(html_content):
+    """태그를 제거하고 HTML 엔티티를 풀어 평문으로 변환"""
+    text = html_content.replace('<br>', '\n').replace('<br/>', '\n')
+    return html.unescape(_TAG_PATTERN.sub(' ', text))
+
+
+def _element_text(element):
+    content = element.get("content") or {}
+    text = content.get("text") or content.get("markdown")
+    if not text and content.get("html"):
+        text = strip_html(content["html"])
+    return " ".join((text or "").split())
+
+
+@dataclass
+class Chunk:
+    doc_id: str
+    doc_name: str
+    text: str
+    pages: tuple
+
+
+def chunk_document(doc_id, doc_name, result, max_chars=800):
+    """파싱 결과를 검색용 청크로 분할
+
+    elements가 있으면 같은 페이지의 연속된 요소를 max_chars 까지 묶고,
+    없으면 markdown/text/html 본문을 빈 줄 기준 단락으로 묶는다.
+    """
+    pieces = []  # (텍스트, 페이지)
+    elements = result.get("elements") or []
+    if elements:
+        for element in elements:
+            text = _element_text(element)
+            if text:
+                pieces.append((text, element.get("page")))
+    else:
+        content = result.get("content") or {}
+        body = content.get("markdown") or content.get("text") or strip_html(content.get("html", ""))
+        pieces = [(" ".join(p.split()), None) for p in re.split(r'\n\s*\n', body) if p.strip()]
+
+    chunks = []
+    buffer, pages = [], []
+    size = 0
+    for text, page in pieces:
+        if buffer and (size + len(text) > max_chars or (page is not None and pages and page != pages[-1])):
+            chunks.append(Chunk(doc_id, doc_name, "\n".join(buffer), tuple(sorted(set(p for p in pages if p is not None)))))
+            buffer, pages, size = [], [], 0
+        # 요소 하나가 max_chars 보다 길면 잘라서 넣음
+        while len(text) > max_chars:
+            chunks.append(Chunk(doc_id, doc_name, text[:max_chars], (page,) if page is not None else ()))
+            text = text[max_chars:]
+        buffer.append(text)
+        pages.append(page)
+        size += len(text)
+    if buffer:
+        chunks.append(Chunk(doc_id, doc_name, "\n".join(buffer), tuple(sorted(set(p for p in pages if p is not None)))))
+    return chunks
+
+
+class DocumentIndex:
+    """문서 여러 개를 담는 BM25 인덱스 (문서 단위로 점진적 추가/삭제)
+
+    embed_fn(texts, kind) -> list[list[float]] 를 주면 kind="passage"로
+    청크 임베딩을, kind="query"로 질문 임베딩을 구해 하이브리드 검색을 한다.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, embed_fn=None):
+        self.k1 = k1
+        self.b = b
+        self.embed_fn = embed_fn
+        self.chunks = []                  # 청크 id = 리스트 인덱스 (삭제된 자리는 None)
+        self.postings = defaultdict(dict)  # 토큰 -> {청크 id: tf}
+        self.lengths = {}                 # 청크 id -> 토큰 수
+        self.embeddings = {}              # 청크 id -> 정규화된 벡터
+        self.documents = {}               # doc_id -> (문서 이름, [청크 id])
+        self._total_length = 0
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def add_document(self, doc_id, doc_name, result, max_chars=800):
+        """문서를 청크로 나눠 색인 (이미 있는 doc_id면 건너뜀), 추가된 청크 수 반환"""
+        if doc_id in self.documents:
+            return 0
+        new_ids = []
+        for chunk in chunk_document(doc_id, doc_name, result, max_chars):
+            chunk_id = len(self.chunks)
+            self.chunks.append(chunk)
+            tokens = tokenize_korean(chunk.text)
+            for token, tf in Counter(tokens).items():
+                self.postings[token][chunk_id] = tf
+            self.lengths[chunk_id] = len(tokens)
+            self._total_length += len(tokens)
+            new_ids.append(chunk_id)
+        if self.embed_fn is not None and new_ids:
+            vectors = self.embed_fn([self.chunks[i].text for i in new_ids], "passage")
+            for chunk_id, vector in zip(new_ids, vectors):
+                self.embeddings[chunk_id] = _normalize(vector)
+        self.documents[doc_id] = (doc_name, new_ids)
+        return len(new_ids)
+
+    def remove_document(self, doc_id):
+        doc = self.documents.pop(doc_id, None)
+        if doc is None:
+            return
+        for chunk_id in doc[1]:
+            for token in set(tokenize_korean(self.chunks[chunk_id].text)):
+                postings = self.postings.get(token)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[token]
+            self._total_length -= self.lengths.pop(chunk_id)
+            self.embeddings.pop(chunk_id, None)
+            self.chunks[chunk_id] = None
+
+    def _bm25(self, query, allowed):
+        n = len(self.lengths)
+        if not n:
+            return {}
+        avgdl = self._total_length / n
+        scores = defaultdict(float)
+        for token in set(tokenize_korean(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                if allowed is not None and chunk_id not in allowed:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / avgdl)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / norm
+        return scores
+
+    def _dense(self, query, allowed):
+        query_vector = _normalize(self.embed_fn([query], "query")[0])
+        return {
+            chunk_id: sum(a * b for a, b in zip(query_vector, vector))
+            for chunk_id, vector in self.embeddings.items()
+            if allowed is None or chunk_id in allowed
+        }
+
+    def search(self, query, k=4, doc_ids=None):
+        """질문과 관련된 상위 k개 (점수, Chunk) 반환, doc_ids로 대상 문서 제한"""
+        allowed = None
+        if doc_ids is not None:
+            allowed = {cid for doc_id in doc_ids if doc_id in self.documents for cid in self.documents[doc_id][1]}
+        sparse = self._bm25(query, allowed)
+        if self.embed_fn is None or not self.embeddings:
+            ranked = sorted(sparse.items(), key=lambda item: item[1], reverse=True)
+        else:
+            # BM25와 임베딩 순위를 RRF로 결합
+            fused = defaultdict(float)
+            for scores in (sparse, self._dense(query, allowed)):
+                for rank, (chunk_id, _) in enumerate(sorted(scores.items(), key=lambda item: item[1], reverse=True)):
+                    fused[chunk_id] += 1 / (RRF_K + rank + 1)
+            ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in ranked[:k]]
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def build_context_message(hits):
+    """검색된 청크를 출처와 함께 system 메시지로 구성"""
+    sections = []
+    for i, (_, chunk) in enumerate(hits, 1):
+        pages = f" p.{','.join(str(p) for p in chunk.pages)}" if chunk.pages else ""
+        sections.append(f"[{i}] {chunk.doc_name}{pages}\n{chunk.text}")
+    return {
+        "role": "system",
+        "content": (
+            "다음은 사용자가 업로드한 문서에서 질문과 관련된 부분입니다. "
+            "답변에 활용하고, 인용할 때는 [번호]로 출처를 표시하세요.\n\n" + "\n\n".join(sections)
+        ),
+    }
@@ -0,0 +1,311 @@
+# document_api.py
+"""document-digitization (문서 파싱/OCR) 호출 (Streamlit 비의존)
+
+페이지 01/02, 배치 CLI(batch_cli)와 부하 테스트(loadtest)가 같은 요청 코드 경로를 쓴다.
+동기 호출(digitize_document)과 비동기 작업 + 폴링(digitize_document_async)을 지원한다.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from document_cache import file_digest, make_document_key
+from document_chunks import ChunkResult, merge_chunk_results
+from telemetry import BYTES_BUCKETS, TELEMETRY
+from upload_stream import MultipartBody, UploadSource
+from upstage_http import BASE_URL
+
+# OCR 페이지에서 쓰는 고정 파라미터
+OCR_PARAMS = {
+    "ocr": "force",
+    "model": "document-parse"
+}
+
+# 문서 파싱 페이지의 "Base64 인코딩 옵션" -> base64_encoding 파라미터
+BASE64_ENCODING_OPTIONS = {
+    "없음": None,
+    "표만": '["table"]',
+    "텍스트만": '["text"]',
+    "텍스트와 표": '["text","table"]',
+    "모든 요소": '["text","table","figure","chart","diagram","heading1","heading2","heading3","paragraph","list"]',
+}
+
+
+def build_parse_params(ocr_mode="auto", coordinates=True, chart_recognition=True, output_formats=("html",),
+                       encode_option="없음"):
+    """문서 파싱 요청 파라미터 (페이지와 배치 CLI 가 같은 규칙으로 만들어 캐시 키도 같음)"""
+    data = {
+        "ocr": ocr_mode,
+        "model": "document-parse",
+        "coordinates": str(coordinates).lower(),
+        "chart_recognition": str(chart_recognition).lower()
+    }
+    if output_formats:
+        data["output_formats"] = str(list(output_formats)).replace("'", '"')
+    if BASE64_ENCODING_OPTIONS[encode_option]:
+        data["base64_encoding"] = BASE64_ENCODING_OPTIONS[encode_option]
+    return data
+
+
+def _upload_bytes(files):
+    return sum(
+        part.size if isinstance(part, UploadSource) else len(part[1])
+        for part in files.values()
+        if isinstance(part, UploadSource) or isinstance(part[1], (bytes, bytearray))
+    )
+
+
+def _post_files(session, url, headers, files, data):
+    """UploadSource 는 multipart 본문을 스트리밍으로, (이름, 바이트, MIME) 튜플은 requests 의 files= 로 보냄
+
+    재시도마다 호출되며, 스트리밍 본문은 같은 UploadSource 를 처음부터 다시 읽는다.
+    """
+    document = files.get("document")
+    if isinstance(document, UploadSource):
+        body = MultipartBody(data, "document", document)
+        return session.post(url, headers={**headers, "Content-Type": body.content_type}, data=body)
+    return session.post(url, headers=headers, files=files, data=data)
+
+
+def digitize_document(session, api_key, files, data, base_url=BASE_URL, scheduler=None, timings=None):
+    """document-digitization 엔드포인트에 파일을 업로드하고 응답을 반환
+
+    files["document"] 는 UploadSource(스트리밍 업로드) 또는 (이름, 바이트, MIME) 튜플.
+    scheduler가 있으면 속도 제한/재시도를 거치며, 재시도를 소진하면 마지막 응답을 반환한다.
+    """
+    headers = {"Authorization": f"Bearer {api_key}"}
+    mode = "ocr" if data.get("ocr") == "force" else "parse"
+    TELEMETRY.observe("upstage_request_upload_bytes", _upload_bytes(files), BYTES_BUCKETS,
+                      endpoint="document-digitization", mode=mode)
+
+    def send():
+        return _post_files(session, f"{base_url}/document-digitization", headers, files, data)
+
+    start = time.perf_counter()
+    try:
+        resp = send() if scheduler is None else scheduler.call("document", send, timings)
+    except Exception:
+        TELEMETRY.observe("upstage_request_seconds", time.perf_counter() - start,
+                          endpoint="document-digitization", mode=mode, status="error")
+        raise
+    TELEMETRY.observe("upstage_request_seconds", time.perf_counter() - start,
+                      endpoint="document-digitization", mode=mode, status=str(resp.status_code))
+    TELEMETRY.observe("upstage_request_response_bytes", len(resp.content), BYTES_BUCKETS,
+                      endpoint="document-digitization", mode=mode)
+    return resp
+
+
+class JobResponse:
+    """비동기 작업의 최종 결과를 requests.Response 처럼 다루는 래퍼"""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 300
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def digitize_document_async(session, api_key, files, data, base_url=BASE_URL, scheduler=None, timings=None,
+                            poll_interval=2.0, timeout=1800.0):
+    """비동기 작업 엔드포인트에 제출하고 완료될 때까지 폴링한 뒤 배치 결과를 하나로 합쳐 반환
+
+    제출이 실패하면 그 응답을 그대로, 작업이 실패하거나 timeout 을 넘기면 오류 JobResponse를 반환한다.
+    """
+    headers = {"Authorization": f"Bearer {api_key}"}
+    mode = "ocr" if data.get("ocr") == "force" else "parse"
+    start = time.perf_counter()
+
+    def request(method, url, **kwargs):
+        def send():
+            return session.request(method, url, **kwargs)
+        return send() if scheduler is None else scheduler.call("document", send, timings)
+
+    def submit():
+        return _post_files(session, f"{base_url}/document-digitization/async", headers, files, data)
+
+    def finish(status_code, content):
+        TELEMETRY.observe("upstage_request_seconds", time.perf_counter() - start,
+                          endpoint="document-digitization-async", mode=mode, status=str(status_code))
+        return JobResponse(status_code, content)
+
+    def fail(status_code, message):
+        body = {"error": {"message": message, "request_id": request_id}}
+        return finish(status_code, json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+    resp = submit() if scheduler is None else scheduler.call("document", submit, timings)
+    if not resp.ok:
+        return finish(resp.status_code, resp.content)
+    request_id = resp.json()["request_id"]
+
+    deadline = time.monotonic() + timeout
+    while True:
+        resp = request("GET", f"{base_url}/document-digitization/requests/{request_id}", headers=headers)
+        if not resp.ok:
+            return fail(resp.status_code, resp.text)
+        job = resp.json()
+        if job.get("status") == "completed":
+            break
+        if job.get("status") == "failed":
+            return fail(500, job.get("failure_message") or "failed")
+        if time.monotonic() > deadline:
+            return fail(504, f"작업이 {timeout:.0f}초 안에 끝나지 않았습니다")
+        time.sleep(poll_interval)
+
+    # 배치별 결과는 download_url 에서 받음 (인증 헤더가 필요 없는 임시 URL)
+    batches = []
+    for batch in sorted(job.get("batches", []), key=lambda b: b.get("start_page", 1)):
+        batch_resp = request("GET", batch["download_url"])
+        if not batch_resp.ok:
+            return fail(batch_resp.status_code, batch_resp.text)
+        batches.append((batch.get("start_page", 1), batch_resp.json()))
+    content = json.dumps(merge_chunk_results(batches), ensure_ascii=False).encode("utf-8")
+    TELEMETRY.observe("upstage_request_response_bytes", len(content), BYTES_BUCKETS,
+                      endpoint="document-digitization-async", mode=mode)
+    return finish(200, content)
+
+
+def record_document_usage(result):
+    """응답의 usage.pages 를 처리 페이지 수 지표에 더함"""
+    pages = (result.get("usage") or {}).get("pages") or 0
+    TELEMETRY.inc("upstage_pages_processed_total", pages)
+    return pages
+
+
+class CachedResponse:
+    """캐시에 저장된 응답 본문을 requests.Response 처럼 다루는 래퍼"""
+    ok = True
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, content, cache_key):
+        self.content = content
+        self.cache_key = cache_key
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def digitize_document_cached(session, api_key, files, data, cache=None, refresh=False,
+                             digitize=digitize_document, **kwargs):
+    """DocumentCache를 먼저 조회하고, 없을 때만 digitize(기본 digitize_document) 호출 후 성공 응답을 저장
+
+    refresh=True 이면 캐시를 무시하고 다시 호출해 덮어쓴다.
+    반환값에는 from_cache / cache_key 속성이 붙는다.
+    """
+    if cache is None:
+        resp = digitize(session, api_key, files, data, **kwargs)
+        resp.from_cache = False
+        return resp
+    document = files["document"]
+    if isinstance(document, UploadSource):
+        file_name, file_hash = document.name, document.sha256
+    else:
+        file_name, file_hash = document[0], file_digest(document[1])
+    cache_key = make_document_key(file_hash, data)
+    if not refresh:
+        content = cache.get(cache_key)
+        if content is not None:
+            TELEMETRY.inc("upstage_document_cache_total", result="hit")
+            return CachedResponse(content, cache_key)
+    TELEMETRY.inc("upstage_document_cache_total", result="refresh" if refresh else "miss")
+    resp = digitize(session, api_key, files, data, **kwargs)
+    if resp.ok:
+        cache.set(cache_key, resp.content, file_name, data)
+    resp.from_cache = False
+    resp.cache_key = cache_key
+    return resp
+
+
+
+@dataclass
+class FileResult:
+    """일괄 OCR/파싱에서 파일 하나의 결과 또는 오류"""
+    index: int
+    name: str
+    size: int
+    result: dict = None
+    error: str = None
+    from_cache: bool = False
+    seconds: float = 0.0
+    prepared: object = None  # 업로드 전 전처리 결과 (image_prep.PreparedImage)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _iter_completed(task, items, max_workers):
+    """items 를 최대 max_workers 개씩 동시에 task 로 처리하고 끝나는 순서대로 결과를 돌려줌"""
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    try:
+        futures = [pool.submit(task, item) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # 호출자가 중간에 멈추면(Streamlit 재실행 등) 아직 시작하지 않은 작업은 취소
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_chunk(session, api_key, file_name, chunk, data, cache, refresh, use_async, **kwargs):
+    start_page, end_page, chunk_bytes = chunk
+    files = {"document": (f"{file_name}#p{start_page}-{end_page}", chunk_bytes, "application/pdf")}
+    digitize = digitize_document_async if use_async else digitize_document
+    try:
+        resp = digitize_document_cached(session, api_key, files, data, cache, refresh, digitize=digitize, **kwargs)
+    except Exception as e:
+        return ChunkResult(start_page, end_page, error=str(e))
+    if not resp.ok:
+        return ChunkResult(start_page, end_page, error=f"{resp.status_code}: {resp.text[:300]}")
+    return ChunkResult(start_page, end_page, result=resp.json(), from_cache=resp.from_cache)
+
+
+def iter_chunk_results(session, api_key, file_name, chunks, data, cache=None, refresh=False,
+                       max_workers=4, use_async=False, **kwargs):
+    """split_pdf 로 나눈 청크를 최대 max_workers 개씩 동시에 파싱하고 끝나는 순서대로 ChunkResult 를 돌려줌
+
+    청크마다 DocumentCache 를 따로 조회/저장하므로 실패한 청크만 다시 돌려도 된다.
+    실제 동시 요청 수와 속도 제한은 scheduler(kwargs)가 한 번 더 제한한다.
+    """
+    def task(chunk):
+        return _parse_chunk(session, api_key, file_name, chunk, data, cache, refresh, use_async, **kwargs)
+    return _iter_completed(task, chunks, max_workers)
+
+
+def iter_file_results(session, api_key, uploads, data, cache=None, refresh=False, max_workers=8, prepare=None,
+                      **kwargs):
+    """UploadSource 목록을 같은 파라미터로 동시에 처리하고 끝나는 순서대로 FileResult 를 돌려줌
+
+    파일 N개는 대략 요청 하나의 지연 × ceil(N / max_workers) 만큼 걸린다
+    (scheduler 의 초당 요청 수 제한이 더 낮으면 그쪽이 상한).
+    prepare(upload) 가 PreparedImage 를 돌려주면 그 upload 를 대신 보낸다 (작업 스레드에서 파일마다 실행).
+    """
+    def task(item):
+        index, upload = item
+        start = time.perf_counter()
+        prepared = None
+        try:
+            prepared = prepare(upload) if prepare is not None else None
+            sent = prepared.upload if prepared is not None else upload
+            resp = digitize_document_cached(session, api_key, {"document": sent}, data, cache, refresh, **kwargs)
+        except Exception as e:
+            return FileResult(index, upload.name, upload.size, error=str(e), seconds=time.perf_counter() - start,
+                              prepared=prepared)
+        if not resp.ok:
+            return FileResult(index, upload.name, upload.size, error=f"{resp.status_code}: {resp.text[:300]}",
+                              seconds=time.perf_counter() - start, prepared=prepared)
+        return FileResult(index, upload.name, upload.size, result=resp.json(), from_cache=resp.from_cache,
+                          seconds=time.perf_counter() - start, prepared=prepared)
+    return _iter_completed(task, list(enumerate(uploads)), max_workers)
@@ -0,0 +1,153 @@
+# document_cache.py
+"""document-digitization 결과의 내용 주소(content-addressed) 디스크 캐시 (Streamlit 비의존)
+
+키는 파일 바이트의 SHA-256 + 정규화된 요청 파라미터의 SHA-256.
+파일 이름이 달라도 내용과 옵션이 같으면 같은 결과를 돌려준다.
+응답 본문(JSON 바이트)을 zlib으로 압축해 SQLite에 저장하고,
+저장 용량이 상한을 넘으면 가장 오래 쓰지 않은 항목부터 지운다.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+def file_digest(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        text = value.strip()
+        if text.lower() in ("true", "false"):
+            return text.lower() == "true"
+        if text.startswith("["):
+            # output_formats / base64_encoding: 순서와 따옴표 형태가 달라도 같은 키
+            try:
+                return sorted(str(v).lower() for v in json.loads(text.replace("'", '"')))
+            except ValueError:
+                return text
+        return text
+    if isinstance(value, (list, tuple)):
+        return sorted(str(v).lower() for v in value)
+    return value
+
+
+def normalize_params(data):
+    """요청 파라미터(ocr, coordinates, chart_recognition, output_formats, base64_encoding 등) 정규화"""
+    return {key: _normalize_value(value) for key, value in sorted((data or {}).items())}
+
+
+def make_document_key(file_hash, data):
+    raw = json.dumps(normalize_params(data), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return f"{file_hash}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+class DocumentCache:
+    """압축된 파싱 결과를 저장하는 용량 제한 LRU SQLite 캐시
+
+    - max_bytes: 압축 후 저장 용량 상한 (넘으면 last_access 가 오래된 순으로 삭제)
+    - compress_level: zlib 압축 수준 (1=빠름 ~ 9=작음)
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, compress_level=6):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                params TEXT NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                stored_bytes INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS documents_last_access ON documents (last_access);
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """저장된 응답 본문(JSON bytes) 반환, 없으면 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE documents SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return zlib.decompress(row[0])
+
+    def set(self, key, body, file_name="", params=None):
+        """응답 본문(JSON bytes)을 압축 저장하고 용량 상한에 맞춰 오래된 항목을 지움"""
+        compressed = zlib.compress(body, self.compress_level)
+        if len(compressed) > self.max_bytes:
+            return  # 상한보다 큰 결과는 저장하지 않음
+        now = time.time()
+        params_text = json.dumps(normalize_params(params), ensure_ascii=False, sort_keys=True)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(key, file_name, params, raw_bytes, stored_bytes, body, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, file_name, params_text, len(body), len(compressed),
+                 compressed, now, now),
+            )
+            self.stats["stores"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, stored_bytes FROM documents ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+            total -= size
+            self.stats["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.commit()
+
+    def entries(self, limit=20):
+        """최근 사용 순 항목 요약 (key, 파일 이름, 파라미터, 원본/저장 바이트, 마지막 사용 시각)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, file_name, params, raw_bytes, stored_bytes, last_access "
+                "FROM documents ORDER BY last_access DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"key": key, "file_name": name, "params": params, "raw_bytes": raw,
+             "stored_bytes": stored, "last_access": last_access}
+            for key, name, params, raw, stored, last_access in rows
+        ]
+
+    def usage(self):
+        """(항목 수, 원본 바이트 합, 저장 바이트 합)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(stored_bytes), 0) FROM documents"
+            ).fetchone()
@@ -0,0 +1,122 @@
+# document_chunks.py
+"""대용량 PDF의 페이지 분할과 청크별 파싱 결과 병합 (Streamlit 비의존)
+
+수백 페이지 문서를 한 번의 동기 요청으로 보내는 대신 pages_per_chunk 쪽씩
+잘라 병렬로 파싱하고(document_api.iter_chunk_results), 결과를 하나의
+document-digitization 응답 형태로 합친다.
+- elements: 페이지 번호를 원본 문서 기준으로 옮기고 id를 0부터 다시 매김
+- content.html/markdown/text: 페이지 순서대로 이어 붙임 (HTML 의 id 속성도 새 id로 변경)
+- usage.pages: 합계
+"""
+import re
+from dataclasses import dataclass
+from io import BytesIO
+
+# 요소 HTML 의 id='12' / id="12" 속성
+_HTML_ID_PATTERN = re.compile(r"""(\sid=['"])(\d+)(['"])""")
+
+
+@dataclass
+class ChunkResult:
+    """청크 하나(start_page~end_page, 1부터 시작)의 파싱 결과 또는 오류"""
+    start_page: int
+    end_page: int
+    result: dict = None
+    error: str = None
+    from_cache: bool = False
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _reader(source):
+    # 바이트 또는 되감을 수 있는 바이너리 스트림(Streamlit UploadedFile 등)
+    # pypdf 는 대용량 모드로 PDF 를 나눌 때만 로드 (결과 병합만 쓰는 import 는 가볍게)
+    from pypdf import PdfReader
+
+    return PdfReader(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+
+
+def pdf_page_count(source):
+    return len(_reader(source).pages)
+
+
+def split_pdf(source, pages_per_chunk=50):
+    """PDF를 pages_per_chunk 쪽씩 나눠 [(start_page, end_page, pdf_bytes), ...] 반환 (페이지는 1부터)
+
+    source 는 바이트 또는 스트림 (스트림이면 전체를 복사하지 않고 필요한 객체만 읽음)
+    """
+    from pypdf import PdfWriter
+
+    reader = _reader(source)
+    total = len(reader.pages)
+    chunks = []
+    for first in range(0, total, pages_per_chunk):
+        last = min(first + pages_per_chunk, total)
+        writer = PdfWriter()
+        for index in range(first, last):
+            writer.add_page(reader.pages[index])
+        buffer = BytesIO()
+        writer.write(buffer)
+        chunks.append((first + 1, last, buffer.getvalue()))
+    return chunks
+
+
+def _page_offset(result, start_page):
+    """청크 결과의 페이지 번호를 원본 기준으로 옮길 오프셋
+
+    청크 단위 요청은 1쪽부터 다시 세므로 start_page - 1 을 더하고,
+    비동기 배치처럼 이미 원본 기준 번호가 오면 그대로 둔다.
+    """
+    pages = [elem.get("page", 1) for elem in result.get("elements", [])]
+    return start_page - 1 if pages and min(pages) < start_page else 0
+
+
+def _renumber_html(html, id_map):
+    if not html or not id_map:
+        return html
+    return _HTML_ID_PATTERN.sub(
+        lambda m: f"{m.group(1)}{id_map.get(int(m.group(2)), m.group(2))}{m.group(3)}", html
+    )
+
+
+def merge_chunk_results(chunks):
+    """[(start_page, result), ...] 를 페이지 순서대로 합쳐 하나의 응답 dict 로 만듦"""
+    merged_elements = []
+    html_parts, markdown_parts, text_parts = [], [], []
+    pages = 0
+    first = {}
+    for start_page, result in sorted(chunks, key=lambda item: item[0]):
+        first = first or result
+        offset = _page_offset(result, start_page)
+        id_map = {}
+        for elem in result.get("elements", []):
+            new_id = len(merged_elements)
+            if "id" in elem:
+                id_map[elem["id"]] = new_id
+            moved = dict(elem, id=new_id, page=elem.get("page", 1) + offset)
+            content = elem.get("content")
+            if content and content.get("html"):
+                moved["content"] = dict(content, html=_renumber_html(content["html"], id_map))
+            merged_elements.append(moved)
+        content = result.get("content") or {}
+        if content.get("html"):
+            html_parts.append(_renumber_html(content["html"], id_map))
+        if content.get("markdown"):
+            markdown_parts.append(content["markdown"])
+        if content.get("text"):
+            text_parts.append(content["text"])
+        pages += (result.get("usage") or {}).get("pages") or 0
+
+    merged = {key: first[key] for key in ("api", "model") if key in first}
+    merged.update({
+        "content": {
+            "html": "\n".join(html_parts),
+            "markdown": "\n\n".join(markdown_parts),
+            "text": "\n".join(text_parts),
+        },
+        "elements": merged_elements,
+        "usage": {"pages": pages},
+    })
+    return merged
@@ -0,0 +1,174 @@
+# element_index.py
+"""요소 좌표 공간 인덱스와 영역 잘라내기 (Streamlit 비의존)
+
+document-digitization 응답의 elements[].coordinates(0~1 정규화 꼭짓점)로 만든 페이지별
+경계 상자(ElementBox)를 균일 격자에 등록하고, 영역/점 질의는 겹치는 격자 칸의 후보만 비교한다.
+요소가 수만 개여도 질의 비용은 그 영역에 있는 요소 수에 비례한다.
+잘라내기는 업로드한 원본에서 바로 만든다 (API 재호출 없음).
+- 이미지: 해당 영역을 PNG 로
+- PDF: 페이지의 cropbox 를 영역으로 좁힌 한 쪽짜리 PDF (벡터 그대로)
+"""
+import re
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+
+GRID_SIZE = 32  # 페이지를 GRID_SIZE x GRID_SIZE 칸으로 나눔
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg")
+_TAG_PATTERN = re.compile(r'<[^<]+?>')
+
+
+@dataclass
+class ElementBox:
+    """요소 하나의 경계 상자 (index 는 result["elements"] 안의 위치)"""
+    index: int
+    id: int
+    category: str
+    page: int
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+
+    @property
+    def bbox(self):
+        return self.x0, self.y0, self.x1, self.y1
+
+    @property
+    def area(self):
+        return (self.x1 - self.x0) * (self.y1 - self.y0)
+
+
+def element_text(elem):
+    """요소 내용 텍스트 (text 가 없으면 HTML 태그를 걷어냄)"""
+    content = elem.get("content") or {}
+    text = content.get("text") or content.get("markdown")
+    if not text and content.get("html"):
+        text = " ".join(_TAG_PATTERN.sub(" ", content["html"]).split())
+    return text or ""
+
+
+class SpatialIndex:
+    """페이지별 균일 격자 인덱스
+
+    상자는 겹치는 모든 칸에 등록하고, 페이지 격자는 그 페이지를 처음 질의할 때 만든다.
+    boxes 는 ElementBox 이터러블 (ElementStore.boxes()).
+    """
+
+    def __init__(self, boxes, grid_size=GRID_SIZE):
+        self.grid_size = grid_size
+        self._boxes = {}  # 페이지 -> [ElementBox] (응답 순서)
+        self._grids = {}  # 페이지 -> {(cx, cy): [상자 번호]}
+        for box in boxes:
+            self._boxes.setdefault(box.page, []).append(box)
+
+    def __len__(self):
+        return sum(len(boxes) for boxes in self._boxes.values())
+
+    @property
+    def pages(self):
+        return sorted(self._boxes)
+
+    def boxes(self, page):
+        return self._boxes.get(page, [])
+
+    def _cell(self, value):
+        return min(max(int(value * self.grid_size), 0), self.grid_size - 1)
+
+    def _cells(self, x0, y0, x1, y1):
+        for cx in range(self._cell(x0), self._cell(x1) + 1):
+            for cy in range(self._cell(y0), self._cell(y1) + 1):
+                yield cx, cy
+
+    def _grid(self, page):
+        grid = self._grids.get(page)
+        if grid is None:
+            grid = {}
+            for number, box in enumerate(self.boxes(page)):
+                for cell in self._cells(*box.bbox):
+                    grid.setdefault(cell, []).append(number)
+            self._grids[page] = grid
+        return grid
+
+    def query_region(self, page, x0, y0, x1, y1, categories=None, contained=False):
+        """영역과 겹치는(contained=True 면 영역 안에 완전히 들어간) 요소를 응답 순서로"""
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        boxes = self.boxes(page)
+        grid = self._grid(page)
+        seen = set()
+        found = []
+        for cell in self._cells(x0, y0, x1, y1):
+            for number in grid.get(cell, ()):
+                if number in seen:
+                    continue
+                seen.add(number)
+                box = boxes[number]
+                if categories and box.category not in categories:
+                    continue
+                if contained:
+                    hit = box.x0 >= x0 and box.x1 <= x1 and box.y0 >= y0 and box.y1 <= y1
+                else:
+                    hit = box.x0 <= x1 and box.x1 >= x0 and box.y0 <= y1 and box.y1 >= y0
+                if hit:
+                    found.append(number)
+        return [boxes[number] for number in sorted(found)]
+
+    def query_point(self, page, x, y, categories=None):
+        """점을 포함하는 요소 (작은 상자 = 가장 구체적인 요소부터)"""
+        return sorted(self.query_region(page, x, y, x, y, categories), key=lambda box: box.area)
+
+
+def _extension(file_name):
+    return file_name.rsplit(".", 1)[-1].lower() if "." in file_name else ""
+
+
+def _stream(source):
+    # 바이트 또는 되감을 수 있는 바이너리 스트림(Streamlit UploadedFile 등)
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def page_size(source, file_name, page):
+    """페이지 (가로, 세로): PDF 는 mediabox(pt), 이미지는 픽셀, 그 밖의 형식은 None"""
+    extension = _extension(file_name)
+    if extension == "pdf":
+        from pypdf import PdfReader  # PDF 를 실제로 다룰 때만 로드
+
+        box = PdfReader(_stream(source)).pages[page - 1].mediabox
+        return float(box.width), float(box.height)
+    if extension in IMAGE_EXTENSIONS:
+        with Image.open(_stream(source)) as image:
+            return image.size
+    return None
+
+
+def crop_region(source, file_name, page, bbox, padding=0.005):
+    """정규화 영역(x0, y0, x1, y1)을 원본에서 잘라 (바이트, 확장자) 반환, 지원하지 않는 형식은 None"""
+    x0, y0, x1, y1 = bbox
+    x0, y0 = max(x0 - padding, 0.0), max(y0 - padding, 0.0)
+    x1, y1 = min(x1 + padding, 1.0), min(y1 + padding, 1.0)
+    extension = _extension(file_name)
+    buffer = BytesIO()
+    if extension == "pdf":
+        from pypdf import PdfReader, PdfWriter
+        from pypdf.generic import RectangleObject
+
+        # 회전(/Rotate)된 페이지는 고려하지 않음
+        writer = PdfWriter()
+        cropped = writer.add_page(PdfReader(_stream(source)).pages[page - 1])
+        box = cropped.mediabox
+        left, top = float(box.left), float(box.top)
+        width, height = float(box.width), float(box.height)
+        cropped.cropbox = RectangleObject([left + x0 * width, top - y1 * height, left + x1 * width, top - y0 * height])
+        writer.write(buffer)
+        return buffer.getvalue(), "pdf"
+    if extension in IMAGE_EXTENSIONS:
+        with Image.open(_stream(source)) as image:
+            width, height = image.size
+            image.crop((round(x0 * width), round(y0 * height), round(x1 * width), round(y1 * height))).save(buffer, "PNG")
+        return buffer.getvalue(), "png"
+    return None
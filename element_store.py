@@ -0,0 +1,292 @@
+# element_store.py
+"""파싱 결과 요소의 압축 보관 (Streamlit 비의존)
+
+응답의 elements 는 요소 하나마다 dict 여러 개(요소, content, 좌표 꼭짓점)와
+base64 이미지 문자열을 그대로 품고 있어 결과를 세션에 오래 들고 있기에 무겁다.
+ElementStore 는 같은 내용을 열(column) 단위로 보관한다.
+- id/page/카테고리 코드/좌표: array 숫자 배열 (좌표의 정수 값은 따로 표시해 int 로 되돌림)
+- content.html/markdown/text: 요소별 문자열 리스트 (없으면 None)
+- base64_encoding: BlobSpool 에 이어 쓰고 (offset, length) 참조만 보관,
+  이미지를 보거나 내려받을 때만 읽어서 디코딩 (max_size 를 넘으면 임시 파일로)
+- 그 밖의 키: 그런 키가 있는 요소만 dict 로
+- 키 순서: (요소 키, content 키) 조합을 코드로 (응답 안에서 몇 가지뿐)
+store[i] 는 원본과 같은 요소 dict(키 순서 포함)를 그때그때 만들어 돌려준다.
+"""
+import base64
+import json
+import sys
+import tempfile
+import threading
+from array import array
+
+from element_index import ElementBox, element_text
+
+BLOB_SPOOL_SIZE = 4 * 1024 * 1024
+_CONTENT_KEYS = ("html", "markdown", "text")
+# 응답에 있었는지 구분하는 플래그 (없던 키를 만들어 내지 않도록)
+_HAS_ID, _HAS_PAGE, _HAS_CATEGORY, _HAS_COORDINATES, _HAS_CONTENT = 1, 2, 4, 8, 16
+
+
+class BlobSpool:
+    """base64 문자열을 이어 붙여 두는 스풀 (max_size 를 넘으면 디스크의 임시 파일로)"""
+
+    def __init__(self, max_size=BLOB_SPOOL_SIZE):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_size)
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def append(self, text):
+        data = text.encode("ascii")
+        with self._lock:
+            self._file.seek(self.size)
+            self._file.write(data)
+            offset = self.size
+            self.size += len(data)
+        return offset, len(data)
+
+    def read(self, offset, length):
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    @property
+    def in_memory(self):
+        return self.size <= self._max_size
+
+    def close(self):
+        self._file.close()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_point(point):
+    return (isinstance(point, dict) and len(point) == 2 and "x" in point and "y" in point
+            and _is_number(point["x"]) and _is_number(point["y"]))
+
+
+class ElementStore:
+    """elements 리스트를 열 단위로 보관하는 읽기 전용 시퀀스"""
+
+    def __init__(self, elements, spool_size=BLOB_SPOOL_SIZE):
+        self._flags = array("B")
+        self._ids = array("q")
+        self._pages = array("l")
+        self._category_codes = array("H")
+        self._categories = []          # 코드 -> 카테고리 이름
+        self._coord_offsets = array("L", [0])
+        self._coords = array("d")      # x, y 를 번갈아
+        self._int_coords = None        # 정수였던 좌표 값 표시 (bytearray, 처음 나올 때 만듦)
+        self._html, self._markdown, self._text = [], [], []
+        self._blob_offsets = array("q")
+        self._blob_lengths = array("q")
+        self._shape_codes = array("H")
+        self._shapes = []              # 코드 -> (요소 키 순서, content 키 순서), 응답마다 몇 가지뿐
+        self._extras = {}              # 요소 위치 -> 그 밖의 최상위 키
+        self._content_extras = {}      # 요소 위치 -> content 의 그 밖의 키
+        self._spool = None
+        self._spool_size = spool_size
+        codes, shapes = {}, {}
+        for elem in elements:
+            self._append(elem, codes, shapes)
+
+    def _append(self, elem, codes, shapes):
+        index = len(self._flags)
+        flags = 0
+        extras = {}
+        for key, value in elem.items():
+            if key in ("id", "page") and isinstance(value, int) and not isinstance(value, bool):
+                flags |= _HAS_ID if key == "id" else _HAS_PAGE
+            elif key == "category" and isinstance(value, str):
+                flags |= _HAS_CATEGORY
+            elif key == "coordinates" and isinstance(value, list) and all(_is_point(p) for p in value):
+                flags |= _HAS_COORDINATES
+            elif key == "content" and isinstance(value, dict):
+                flags |= _HAS_CONTENT
+            elif key != "base64_encoding" or not isinstance(value, str):
+                extras[key] = value
+        self._flags.append(flags)
+        self._ids.append(elem["id"] if flags & _HAS_ID else -1)
+        self._pages.append(elem["page"] if flags & _HAS_PAGE else 0)
+
+        category = elem["category"] if flags & _HAS_CATEGORY else "unknown"
+        if category not in codes:
+            codes[category] = len(self._categories)
+            self._categories.append(category)
+        self._category_codes.append(codes[category])
+
+        if flags & _HAS_COORDINATES:
+            for point in elem["coordinates"]:
+                for value in (point["x"], point["y"]):
+                    is_int = isinstance(value, int)
+                    if is_int and self._int_coords is None:
+                        self._int_coords = bytearray(len(self._coords))
+                    if self._int_coords is not None:
+                        self._int_coords.append(is_int)
+                    self._coords.append(value)
+        self._coord_offsets.append(len(self._coords))
+
+        content = elem["content"] if flags & _HAS_CONTENT else {}
+        shape = (tuple(elem), tuple(content))
+        if shape not in shapes:
+            shapes[shape] = len(self._shapes)
+            self._shapes.append(shape)
+        self._shape_codes.append(shapes[shape])
+        self._html.append(content.get("html"))
+        self._markdown.append(content.get("markdown"))
+        self._text.append(content.get("text"))
+        content_extras = {key: value for key, value in content.items() if key not in _CONTENT_KEYS}
+        if content_extras:
+            self._content_extras[index] = content_extras
+
+        payload = elem.get("base64_encoding")
+        if isinstance(payload, str):
+            if self._spool is None:
+                self._spool = BlobSpool(self._spool_size)
+            offset, length = self._spool.append(payload)
+        else:
+            offset, length = -1, 0
+        self._blob_offsets.append(offset)
+        self._blob_lengths.append(length)
+        if extras:
+            self._extras[index] = extras
+
+    def __len__(self):
+        return len(self._flags)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.element(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.element(index)
+
+    # 열 단위 접근 (dict 를 만들지 않음)
+    def category(self, index):
+        return self._categories[self._category_codes[index]]
+
+    def page(self, index):
+        return self._pages[index] if self._flags[index] & _HAS_PAGE else None
+
+    def element_id(self, index):
+        return self._ids[index] if self._flags[index] & _HAS_ID else None
+
+    def coordinates(self, index):
+        start, end = self._coord_offsets[index], self._coord_offsets[index + 1]
+        coords, ints = self._coords, self._int_coords
+        if ints is None:
+            return [{"x": coords[i], "y": coords[i + 1]} for i in range(start, end, 2)]
+        values = [int(coords[i]) if ints[i] else coords[i] for i in range(start, end)]
+        return [{"x": values[i], "y": values[i + 1]} for i in range(0, end - start, 2)]
+
+    def bbox(self, index):
+        start, end = self._coord_offsets[index], self._coord_offsets[index + 1]
+        if start == end:
+            return None
+        xs, ys = self._coords[start:end:2], self._coords[start + 1:end:2]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def content(self, index):
+        extras = self._content_extras.get(index, {})
+        columns = {"html": self._html, "markdown": self._markdown, "text": self._text}
+        return {
+            key: extras[key] if key in extras else columns[key][index]
+            for key in self._shapes[self._shape_codes[index]][1]
+        }
+
+    def text(self, index):
+        return element_text({"content": self.content(index)})
+
+    def has_base64(self, index):
+        return self._blob_offsets[index] >= 0
+
+    def base64_size(self, index):
+        """base64 문자열 길이 (읽지 않음)"""
+        return self._blob_lengths[index]
+
+    def base64_text(self, index):
+        if not self.has_base64(index):
+            return None
+        return self._spool.read(self._blob_offsets[index], self._blob_lengths[index]).decode("ascii")
+
+    def image_bytes(self, index):
+        """base64 를 그때 읽어 디코딩한 원본 바이트"""
+        return base64.b64decode(self._spool.read(self._blob_offsets[index], self._blob_lengths[index]))
+
+    def base64_head(self, index, size=16):
+        """형식 판별용 앞부분 (base64 문자 size 개)"""
+        return self._spool.read(self._blob_offsets[index], min(size, self._blob_lengths[index])).decode("ascii")
+
+    def element(self, index, include_base64=True):
+        """원본과 같은 키 순서의 요소 dict (include_base64=False 면 base64_encoding 은 빼고)"""
+        extras = self._extras.get(index, {})
+        elem = {}
+        for key in self._shapes[self._shape_codes[index]][0]:
+            if key in extras:
+                elem[key] = extras[key]
+            elif key == "base64_encoding":
+                if include_base64:
+                    elem[key] = self.base64_text(index)
+            elif key == "category":
+                elem[key] = self.category(index)
+            elif key == "content":
+                elem[key] = self.content(index)
+            elif key == "coordinates":
+                elem[key] = self.coordinates(index)
+            elif key == "id":
+                elem[key] = self._ids[index]
+            elif key == "page":
+                elem[key] = self._pages[index]
+        return elem
+
+    def category_counts(self):
+        counts = [0] * len(self._categories)
+        for code in self._category_codes:
+            counts[code] += 1
+        return {self._categories[code]: n for code, n in enumerate(counts)}
+
+    def base64_indices(self):
+        return [index for index, offset in enumerate(self._blob_offsets) if offset >= 0]
+
+    def boxes(self):
+        """좌표가 있는 요소의 ElementBox (SpatialIndex 입력)"""
+        for index in range(len(self)):
+            bbox = self.bbox(index)
+            if bbox is not None:
+                element_id = self._ids[index] if self._flags[index] & _HAS_ID else index
+                yield ElementBox(index, element_id, self.category(index), self.page(index) or 1, *bbox)
+
+    def memory_bytes(self):
+        """대략적인 메모리 사용량 (배열 + 문자열 + 메모리에 있는 스풀)"""
+        arrays = (self._flags, self._shape_codes, self._ids, self._pages, self._category_codes, self._coord_offsets,
+                  self._coords, self._blob_offsets, self._blob_lengths)
+        total = sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+        for values in (self._html, self._markdown, self._text):
+            total += sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values if v is not None)
+        if self._int_coords is not None:
+            total += len(self._int_coords)
+        if self._spool is not None and self._spool.in_memory:
+            total += self._spool.size
+        return total
+
+    def iter_json(self, indent=2, level=0):
+        """요소 리스트를 JSON 텍스트 조각으로 (요소를 하나씩 만들어 직렬화)
+
+        json.dumps(elements, ensure_ascii=False, indent=indent) 를 level 단계 안쪽에 둔 것과 같은 모양.
+        """
+        if not len(self):
+            yield "[]"
+            return
+        inner = "\n" + " " * (indent * (level + 1))
+        yield "[" + inner
+        for index in range(len(self)):
+            if index:
+                yield "," + inner
+            yield json.dumps(self.element(index), ensure_ascii=False, indent=indent).replace("\n", inner)
+        yield "\n" + " " * (indent * level) + "]"
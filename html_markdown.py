@@ -0,0 +1,195 @@
+# html_markdown.py
+"""document-digitization HTML → Markdown 변환 (Streamlit 비의존)
+
+표 구간과 표 밖 구간을 번갈아 finditer(pos, endpos)로 훑으며 태그 사이 텍스트를
+바로 Markdown 조각으로 쓴다. 문자열 전체를 매번 복사하는 re.sub 체인과 달리
+중간 사본을 만들지 않고, 여러 줄에 걸친 <p>/<h1> 블록도 그대로 처리된다.
+- 제목(h1~h6), 단락, 줄바꿈, 순서/비순서 목록(중첩), 굵게/기울임, 인라인 코드
+- 표는 GFM 표로 변환 (병합 셀은 html_tables 의 격자 그대로 펼치고, 머리글이 여러 줄이면 "상위 / 하위" 로 합침)
+"""
+import html
+import re
+
+from telemetry import timed
+
+# 주석 또는 태그(닫힘 여부, 이름, 속성)
+TAG_PATTERN = re.compile(r'<(?:!--.*?--|(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*))>', re.DOTALL)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+_HEADINGS = {f"h{i}": "#" * i + " " for i in range(1, 7)}
+_EMPHASIS = {"strong": "**", "b": "**", "em": "*", "i": "*", "code": "`"}
+_BLOCKS = {"p", "div", "section", "article", "header", "footer", "figure", "figcaption",
+           "caption", "blockquote", "address"}
+_SKIPPED = {"script", "style", "head", "title"}
+
+
+def decode_text(text):
+    """HTML 엔티티를 풀고 공백 연속을 한 칸으로 줄임"""
+    if "&" in text:
+        text = html.unescape(text)
+    if "\n" in text or "  " in text or "\t" in text or "\r" in text:
+        text = _WHITESPACE_PATTERN.sub(" ", text)
+    return text
+
+
+def _escape_cell(text):
+    return text.replace("|", "\\|")
+
+
+def render_gfm_table(rows):
+    """행 목록(셀 문자열 리스트)을 GFM 표 문자열로 변환, 첫 행을 헤더로 사용"""
+    width = max(len(row) for row in rows)
+    lines = []
+    for i, row in enumerate(rows):
+        cells = [_escape_cell(cell) for cell in row] + [""] * (width - len(row))
+        lines.append("| " + " | ".join(cells) + " |")
+        if i == 0:
+            lines.append("|" + " --- |" * width)
+    return "\n".join(lines)
+
+
+class _MarkdownWriter:
+    """블록 사이 빈 줄을 지연 출력하며 Markdown 조각을 모음"""
+
+    def __init__(self):
+        self.parts = []
+        self.pending_newlines = 0
+        self.at_line_start = True
+
+    def block(self, newlines=2):
+        if newlines > self.pending_newlines:
+            self.pending_newlines = newlines
+
+    def write(self, text, raw=False):
+        if not raw and (self.pending_newlines or self.at_line_start):
+            # 줄 첫머리의 공백은 버림 (블록 사이 공백만 있는 텍스트 포함)
+            text = text.lstrip(" ")
+            if not text:
+                return
+        if self.pending_newlines:
+            if self.parts:
+                self.parts[-1] = self.parts[-1].rstrip(" ")
+                self.parts.append("\n" * self.pending_newlines)
+            self.pending_newlines = 0
+        self.parts.append(text)
+        self.at_line_start = False
+
+    def getvalue(self):
+        return "".join(self.parts).strip()
+
+
+_TABLE_BLOCK_PATTERN = re.compile(r'<table\b[^>]*>(.*?)</table\s*>', re.DOTALL | re.IGNORECASE)
+
+
+def _inline_tag(match):
+    tag = match.group(2)
+    if tag is None:
+        return ""
+    tag = tag.lower()
+    if tag in _EMPHASIS:
+        return _EMPHASIS[tag]
+    return " " if tag == "br" else ""
+
+
+def _plain_tag(match):
+    tag = match.group(2)
+    return " " if tag is not None and tag.lower() == "br" else ""
+
+
+def inline_markdown(fragment, emphasis=True):
+    """셀 등 한 줄짜리 HTML 조각을 인라인 Markdown 으로 변환 (emphasis=False 면 평문)"""
+    if "<" in fragment:
+        fragment = TAG_PATTERN.sub(_inline_tag if emphasis else _plain_tag, fragment)
+    return decode_text(fragment).strip()
+
+
+def _table_rows(html_content, begin, end):
+    """html_content[begin:end] 구간(표 하나)의 GFM 행 목록
+
+    colspan/rowspan 은 html_tables 의 격자(_TableBuilder)가 차지하는 모든 칸에 값을 채운 그대로 쓰고,
+    머리글 행이 여러 줄이면 TableData.columns 처럼 "상위 / 하위" 한 줄로 합친다.
+    """
+    from html_tables import extract_tables_from_html  # html_tables 가 이 모듈을 import 하므로 순환 방지
+
+    tables = extract_tables_from_html(html_content, begin, end, emphasis=True)
+    if not tables:
+        return []
+    table = tables[0]
+    rows = table.rows()
+    if table.header_rows > 1:
+        return [table.columns] + rows[table.header_rows:]
+    return rows
+
+
+def _write_inline(writer, html_content, begin, end, state):
+    """표 밖 구간의 태그를 순서대로 처리 (state: 목록 스택, 건너뛰기 깊이)"""
+    lists = state["lists"]
+    position = begin
+    for match in TAG_PATTERN.finditer(html_content, begin, end):
+        # 직전 태그와 이번 태그 사이의 텍스트
+        tag_start = match.start()
+        if tag_start > position and not state["skip_depth"]:
+            writer.write(decode_text(html_content[position:tag_start]))
+        position = match.end()
+
+        closing, tag, _ = match.groups()
+        if tag is None:
+            continue  # 주석
+        tag = tag.lower()
+        start = not closing
+
+        if tag in _SKIPPED:
+            if start:
+                state["skip_depth"] += 1
+            elif state["skip_depth"]:
+                state["skip_depth"] -= 1
+        elif state["skip_depth"]:
+            continue
+        elif tag in _EMPHASIS:
+            writer.write(_EMPHASIS[tag])
+        elif tag in _BLOCKS:
+            writer.block(2)
+        elif tag == "br":
+            writer.block(1)
+        elif tag in _HEADINGS:
+            writer.block(2)
+            if start:
+                writer.write(_HEADINGS[tag], raw=True)
+        elif tag == "li":
+            writer.block(1)
+            if start:
+                marker = "- "
+                if lists and lists[-1][0] == "ol":
+                    marker = f"{lists[-1][1]}. "
+                    lists[-1][1] += 1
+                writer.write("  " * max(len(lists) - 1, 0) + marker, raw=True)
+        elif tag == "ul" or tag == "ol":
+            if start:
+                writer.block(1 if lists else 2)
+                lists.append([tag, 1])
+            elif lists:
+                lists.pop()
+                writer.block(1 if lists else 2)
+    if position < end and not state["skip_depth"]:
+        writer.write(decode_text(html_content[position:end]))
+
+
+@timed("html_to_markdown")
+def html_to_markdown(html_content):
+    """HTML을 마크다운으로 변환"""
+    writer = _MarkdownWriter()
+    state = {"lists": [], "skip_depth": 0}
+    position = 0
+    # 문자열을 자르지 않고 (pos, endpos) 범위로 표 밖/표 안 구간을 번갈아 처리
+    for table in _TABLE_BLOCK_PATTERN.finditer(html_content):
+        _write_inline(writer, html_content, position, table.start(), state)
+        position = table.end()
+        if state["skip_depth"]:
+            continue
+        rows = _table_rows(html_content, table.start(), table.end())
+        if rows:
+            writer.block(2)
+            writer.write(render_gfm_table(rows), raw=True)
+            writer.block(2)
+    _write_inline(writer, html_content, position, len(html_content), state)
+    return writer.getvalue()
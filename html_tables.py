@@ -0,0 +1,254 @@
+# html_tables.py
+"""document-digitization HTML 표 추출 (Streamlit 비의존)
+
+문서 전체를 정규식 하나로 한 번만 훑으면서 표/행/셀 토큰을 읽고,
+colspan/rowspan 으로 병합된 셀은 차지하는 모든 칸에 같은 값을 채운다.
+값은 처음부터 열(column) 단위 리스트로 쌓아 pd.DataFrame 에 그대로 넘긴다.
+<thead> 안의 행이나 모든 셀이 <th> 인 선두 행은 머리글로 보고,
+머리글이 여러 줄이면 "상위 / 하위" 형태의 열 이름으로 합친다.
+전체 표 Excel 내보내기(write_tables_workbook)도 DataFrame 을 거치지 않고
+열 리스트에서 행을 바로 흘려 보낸다.
+"""
+import re
+from itertools import islice
+from dataclasses import dataclass, field
+
+from html_markdown import inline_markdown
+from telemetry import timed
+
+# 표 시작/끝 | thead 시작/끝 | 행 시작 | 셀(th/td 구분, 속성, 내용)
+_TABLE_TOKEN_PATTERN = re.compile(
+    r'<(/?)table\b[^>]*>|<(/?)thead\b[^>]*>|(<tr\b[^>]*>)|<t([hd])\b([^>]*)>(.*?)</t[hd]\s*>',
+    re.DOTALL | re.IGNORECASE
+)
+# 태그/엔티티/연속 공백이 있는 셀만 정리 (나머지는 strip 만)
+_NEEDS_CLEANUP = re.compile(r'[<&\t\r\n]| {2}')
+_SPAN_PATTERN = re.compile(r'(colspan|rowspan)\s*=\s*["\']?(\d+)', re.IGNORECASE)
+# 잘못된 속성값으로 인한 메모리 폭주 방지
+MAX_SPAN = 1000
+# 엑셀 열 너비 (글자 수 기준)
+MIN_COLUMN_WIDTH = 8
+MAX_COLUMN_WIDTH = 50
+
+
+@dataclass
+class TableData:
+    """열 단위로 저장한 표 (columns[i] 의 값은 data[i])"""
+    data: list = field(default_factory=list)    # 열별 값 리스트 (머리글 행 포함)
+    header_rows: int = 0
+    n_rows: int = 0
+
+    @property
+    def columns(self):
+        """머리글 행을 합친 고유한 열 이름"""
+        names = []
+        for index, column in enumerate(self.data):
+            parts = []
+            for value in column[:self.header_rows]:
+                if value and (not parts or parts[-1] != value):
+                    parts.append(value)
+            names.append(" / ".join(parts) or f"열{index + 1}")
+        return _dedupe(names)
+
+    def body(self):
+        """머리글을 뺀 열별 값 리스트"""
+        return [column[self.header_rows:] for column in self.data]
+
+    def rows(self):
+        """행 단위 값 (원본 데이터 표시용)"""
+        return [list(row) for row in zip(*self.data)]
+
+
+def _dedupe(names):
+    seen = {}
+    unique = []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        unique.append(name if count == 0 else f"{name} ({count + 1})")
+    return unique
+
+
+class _TableBuilder:
+    """셀을 격자에 배치하며 열 리스트를 채움
+
+    한 행의 셀은 항상 0번 열부터 빈틈없이 놓이므로(rowspan 으로 내려온 칸 포함)
+    행이 끝나면 self.column 이후 열만 빈 값으로 채우면 된다.
+    """
+
+    def __init__(self, emphasis=False):
+        self.table = TableData()
+        self.emphasis = emphasis  # 셀 안의 굵게/기울임을 Markdown 으로 남길지 (GFM 표 변환용)
+        self.carry = {}          # 열 번호 -> [남은 행 수, 값] (위 행의 rowspan)
+        self.row_open = False
+        self.column = 0
+        self.header_candidate = True  # 지금까지의 행이 모두 머리글 조건을 만족하는지
+        self.row_all_th = True
+        self.in_thead = False
+        self.row_in_thead = False
+
+    def _place(self, value):
+        data = self.table.data
+        while len(data) <= self.column:
+            data.append([""] * self.table.n_rows)
+        data[self.column].append(value)
+        self.column += 1
+
+    def _fill_carry(self):
+        """rowspan 으로 내려온 값을 현재 위치부터 연속된 칸에 채움"""
+        while self.column in self.carry:
+            remaining = self.carry[self.column]
+            if remaining[0] == 1:
+                del self.carry[self.column]
+            remaining[0] -= 1
+            self._place(remaining[1])
+
+    def start_row(self):
+        if self.row_open:
+            self.end_row()
+        self.row_open = True
+        self.column = 0
+        self.row_all_th = True
+        self.row_in_thead = self.in_thead
+
+    def add_cell(self, is_header, attrs, content):
+        if not self.row_open:
+            self.start_row()
+        if not is_header:
+            self.row_all_th = False
+        if _NEEDS_CLEANUP.search(content):
+            value = inline_markdown(content, emphasis=self.emphasis)
+        else:
+            value = content.strip()
+        if self.carry:
+            self._fill_carry()
+        elif "span" not in attrs and self.column < len(self.table.data):
+            # 병합 없는 일반 셀
+            self.table.data[self.column].append(value)
+            self.column += 1
+            return
+        colspan = rowspan = 1
+        if "span" in attrs:
+            for name, span in _SPAN_PATTERN.findall(attrs):
+                span = min(max(int(span), 1), MAX_SPAN)
+                if name.lower() == "colspan":
+                    colspan = span
+                else:
+                    rowspan = span
+        for _ in range(colspan):
+            if rowspan > 1:
+                self.carry[self.column] = [rowspan - 1, value]
+            else:
+                self.carry.pop(self.column, None)  # 병합 범위가 겹치면 새 셀이 우선
+            self._place(value)
+
+    def end_row(self):
+        if not self.row_open:
+            return
+        self.row_open = False
+        table = self.table
+        if self.carry:
+            self._fill_carry()
+            # 행 끝 이후 열에 걸친 rowspan: 빈칸을 사이에 두고 채움
+            for column in sorted(c for c in self.carry if c > self.column):
+                while self.column < column:
+                    self._place("")
+                self._fill_carry()
+        if self.column == 0:
+            return  # 셀이 없는 행
+        table.n_rows += 1
+        for column in table.data[self.column:]:
+            column.append("")
+        if self.header_candidate and (self.row_in_thead or self.row_all_th):
+            table.header_rows += 1
+        else:
+            self.header_candidate = False
+
+    def finish(self):
+        self.end_row()
+        # rowspan 이 표 끝을 넘어가는 경우는 무시
+        table = self.table
+        if table.header_rows == 0 and table.n_rows > 1:
+            table.header_rows = 1  # 머리글 표시가 없으면 첫 행을 머리글로 사용 (이전 동작)
+        if table.header_rows >= table.n_rows and table.n_rows > 1:
+            table.header_rows = table.n_rows - 1
+        return table
+
+
+@timed("extract_tables_from_html")
+def extract_tables_from_html(html_content, begin=0, end=None, emphasis=False):
+    """HTML(또는 html_content[begin:end] 구간)에서 표를 추출해 TableData 목록으로 반환
+
+    emphasis=True 면 셀 안의 굵게/기울임을 Markdown 으로 남긴다 (html_markdown 의 GFM 표).
+    """
+    tables = []
+    builder = None
+    end = len(html_content) if end is None else end
+    for match in _TABLE_TOKEN_PATTERN.finditer(html_content, begin, end):
+        table_close, thead_close, row, cell_kind, attrs, content = match.groups()
+        if table_close is not None:
+            if builder is not None:
+                table = builder.finish()
+                if table.n_rows:
+                    tables.append(table)
+            builder = None if table_close else _TableBuilder(emphasis)
+        elif builder is None:
+            continue
+        elif cell_kind is not None:
+            builder.add_cell(cell_kind.lower() == "h", attrs, content)
+        elif row is not None:
+            builder.start_row()
+        elif thead_close is not None:
+            builder.in_thead = not thead_close
+    return tables
+
+
+@timed("safe_create_dataframe")
+def safe_create_dataframe(table):
+    """TableData를 DataFrame으로 변환 (열 리스트를 그대로 전달)"""
+    import pandas as pd  # 표를 실제로 볼 때만 로드 (콜드 스타트 단축)
+
+    if not table.n_rows:
+        return pd.DataFrame()
+    if table.n_rows == 1:
+        return pd.DataFrame(dict(zip(range(len(table.data)), table.data)))
+    return pd.DataFrame(dict(zip(table.columns, table.body())))
+
+
+@timed("write_tables_workbook")
+def write_tables_workbook(tables, output):
+    """표마다 시트 하나(Table_1, Table_2, ...)인 xlsx 를 output(경로 또는 바이너리 스트림)에 기록
+
+    xlsxwriter 의 constant_memory 모드로 행을 순서대로 쓰자마자 임시 파일로 내보내므로
+    메모리는 표 개수나 크기와 무관하게 거의 일정하고, 시간은 전체 셀 수에 비례한다.
+    머리글이 있는 표는 safe_create_dataframe 과 같은 열 이름을 첫 행에 쓴다.
+    """
+    import xlsxwriter  # Excel 을 만들 때만 로드
+
+    workbook = xlsxwriter.Workbook(output, {
+        "constant_memory": True,
+        # 셀 값은 모두 문자열: 수식/URL 로 해석하지 않음
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+    })
+    header_format = workbook.add_format({"bold": True, "bottom": 1})
+    try:
+        for index, table in enumerate(tables):
+            sheet = workbook.add_worksheet(f"Table_{index + 1}")
+            if not table.n_rows:
+                continue
+            row = 0
+            if table.n_rows > 1:
+                columns = table.columns
+                for col, name in enumerate(columns):
+                    width = min(max(len(name) + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
+                    sheet.set_column(col, col, width)
+                sheet.write_row(0, 0, columns, header_format)
+                sheet.freeze_panes(1, 0)
+                row = 1
+            # 열 리스트를 행 단위로 한 줄씩 읽어 바로 기록 (본문 복사본을 만들지 않음)
+            for values in islice(zip(*table.data), table.header_rows if row else 0, None):
+                sheet.write_row(row, 0, values)
+                row += 1
+    finally:
+        workbook.close()
@@ -0,0 +1,145 @@
+# image_prep.py
+"""업로드 전 이미지 축소/재압축 (Streamlit 비의존)
+
+휴대폰 사진이나 600dpi 스캔(PNG/JPG)은 한 장에 10~30MB 라 느린 회선에서는 업로드가 대기 시간 대부분을 차지한다.
+OCR/파싱에는 200dpi 안팎이면 충분하므로 document-digitization 으로 보내기 전에
+- EXIF 방향 태그대로 회전 (ImageOps.exif_transpose)
+- 긴 변이 target_dpi x page_long_inches(기본 A4) 픽셀을 넘으면 그 길이로 축소
+  (JPEG 는 draft 로 디코딩 단계에서 먼저 줄여 원본 해상도 전체를 풀지 않음)
+- EXIF/ICC/텍스트 청크 등 메타데이터를 빼고 JPEG 로 다시 저장 (1비트 흑백 스캔은 PNG)
+- 줄어든 비율이 min_savings 보다 작고 회전도 필요 없으면 원본을 그대로 보냄
+결과(PreparedImage)로 원본/전송 바이트와 upload_mbps 기준 예상 업로드 절약 시간을 알려준다.
+"""
+import math
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from element_index import IMAGE_EXTENSIONS
+from telemetry import TELEMETRY, span
+from upload_stream import UploadSource
+
+_ORIENTATION_TAG = 0x0112
+
+
+@dataclass
+class ImagePrepSettings:
+    """이미지 전처리 기준 (secrets [image_prep] 로 조정)"""
+    target_dpi: int = 200             # 페이지 기준 유효 해상도
+    page_long_inches: float = 11.69   # 긴 변 기준 페이지 길이 (A4)
+    jpeg_quality: int = 85
+    min_bytes: int = 512 * 1024       # 이보다 작은 파일은 그대로 보냄
+    min_savings: float = 0.2          # 이보다 적게 줄면 원본을 보냄 (0.2 = 20%)
+    upload_mbps: float = 10.0         # 절약 시간 추정에 쓰는 업로드 속도
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """secrets 등의 dict에서 알려진 키만 골라 설정 생성"""
+        mapping = dict(mapping or {})
+        known = {k: mapping[k] for k in cls.__dataclass_fields__ if k in mapping}
+        return cls(**known)
+
+    @property
+    def max_long_side(self):
+        return round(self.target_dpi * self.page_long_inches)
+
+
+@dataclass
+class PreparedImage:
+    """전처리 결과 (applied=False 면 upload 는 원본 그대로)"""
+    upload: UploadSource
+    original_bytes: int
+    original_size: tuple = None
+    sent_size: tuple = None
+    rotated: bool = False
+    applied: bool = False
+    reason: str = ""
+    upload_mbps: float = 0.0  # 절약 시간 추정 기준
+
+    @property
+    def sent_bytes(self):
+        return self.upload.size
+
+    @property
+    def saved_bytes(self):
+        return self.original_bytes - self.sent_bytes
+
+    @property
+    def saved_ratio(self):
+        return self.saved_bytes / self.original_bytes if self.original_bytes else 0.0
+
+    @property
+    def seconds_saved(self):
+        """upload_mbps 회선에서 줄어든 바이트만큼 아낀 업로드 시간 (추정)"""
+        return max(self.saved_bytes, 0) * 8 / (self.upload_mbps * 1_000_000) if self.upload_mbps else 0.0
+
+
+def is_image(file_name):
+    return "." in file_name and file_name.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+
+
+def _flatten(image):
+    """JPEG 로 저장할 수 있는 RGB/L 로 변환 (투명 배경은 흰색으로)"""
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def prepare_image(upload, settings=None):
+    """이미지 업로드(UploadSource)를 축소/재압축한 PreparedImage, 이미지가 아니면 None"""
+    settings = settings or ImagePrepSettings()
+    if not is_image(upload.name):
+        return None
+    if upload.size < settings.min_bytes:
+        return PreparedImage(upload, upload.size, reason="작은 파일", upload_mbps=settings.upload_mbps)
+    with span("image_prep"):
+        try:
+            upload.stream.seek(0)
+            with Image.open(upload.stream) as image:
+                original_size = image.size
+                scale = settings.max_long_side / max(original_size)
+                if scale < 1:
+                    image.draft(image.mode, (math.ceil(original_size[0] * scale), math.ceil(original_size[1] * scale)))
+                rotated = image.getexif().get(_ORIENTATION_TAG, 1) != 1
+                image = ImageOps.exif_transpose(image)
+                if max(image.size) > settings.max_long_side:
+                    image.thumbnail((settings.max_long_side, settings.max_long_side), Image.LANCZOS)
+                buffer = BytesIO()
+                # 저장할 때 exif/icc_profile/pnginfo 를 넘기지 않으므로 메타데이터는 빠짐
+                if image.mode == "1":
+                    image.save(buffer, "PNG", optimize=True)
+                    extension, mime = "png", "image/png"
+                else:
+                    _flatten(image).save(buffer, "JPEG", quality=settings.jpeg_quality, optimize=True)
+                    extension, mime = "jpg", "image/jpeg"
+                sent_size = image.size
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            return PreparedImage(upload, upload.size, reason=f"이미지를 읽을 수 없음 ({type(e).__name__})",
+                                 upload_mbps=settings.upload_mbps)
+    data = buffer.getvalue()
+    if not rotated and len(data) > upload.size * (1 - settings.min_savings):
+        return PreparedImage(upload, upload.size, original_size, original_size, reason="줄어드는 양이 적음",
+                             upload_mbps=settings.upload_mbps)
+    name = f"{upload.name.rsplit('.', 1)[0]}.{extension}"
+    prepared = PreparedImage(UploadSource.from_bytes(name, data, mime), upload.size, original_size, sent_size,
+                             rotated, applied=True, upload_mbps=settings.upload_mbps)
+    TELEMETRY.inc("upstage_image_prep_saved_bytes_total", max(prepared.saved_bytes, 0))
+    return prepared
+
+
+def describe(prepared):
+    """전처리 결과 한 줄 요약"""
+    if not prepared.applied:
+        return f"🖼️ 원본 그대로 전송 ({prepared.original_bytes / 1024 / 1024:.1f}MB · {prepared.reason})"
+    (w0, h0), (w1, h1) = prepared.original_size, prepared.sent_size
+    return (
+        f"🖼️ 이미지 축소: {prepared.original_bytes / 1024 / 1024:.1f}MB → {prepared.sent_bytes / 1024 / 1024:.1f}MB "
+        f"(-{prepared.saved_ratio:.0%}) · {w0}×{h0} → {w1}×{h1}{' · 회전 보정' if prepared.rotated else ''} · "
+        f"업로드 약 {prepared.seconds_saved:.1f}초 절약 ({prepared.upload_mbps:g} Mbps 기준)"
+    )
@@ -0,0 +1 @@
+"""Upstage API mock 서버와 부하 테스트 실행기 (저장소 루트에서 python -m loadtest.run)"""
@@ -0,0 +1,144 @@
+# loadtest/bench_html.py
+"""HTML 후처리 벤치마크
+
+합성한 document-digitization 스타일 HTML을 페이지 수별로 만들어
+페이지에 있던 이전 구현과 공용 모듈 구현의 실행 시간을 비교한다.
+- markdown: re.sub 체인 vs html_markdown.html_to_markdown
+- tables: 3단 re.findall + 행 패딩 vs html_tables (표 추출 + DataFrame 생성)
+페이지 수 대비 시간의 log-log 기울기가 1에 가까우면 선형이다.
+
+예) python -m loadtest.bench_html --pages 10 50 100 300 --repeat 5
+    python -m loadtest.bench_html --target tables --table-rows 200
+"""
+import argparse
+import math
+import re
+import time
+
+import pandas as pd
+
+from html_markdown import html_to_markdown
+from html_tables import extract_tables_from_html, safe_create_dataframe
+
+
+def legacy_html_to_markdown(html_content):
+    """비교용: 페이지에 있던 이전 구현 (re.sub 10회)"""
+    html_content = re.sub(r'<h1[^>]*>(.*?)</h1>', r'# \1', html_content)
+    html_content = re.sub(r'<h2[^>]*>(.*?)</h2>', r'## \1', html_content)
+    html_content = re.sub(r'<h3[^>]*>(.*?)</h3>', r'### \1', html_content)
+    html_content = html_content.replace('<br>', '\n').replace('<br/>', '\n')
+    html_content = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', html_content)
+    html_content = re.sub(r'<strong>(.*?)</strong>', r'**\1**', html_content)
+    html_content = re.sub(r'<b>(.*?)</b>', r'**\1**', html_content)
+    html_content = re.sub(r'<em>(.*?)</em>', r'*\1*', html_content)
+    html_content = re.sub(r'<i>(.*?)</i>', r'*\1*', html_content)
+    html_content = re.sub(r'<[^>]+>', '', html_content)
+    return html_content.strip()
+
+
+def legacy_tables_to_dataframes(html_content):
+    """비교용: 페이지에 있던 이전 표 추출 + DataFrame 생성"""
+    tables = []
+    for table_html in re.findall(r'<table[^>]*>(.*?)</table>', html_content, re.DOTALL):
+        rows = []
+        for row_html in re.findall(r'<tr[^>]*>(.*?)</tr>', table_html, re.DOTALL):
+            cells = [re.sub(r'<[^>]+>', '', cell).strip()
+                     for cell in re.findall(r'<t[hd][^>]*>(.*?)</t[hd]>', row_html, re.DOTALL)]
+            if cells:
+                rows.append(cells)
+        if rows:
+            tables.append(rows)
+    frames = []
+    for table_data in tables:
+        max_cols = max(len(row) for row in table_data)
+        normalized = [row + [''] * (max_cols - len(row)) for row in table_data]
+        if len(normalized) > 1:
+            frames.append(pd.DataFrame(normalized[1:], columns=normalized[0]))
+        else:
+            frames.append(pd.DataFrame(normalized))
+    return frames
+
+
+def tables_to_dataframes(html_content):
+    return [safe_create_dataframe(table) for table in extract_tables_from_html(html_content)]
+
+
+def build_page_html(page, table_rows=12):
+    """보고서 한 페이지 분량의 합성 HTML (병합 머리글이 있는 표 포함)"""
+    element = page * 100
+    parts = [f"<h1 id='{element}' style='font-size:22px'>제{page}장 사업의 개요</h1>"]
+    for i in range(6):
+        parts.append(
+            f"<p id='{element + i + 1}' data-category='paragraph' style='font-size:14px'>"
+            f"당사는 {page}분기 중 <strong>매출액</strong>이 전년 대비 <em>{i + 3}.{page % 10}%</em> 증가하였으며,\n"
+            "주요 종속회사의 영업 실적과 재무 상태는 다음과 같습니다. "
+            "자세한 내용은 연결재무제표 주석을 참고하시기 바랍니다.</p>"
+        )
+    parts.append("<ul>" + "".join(f"<li>사업부문 {j}: 제품 및 서비스</li>" for j in range(4)) + "</ul>")
+    rows = [
+        "<tr><th rowspan='2'>구분</th><th colspan='2'>금액</th><th rowspan='2'>증감률</th></tr>",
+        "<tr><th>당기</th><th>전기</th></tr>",
+    ]
+    rows += [
+        f"<tr><td>항목 {r}</td><td>{(page + 1) * (r + 7) * 1013:,}</td>"
+        f"<td>{(page + 2) * (r + 5) * 997:,}</td><td>{r % 9}.{page % 7}%</td></tr>"
+        for r in range(table_rows)
+    ]
+    parts.append(f"<table id='{element + 50}'>" + "".join(rows) + "</table><br>")
+    return "".join(parts)
+
+
+def build_document_html(pages, table_rows=12):
+    return "\n".join(build_page_html(page, table_rows) for page in range(1, pages + 1))
+
+
+def best_time(fn, argument, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scaling_exponent(sizes, seconds):
+    """log(시간) ~ k·log(크기) 최소제곱 기울기 k"""
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(t) for t in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    denominator = sum((x - mean_x) ** 2 for x in xs) or 1.0
+    return numerator / denominator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTML 후처리 벤치마크")
+    parser.add_argument("--target", choices=["markdown", "tables"], default="markdown")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 100, 300])
+    parser.add_argument("--table-rows", type=int, default=12, help="페이지당 표의 데이터 행 수")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.target == "markdown":
+        implementations = [("legacy(re.sub)", legacy_html_to_markdown), ("single-pass", html_to_markdown)]
+    else:
+        implementations = [("legacy(findall)", legacy_tables_to_dataframes), ("columnar", tables_to_dataframes)]
+    results = {name: [] for name, _ in implementations}
+    print(f"{'pages':>6} {'KB':>8} " + " ".join(f"{name:>16}" for name, _ in implementations))
+    for pages in args.pages:
+        document = build_document_html(pages, args.table_rows)
+        row = []
+        for name, fn in implementations:
+            seconds = best_time(fn, document, args.repeat)
+            results[name].append(seconds)
+            row.append(f"{seconds * 1000:>13.1f} ms")
+        print(f"{pages:>6} {len(document.encode('utf-8')) / 1024:>8.0f} " + " ".join(row))
+
+    if len(args.pages) > 1:
+        print()
+        for name, seconds in results.items():
+            print(f"{name:>16}: 크기 대비 시간 기울기 {scaling_exponent(args.pages, seconds):.2f} (1.0 = 선형)")
+
+
+if __name__ == "__main__":
+    main()
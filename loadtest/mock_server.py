@@ -0,0 +1,300 @@
+# loadtest/mock_server.py
+"""Upstage API(https://api.upstage.ai/v1) 로컬 대역 서버
+
+- POST /v1/chat/completions       : 일반 JSON 응답 / stream=true 이면 SSE 스트리밍
+- POST /v1/document-digitization  : 문서 파싱/OCR 응답 (elements + content)
+- POST /v1/document-digitization/async, GET /v1/document-digitization/requests/{id}
+                                  : 비동기 작업 제출/상태 조회 (배치 결과는 download_url 로 받음)
+
+업로드한 파일이 PDF 이면 응답의 페이지 수를 실제 페이지 수에 맞춘다.
+
+지연 시간, 오류율(429/500), 응답 크기를 MockConfig 로 조절한다.
+단독 실행: python -m loadtest.mock_server --port 8765 --latency-ms 300
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 200.0        # 첫 바이트까지의 평균 지연
+    jitter_ms: float = 50.0          # 지연 편차 (균등 분포 ±)
+    error_rate: float = 0.0          # 429/500 오류 비율 (0~1)
+    retry_after_s: float = 1.0       # 429 응답의 Retry-After
+    reply_tokens: int = 200          # 채팅 응답 토큰(청크) 수
+    token_interval_ms: float = 5.0   # 스트리밍 청크 간격
+    doc_pages: int = 5               # 문서 응답의 페이지 수
+    doc_elements: int = 50           # 문서 응답의 요소 수
+    element_chars: int = 400         # 요소 하나의 텍스트 길이
+    async_polls: int = 2             # 비동기 작업이 completed 가 되기까지의 상태 조회 횟수
+    async_batch_pages: int = 100     # 비동기 작업 결과의 배치당 페이지 수
+
+
+_SAMPLE_TEXT = "업스테이지 솔라 부하 테스트 샘플 문장입니다. "
+_PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page\b")
+
+
+def _filler(chars):
+    repeat = chars // len(_SAMPLE_TEXT) + 1
+    return (_SAMPLE_TEXT * repeat)[:chars]
+
+
+def build_document_response(config):
+    """설정된 크기의 document-digitization 응답 생성"""
+    elements = []
+    html_parts = []
+    categories = ["heading1", "paragraph", "paragraph", "table", "paragraph", "figure"]
+    per_page = -(-config.doc_elements // max(config.doc_pages, 1))
+    for i in range(config.doc_elements):
+        category = categories[i % len(categories)]
+        text = _filler(config.element_chars)
+        if category == "heading1":
+            html = f"<h1 id='{i}'>{text[:40]}</h1>"
+        elif category == "table":
+            html = f"<table id='{i}'><tr><th>항목</th><th>값</th></tr><tr><td>{text[:40]}</td><td>{i}</td></tr></table>"
+        else:
+            html = f"<p id='{i}'>{text}</p>"
+        html_parts.append(html)
+        height = 0.9 / per_page
+        top = round(0.05 + (i % per_page) * height, 4)
+        height = round(height * 0.8, 4)
+        elements.append({
+            "category": category,
+            "content": {"html": html, "markdown": "", "text": text},
+            # 페이지 안에서 위에서 아래로 겹치지 않게 배치
+            "coordinates": [
+                {"x": 0.1, "y": top}, {"x": 0.9, "y": top},
+                {"x": 0.9, "y": top + height}, {"x": 0.1, "y": top + height},
+            ],
+            "id": i,
+            "page": i * config.doc_pages // max(config.doc_elements, 1) + 1,
+        })
+    return {
+        "api": "2.0",
+        "content": {"html": "\n".join(html_parts), "markdown": "", "text": ""},
+        "elements": elements,
+        "model": "document-parse-mock",
+        "usage": {"pages": config.doc_pages},
+    }
+
+
+def _document_config(config, raw):
+    """업로드 본문에 PDF 페이지 객체가 있으면 그 수만큼 페이지/요소를 만들도록 설정 조정"""
+    pages = len(_PDF_PAGE_PATTERN.findall(raw))
+    if not pages:
+        return config
+    per_page = max(config.doc_elements // max(config.doc_pages, 1), 1)
+    return replace(config, doc_pages=pages, doc_elements=pages * per_page)
+
+
+class MockUpstageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive 지원
+    config = MockConfig()
+    jobs = {}  # 비동기 작업 id -> {"config", "polls"}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _sleep_latency(self):
+        cfg = self.config
+        delay = max(cfg.latency_ms + random.uniform(-cfg.jitter_ms, cfg.jitter_ms), 0)
+        time.sleep(delay / 1000)
+
+    def _send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self):
+        """오류율에 따라 429 또는 500 응답을 보내고 True 반환"""
+        if random.random() >= self.config.error_rate:
+            return False
+        if random.random() < 0.5:
+            self._send_json(
+                429,
+                {"error": {"message": "Too many requests", "type": "rate_limit"}},
+                {"Retry-After": str(self.config.retry_after_s)},
+            )
+        else:
+            self._send_json(500, {"error": {"message": "Internal error", "type": "server_error"}})
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        path = self.path.rstrip("/")
+        self._sleep_latency()
+        if self._maybe_fail():
+            return
+        if path.endswith("/chat/completions"):
+            request = json.loads(raw or b"{}")
+            if request.get("stream"):
+                self._stream_chat(request)
+            else:
+                self._send_json(200, self._chat_completion(request))
+        elif path.endswith("/document-digitization"):
+            self._send_json(200, build_document_response(_document_config(self.config, raw)))
+        elif path.endswith("/document-digitization/async"):
+            request_id = uuid.uuid4().hex
+            self.jobs[request_id] = {"config": _document_config(self.config, raw), "polls": 0}
+            self._send_json(200, {"request_id": request_id})
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        match = re.search(r"/document-digitization/(requests|results)/(\w+)(?:/(\d+))?$", path)
+        job = self.jobs.get(match.group(2)) if match else None
+        if job is None:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        cfg = job["config"]
+        if match.group(1) == "results":
+            # 배치 하나의 결과 (페이지 번호는 배치 안에서 1부터)
+            start = int(match.group(3))
+            pages = min(cfg.async_batch_pages, cfg.doc_pages - start + 1)
+            per_page = max(cfg.doc_elements // max(cfg.doc_pages, 1), 1)
+            self._send_json(200, build_document_response(replace(cfg, doc_pages=pages, doc_elements=pages * per_page)))
+            return
+        self._sleep_latency()
+        job["polls"] += 1
+        done = job["polls"] >= cfg.async_polls
+        host, port = self.server.server_address[:2]
+        batches = [
+            {
+                "id": index,
+                "status": "completed" if done else "started",
+                "start_page": start,
+                "end_page": min(start + cfg.async_batch_pages - 1, cfg.doc_pages),
+                "download_url": f"http://{host}:{port}/v1/document-digitization/results/{match.group(2)}/{start}" if done else None,
+            }
+            for index, start in enumerate(range(1, cfg.doc_pages + 1, cfg.async_batch_pages))
+        ]
+        self._send_json(200, {
+            "id": match.group(2),
+            "status": "completed" if done else "started",
+            "total_pages": cfg.doc_pages,
+            "completed_pages": cfg.doc_pages if done else 0,
+            "batches": batches,
+        })
+
+    def _chat_completion(self, request):
+        content = "".join(f"토큰{i} " for i in range(self.config.reply_tokens))
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "solar-pro"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": self.config.reply_tokens, "total_tokens": self.config.reply_tokens},
+        }
+
+    def _stream_chat(self, request):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        model = request.get("model", "solar-pro")
+        for i in range(self.config.reply_tokens):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": f"토큰{i} "}, "finish_reason": None}],
+            }
+            write_event(json.dumps(chunk, ensure_ascii=False))
+            if self.config.token_interval_ms:
+                time.sleep(self.config.token_interval_ms / 1000)
+        write_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class _QuietThreadingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 부하 테스트 종료 시 클라이언트가 끊는 keep-alive 연결은 무시
+        pass
+
+
+class MockUpstageServer:
+    """백그라운드 스레드에서 도는 mock 서버 (with 문 지원)"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        handler = type("ConfiguredHandler", (MockUpstageHandler,), {"config": config or MockConfig(), "jobs": {}})
+        self.httpd = _QuietThreadingHTTPServer((host, port), handler)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstage API mock 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=MockConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=MockConfig.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--reply-tokens", type=int, default=MockConfig.reply_tokens)
+    parser.add_argument("--doc-elements", type=int, default=MockConfig.doc_elements)
+    args = parser.parse_args()
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        reply_tokens=args.reply_tokens,
+        doc_elements=args.doc_elements,
+    )
+    server = MockUpstageServer(config, args.host, args.port)
+    print(f"mock Upstage API: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
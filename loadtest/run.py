@@ -0,0 +1,275 @@
+# loadtest/run.py
+"""부하 테스트 실행기
+
+로컬 mock 서버(또는 --base-url 로 지정한 서버)를 대상으로
+chat_with_solar / stream_chat_with_solar / digitize_document 코드 경로를
+N개의 동시 세션으로 실행하고 처리량과 p50/p95/p99 지연을 JSON으로 저장한다.
+
+예) python -m loadtest.run --sessions 20 --turns 10 --scenario mixed --output results/base.json
+    python -m loadtest.run --compare results/base.json results/new.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from document_api import OCR_PARAMS, build_parse_params, digitize_document
+from loadtest.mock_server import MockConfig, MockUpstageServer
+from request_scheduler import RequestScheduler, SchedulerSettings
+from solar_chat import chat_with_solar, stream_chat_with_solar
+from upload_stream import UploadSource
+from upstage_http import HttpSettings, create_openai_client, create_session
+
+SCENARIOS = ["chat", "chat-stream", "parse", "ocr"]
+
+
+def percentile(sorted_values, pct):
+    """정렬된 값에서 nearest-rank 방식 백분위수"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+def summarize(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "min": values[0],
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1],
+        "mean": sum(values) / len(values),
+    }
+
+
+class LoadRunner:
+    def __init__(self, base_url, sessions, turns, scenarios, upload_kb, scheduler=None, api_key="loadtest"):
+        self.base_url = base_url
+        self.sessions = sessions
+        self.turns = turns
+        self.scenarios = scenarios
+        self.api_key = api_key
+        self.document_bytes = b"%PDF-1.4\n" + os.urandom(upload_kb * 1024)
+        settings = HttpSettings(pool_maxsize=max(sessions, 10))
+        # 앱과 마찬가지로 프로세스 전역 클라이언트/세션을 모든 세션이 공유
+        self.scheduler = scheduler
+        # 스케줄러가 재시도를 맡으면 클라이언트 자체 재시도는 끔 (앱과 동일)
+        self.client = create_openai_client(api_key, settings, base_url, max_retries=0 if scheduler else 2)
+        self.http = create_session(settings)
+        self.records = []
+        self._lock = threading.Lock()
+
+    def _record(self, scenario, start, ok, ttft=None, error=None):
+        record = {"scenario": scenario, "latency": time.perf_counter() - start, "ok": ok}
+        if ttft is not None:
+            record["ttft"] = ttft
+        if error:
+            record["error"] = error
+        with self._lock:
+            self.records.append(record)
+
+    def _run_chat(self, session_id, turn, stream):
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": f"세션 {session_id} 질문 {turn}"},
+        ]
+        scenario = "chat-stream" if stream else "chat"
+        timings = {}
+        start = time.perf_counter()
+        try:
+            if stream:
+                for _ in stream_chat_with_solar(self.client, messages, timings=timings, scheduler=self.scheduler):
+                    pass
+            else:
+                chat_with_solar(self.client, messages, timings=timings, scheduler=self.scheduler)
+            self._record(scenario, start, True, ttft=timings.get("ttft"))
+        except Exception as e:
+            self._record(scenario, start, False, error=type(e).__name__)
+
+    def _run_document(self, scenario):
+        # 페이지와 같은 스트리밍 업로드 경로 (세션 스레드마다 자기 스트림을 씀)
+        files = {"document": UploadSource.from_bytes("loadtest.pdf", self.document_bytes, "application/pdf")}
+        # 페이지/배치 CLI 와 같은 규칙으로 만든 요청 파라미터 (파싱은 페이지 기본 옵션)
+        data = dict(OCR_PARAMS) if scenario == "ocr" else build_parse_params()
+        start = time.perf_counter()
+        try:
+            resp = digitize_document(self.http, self.api_key, files, data, base_url=self.base_url, scheduler=self.scheduler)
+            if resp.ok:
+                resp.json()
+                self._record(scenario, start, True)
+            else:
+                self._record(scenario, start, False, error=f"HTTP {resp.status_code}")
+        except Exception as e:
+            self._record(scenario, start, False, error=type(e).__name__)
+
+    def _session(self, session_id):
+        for turn in range(self.turns):
+            scenario = self.scenarios[(session_id + turn) % len(self.scenarios)]
+            if scenario in ("chat", "chat-stream"):
+                self._run_chat(session_id, turn, scenario == "chat-stream")
+            else:
+                self._run_document(scenario)
+
+    def run(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.sessions) as pool:
+            list(pool.map(self._session, range(self.sessions)))
+        return time.perf_counter() - start
+
+    def close(self):
+        self.client.close()
+        self.http.close()
+
+    def report(self, wall_time):
+        scenarios = {}
+        for name in sorted({r["scenario"] for r in self.records}):
+            rows = [r for r in self.records if r["scenario"] == name]
+            ok_rows = [r for r in rows if r["ok"]]
+            errors = {}
+            for r in rows:
+                if not r["ok"]:
+                    errors[r["error"]] = errors.get(r["error"], 0) + 1
+            entry = {
+                "requests": len(rows),
+                "ok": len(ok_rows),
+                "errors": errors,
+                "throughput_rps": len(ok_rows) / wall_time if wall_time else 0.0,
+                "latency_s": summarize([r["latency"] for r in ok_rows]),
+            }
+            ttfts = [r["ttft"] for r in ok_rows if r.get("ttft") is not None]
+            if ttfts:
+                entry["ttft_s"] = summarize(ttfts)
+            scenarios[name] = entry
+        total_ok = sum(1 for r in self.records if r["ok"])
+        report = {
+            "sessions": self.sessions,
+            "turns": self.turns,
+            "wall_time_s": wall_time,
+            "requests": len(self.records),
+            "ok": total_ok,
+            "throughput_rps": total_ok / wall_time if wall_time else 0.0,
+            "latency_s": summarize([r["latency"] for r in self.records if r["ok"]]),
+            "scenarios": scenarios,
+        }
+        if self.scheduler is not None:
+            report["scheduler"] = self.scheduler.snapshot()
+        return report
+
+
+def print_report(report):
+    print(f"세션 {report['sessions']} × 턴 {report['turns']} · 총 {report['wall_time_s']:.2f}s · "
+          f"{report['ok']}/{report['requests']} 성공 · {report['throughput_rps']:.1f} req/s")
+    for name, entry in report["scenarios"].items():
+        lat = entry["latency_s"]
+        line = f"  {name:<12} {entry['ok']:>5}/{entry['requests']:<5} {entry['throughput_rps']:7.1f} req/s"
+        if lat:
+            line += f"  p50 {lat['p50'] * 1000:7.1f}ms  p95 {lat['p95'] * 1000:7.1f}ms  p99 {lat['p99'] * 1000:7.1f}ms"
+        if "ttft_s" in entry:
+            line += f"  ttft p50 {entry['ttft_s']['p50'] * 1000:.1f}ms"
+        if entry["errors"]:
+            line += f"  errors {entry['errors']}"
+        print(line)
+    for name, stats in report.get("scheduler", {}).items():
+        print(f"  [scheduler] {name:<9} retries {stats['retries']}  failures {stats['failures']}  "
+              f"wait p95 {stats['wait_p95'] * 1000:.1f}ms")
+
+
+def compare(baseline_path, candidate_path):
+    """두 결과 JSON의 처리량/p95 변화를 출력"""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["report"]
+    with open(candidate_path, encoding="utf-8") as f:
+        cand = json.load(f)["report"]
+    for name in sorted(set(base["scenarios"]) | set(cand["scenarios"])):
+        b = base["scenarios"].get(name)
+        c = cand["scenarios"].get(name)
+        if not b or not c or not b["latency_s"] or not c["latency_s"]:
+            print(f"  {name:<12} (한쪽 결과 없음)")
+            continue
+        rps = (c["throughput_rps"] / b["throughput_rps"] - 1) * 100 if b["throughput_rps"] else 0.0
+        p95 = (c["latency_s"]["p95"] / b["latency_s"]["p95"] - 1) * 100
+        print(f"  {name:<12} throughput {rps:+6.1f}%  p95 {p95:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstage 채팅/문서 파싱 부하 테스트")
+    parser.add_argument("--sessions", type=int, default=10, help="동시 세션 수")
+    parser.add_argument("--turns", type=int, default=5, help="세션당 요청 수")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["mixed"], default="mixed")
+    parser.add_argument("--base-url", help="지정하면 mock 서버 대신 이 주소로 요청")
+    parser.add_argument("--upload-kb", type=int, default=256, help="문서 업로드 크기(KB)")
+    parser.add_argument("--latency-ms", type=float, default=MockConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=MockConfig.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--reply-tokens", type=int, default=MockConfig.reply_tokens)
+    parser.add_argument("--token-interval-ms", type=float, default=MockConfig.token_interval_ms)
+    parser.add_argument("--doc-elements", type=int, default=MockConfig.doc_elements)
+    parser.add_argument("--element-chars", type=int, default=MockConfig.element_chars)
+    parser.add_argument("--no-scheduler", action="store_true", help="RequestScheduler 없이 바로 호출")
+    parser.add_argument("--rate", type=float, help="엔드포인트별 초당 요청 수 (스케줄러)")
+    parser.add_argument("--concurrency", type=int, default=SchedulerSettings.max_concurrency, help="스케줄러 동시 요청 수")
+    parser.add_argument("--output", help="결과를 저장할 JSON 경로")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="두 결과 JSON 비교")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    scenarios = SCENARIOS if args.scenario == "mixed" else [args.scenario]
+    mock_config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        reply_tokens=args.reply_tokens,
+        token_interval_ms=args.token_interval_ms,
+        doc_elements=args.doc_elements,
+        element_chars=args.element_chars,
+    )
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = MockUpstageServer(mock_config).start()
+        base_url = server.base_url
+    try:
+        scheduler = None
+        if not args.no_scheduler:
+            settings = SchedulerSettings(max_concurrency=args.concurrency)
+            if args.rate:
+                settings.rates = {"chat": args.rate, "document": args.rate}
+                settings.bursts = {"chat": max(int(args.rate), 1), "document": max(int(args.rate), 1)}
+            scheduler = RequestScheduler(settings)
+        runner = LoadRunner(base_url, args.sessions, args.turns, scenarios, args.upload_kb, scheduler)
+        wall_time = runner.run()
+        report = runner.report(wall_time)
+        runner.close()
+    finally:
+        if server is not None:
+            server.stop()
+
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        result = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "base_url": base_url if args.base_url else "mock",
+            "mock_config": None if args.base_url else vars(mock_config),
+            "args": {k: v for k, v in vars(args).items() if k != "compare"},
+            "report": report,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,236 @@
 # app.py
+import time
+
+RUN_START = time.perf_counter()  # 스크립트 1회 실행 시간 측정 시작점
+
 import streamlit as st
-from openai import OpenAI  # openai==1.52.2
+from openai import OpenAIError
 
-# ─── Client 초기화 ─────────────────────────────────────────────────────────────
-client = OpenAI(
-    api_key=st.secrets["upstage_api_key"],
-    base_url="https://api.upstage.ai/v1"
+from app_resources import (
+    get_completion_cache,
+    get_conversation_store,
+    get_document_index,
+    get_openai_client,
+    get_request_scheduler,
+    start_metrics_endpoint,
 )
+from context_window import ContextWindow, message_tokens
+from doc_retrieval import build_context_message
+from solar_chat import chat_with_solar, stream_chat_with_solar, summarize_history
+from ui_panels import render_scheduler_panel
 
-def chat_with_solar(messages):
-    response = client.chat.completions.create(
-        model="solar-pro",
-        messages=messages
-    )
-    return response.choices[0].message.content
+HISTORY_PAGE_SIZE = 20  # 한 번에 렌더링할 최근 메시지 수
+# system 메시지는 필요에 따라 설정하세요
+SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful assistant."}
+
+# ─── Client 초기화 (프로세스 전역 커넥션 풀/응답 캐시 공유) ──────────────────────
+client = get_openai_client()
+completion_cache = get_completion_cache()
+scheduler = get_request_scheduler()
+store = get_conversation_store()
+document_index = get_document_index()
+start_metrics_endpoint()
 
 # ─── 세션 상태 초기화 ───────────────────────────────────────────────────────────
-if "messages" not in st.session_state:
-    # system 메시지는 필요에 따라 설정하세요
-    st.session_state.messages = [
-        {"role": "system", "content": "You are a helpful assistant."}
-    ]
+def open_conversation(conversation_id=None):
+    """대화를 열거나 새로 만들고, 저장된 누적 요약으로 컨텍스트 관리자를 복원"""
+    if not conversation_id or not store.exists(conversation_id):
+        conversation_id = store.create()
+    st.session_state.conversation_id = conversation_id
+    st.query_params["c"] = conversation_id  # URL에 남겨 새로고침/재시작 후에도 이어서 대화
+    context_window = ContextWindow()
+    context_window.summary, context_window.summarized_count = store.load_summary(conversation_id)
+    st.session_state.context_window = context_window
+    st.session_state.history_window = HISTORY_PAGE_SIZE
+    st.session_state.turn_timings = []
+
+if "conversation_id" not in st.session_state:
+    open_conversation(st.query_params.get("c"))
+conversation_id = st.session_state.conversation_id
+if "turn_timings" not in st.session_state:
+    # 턴별 지연 시간 기록 (API 요청 메시지와 분리해서 보관)
+    st.session_state.turn_timings = []
+if "history_window" not in st.session_state:
+    st.session_state.history_window = HISTORY_PAGE_SIZE
+if "run_timings" not in st.session_state:
+    st.session_state.run_timings = []
 
 st.title("🌞 Upstage Solar Chatbot")
 
-# ─── 기존 대화 렌더링 ────────────────────────────────────────────────────────────
-for msg in st.session_state.messages:
+# ─── 사이드바: 스트리밍 설정 및 지연 시간 ─────────────────────────────────────────
+stream_mode = st.sidebar.toggle("⚡ 스트리밍 모드", value=True, help="토큰이 도착하는 대로 응답을 표시합니다")
+st.session_state.context_window.budget_tokens = st.sidebar.number_input(
+    "컨텍스트 토큰 예산",
+    min_value=500,
+    max_value=32000,
+    value=st.session_state.context_window.budget_tokens,
+    step=500,
+    help="예산을 넘는 오래된 대화는 요약으로 접어서 전송합니다"
+)
+use_cache = st.sidebar.checkbox("💾 응답 캐시 사용", value=True, help="끄면 이번 요청은 캐시를 건너뛰고 항상 API를 호출합니다")
+with st.sidebar.expander("📦 캐시 통계"):
+    cache_stats = completion_cache.stats
+    st.metric("적중률", f"{completion_cache.hit_rate():.0%}")
+    st.write(
+        f"메모리 적중 {cache_stats['memory_hits']} · 디스크 적중 {cache_stats['disk_hits']} · "
+        f"미스 {cache_stats['misses']} · 우회 {cache_stats['bypassed']}"
+    )
+    if st.button("캐시 비우기"):
+        completion_cache.clear()
+render_scheduler_panel(scheduler)
+st.sidebar.button("🆕 새 대화", on_click=open_conversation)
+with st.sidebar.expander("🗄️ 대화 저장소"):
+    store_stats = store.stats()
+    st.write(
+        f"메모리 상주 대화 {store_stats['resident_conversations']}개 · "
+        f"메시지 {store_stats['resident_messages']}개 · "
+        f"{store_stats['resident_bytes'] / 1024:.1f} KB / {store_stats['max_resident_bytes'] / 1024 / 1024:.0f} MB"
+    )
+# 문서 파싱 페이지에서 파싱한 문서는 검색 인덱스를 거쳐 관련 구간만 요청에 포함
+selected_docs = []
+if document_index.documents:
+    st.sidebar.markdown("### 📚 문서 참고 대화")
+    doc_names = {doc_id: name for doc_id, (name, _) in document_index.documents.items()}
+    selected_docs = st.sidebar.multiselect(
+        "참고할 문서",
+        list(doc_names),
+        default=list(doc_names),
+        format_func=doc_names.get
+    )
+    top_k = st.sidebar.slider("참고 구간 수 (top-k)", 1, 10, 4)
+# 이번 실행에서 생긴 턴까지 반영하도록 스크립트 마지막에 채움
+latency_panel = st.sidebar.container()
+
+def render_latency_panel(container):
+    with container:
+        runs = st.session_state.run_timings
+        if runs:
+            last_run = runs[-1]
+            st.markdown("### 🧮 스크립트 실행 시간")
+            col1, col2 = st.columns(2)
+            col1.metric("이번 실행", f"{last_run['total'] * 1000:.0f}ms")
+            col2.metric("기록 렌더링", f"{last_run['render'] * 1000:.0f}ms")
+        if not st.session_state.turn_timings:
+            return
+        last = st.session_state.turn_timings[-1]
+        st.markdown("### ⏱️ 마지막 턴 지연 시간")
+        col1, col2 = st.columns(2)
+        col1.metric("첫 토큰", f"{last.get('ttft', 0):.2f}s")
+        col2.metric("전체", f"{last.get('total', 0):.2f}s")
+        st.metric(
+            "절약한 토큰 (추정)",
+            f"{last.get('saved_tokens', 0):,}",
+            help=f"전체 {last.get('full_tokens', 0):,} 토큰 중 {last.get('sent_tokens', 0):,} 토큰 전송"
+        )
+        with st.expander("턴별 기록"):
+            st.dataframe(
+                [
+                    {
+                        "턴": i + 1,
+                        "모드": t["mode"],
+                        "첫 토큰(s)": round(t.get("ttft", 0), 3),
+                        "전체(s)": round(t.get("total", 0), 3),
+                        "절약 토큰": t.get("saved_tokens", 0),
+                        "캐시": t.get("cache", "-"),
+                        "큐 대기(s)": round(t.get("queue_wait", 0), 3),
+                        "재시도": t.get("retries", 0),
+                        "문서 토큰": t.get("rag_tokens", 0),
+                        "스크립트(s)": round(t.get("script", 0), 3),
+                    }
+                    for i, t in enumerate(st.session_state.turn_timings)
+                ],
+                use_container_width=True
+            )
+
+# ─── 기존 대화 렌더링 (최근 메시지만, 이전 기록은 요청 시 페이지 단위로) ────────────
+def show_more_history():
+    st.session_state.history_window += HISTORY_PAGE_SIZE
+
+def collapse_history():
+    st.session_state.history_window = HISTORY_PAGE_SIZE
+
+render_start = time.perf_counter()
+start_seq, resident_messages, message_count = store.window(conversation_id)
+first_visible = max(message_count - st.session_state.history_window, 0)
+if first_visible < start_seq:
+    # 메모리 창보다 앞선 기록은 스크롤을 올렸을 때만 DB에서 읽음
+    visible_messages = store.fetch(conversation_id, first_visible, start_seq) + resident_messages
+else:
+    visible_messages = resident_messages[first_visible - start_seq:]
+hidden_count = first_visible
+if hidden_count > 0:
+    st.button(f"⬆️ 이전 메시지 {min(hidden_count, HISTORY_PAGE_SIZE)}개 더 보기 (숨김 {hidden_count}개)", on_click=show_more_history)
+elif st.session_state.history_window > HISTORY_PAGE_SIZE:
+    st.button("⬇️ 최근 메시지만 보기", on_click=collapse_history)
+for msg in visible_messages:
     if msg["role"] == "user":
         st.chat_message("user").write(msg["content"])
     elif msg["role"] == "assistant":
         st.chat_message("assistant").write(msg["content"])
+render_time = time.perf_counter() - render_start
 
-# ─── 사용자 입력 처리 ───────────────────────────────────────────────────────────
+# ─── 사용자 입력 처리 (새 메시지만 렌더링, 강제 rerun 없음) ───────────────────────
+turn_timings = None
 if prompt := st.chat_input("메시지를 입력하세요..."):
-    # 1) 사용자 메시지 추가
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    # 2) API 호출
-    with st.spinner("응답 생성 중..."):
-        reply = chat_with_solar(st.session_state.messages)
-    # 3) 어시스턴트 메시지 추가
-    st.session_state.messages.append({"role": "assistant", "content": reply})
-    # 4) 페이지 리로드하여 새 메시지 표시
-    st.rerun()
+    # 1) 사용자 메시지 저장 및 렌더링
+    store.append(conversation_id, "user", prompt)
+    st.chat_message("user").write(prompt)
+    # 2) 토큰 예산에 맞춰 요청 메시지 구성 (오래된 턴은 누적 요약으로 대체)
+    turn_timings = {"mode": "stream" if stream_mode else "blocking"}
+    context_window = st.session_state.context_window
+    try:
+        # 아직 요약되지 않은 메시지는 메모리 창 밖에 있더라도 모두 포함
+        start_seq, history, _ = store.window(conversation_id)
+        if context_window.summarized_count < start_seq:
+            history = store.fetch(conversation_id, context_window.summarized_count, start_seq) + history
+            start_seq = context_window.summarized_count
+        request_messages, context_stats = context_window.build(
+            [SYSTEM_MESSAGE] + history,
+            lambda previous, new: summarize_history(client, previous, new, completion_cache, scheduler=scheduler),
+            offset=start_seq,
+            prefix_tokens=store.tokens_before(conversation_id, start_seq)
+        )
+        if context_stats["newly_summarized"]:
+            store.save_summary(conversation_id, context_window.summary, context_window.summarized_count)
+        turn_timings.update(context_stats)
+        # 선택한 문서에서 질문과 관련된 상위 k개 구간만 대화 앞에 넣음
+        hits = document_index.search(prompt, top_k, selected_docs) if selected_docs else []
+        if hits:
+            context_message = build_context_message(hits)
+            insert_at = next(i for i, m in enumerate(request_messages) if m["role"] != "system")
+            request_messages.insert(insert_at, context_message)
+            turn_timings["rag_tokens"] = message_tokens(context_message)
+        # 3) API 호출 (스트리밍 모드면 토큰 단위로 바로 렌더링)
+        with st.chat_message("assistant"):
+            if stream_mode:
+                reply = st.write_stream(stream_chat_with_solar(
+                    client, request_messages, completion_cache, turn_timings, use_cache, scheduler=scheduler
+                ))
+            else:
+                with st.spinner("응답 생성 중..."):
+                    reply = chat_with_solar(
+                        client, request_messages, completion_cache, turn_timings, use_cache, scheduler=scheduler
+                    )
+                st.write(reply)
+            if hits:
+                with st.expander(f"📎 참고한 문서 구간 {len(hits)}개"):
+                    for i, (score, chunk) in enumerate(hits, 1):
+                        pages = f" (p.{', '.join(str(p) for p in chunk.pages)})" if chunk.pages else ""
+                        st.markdown(f"**[{i}] {chunk.doc_name}{pages}** · 점수 {score:.3f}")
+                        st.caption(chunk.text[:300] + ("…" if len(chunk.text) > 300 else ""))
+    except OpenAIError as e:
+        # 재시도를 모두 소진한 경우: 실패한 질문은 기록에서 빼고 다시 보낼 수 있게 함
+        store.pop(conversation_id)
+        turn_timings = None
+        st.error(f"❌ 응답 생성 실패: {e}")
+    else:
+        # 4) 어시스턴트 메시지 추가 (이미 화면에 그려졌으므로 다시 실행하지 않음)
+        store.append(conversation_id, "assistant", reply)
+        st.session_state.turn_timings.append(turn_timings)
+
+# ─── 실행 시간 기록 ─────────────────────────────────────────────────────────────
+run_total = time.perf_counter() - RUN_START
+if turn_timings is not None:
+    turn_timings["script"] = run_total
+st.session_state.run_timings = (st.session_state.run_timings + [{"total": run_total, "render": render_time}])[-50:]
+render_latency_panel(latency_panel)
@@ -1,15 +1,58 @@
+# 구간별 실행 시간 측정은 import 전부터 시작 (콜드 스타트의 import 시간 포함)
+from telemetry import RerunProfiler, span
+
+profiler = RerunProfiler("01_claude")
+
 import streamlit as st
-import requests
-import json
-import pandas as pd
-from io import BytesIO
-import base64
-import re
+
+from app_resources import (
+    get_document_cache,
+    get_document_index,
+    get_http_session,
+    get_image_prep_settings,
+    get_ocr_results,
+    get_parse_results,
+    get_request_scheduler,
+    get_search_index,
+    get_upload_digest,
+    profiler_enabled,
+    start_metrics_endpoint,
+)
+from document_api import (
+    BASE64_ENCODING_OPTIONS,
+    OCR_PARAMS,
+    build_parse_params,
+    digitize_document_cached,
+    iter_chunk_results,
+    record_document_usage,
+)
+from document_chunks import merge_chunk_results, split_pdf
+from image_prep import is_image
+from parse_results import ParsedDocument, parse_result_key
+from ui_panels import (
+    render_chunk_progress,
+    prepare_upload,
+    render_document_cache_panel,
+    render_element_browser,
+    render_image_gallery,
+    render_image_prep_options,
+    render_json_download,
+    render_layout_viewer,
+    render_profiler_panel,
+    render_scheduler_panel,
+    render_table_list,
+)
+from upload_stream import UploadSource
+
+profiler.mark("imports")
 
 # 페이지 구성 및 API 설정
 st.set_page_config(page_title="📄 Upstage Document Tool", layout="wide")
 api_key = st.secrets["upstage_api_key"]
-base_url = "https://api.upstage.ai/v1"
+http = get_http_session()  # 프로세스 전역 keep-alive 세션
+scheduler = get_request_scheduler()  # 속도 제한/재시도 공용 스케줄러
+document_cache = get_document_cache()  # 파일 내용 + 옵션 기준 결과 캐시
+start_metrics_endpoint()
 
 # 사이드바 네비게이션
 st.sidebar.title("🔧 기능 선택")
@@ -28,96 +71,9 @@ st.sidebar.info("""
 - PPTX (파워포인트)
 - XLSX (엑셀)
 """)
-
-# 공통 헤더
-headers = {"Authorization": f"Bearer {api_key}"}
-
-# HTML을 마크다운으로 변환하는 함수
-def html_to_markdown(html_content):
-    """HTML을 마크다운으로 변환"""
-    # 제목 변환
-    html_content = re.sub(r'<h1[^>]*>(.*?)</h1>', r'# \1', html_content)
-    html_content = re.sub(r'<h2[^>]*>(.*?)</h2>', r'## \1', html_content)
-    html_content = re.sub(r'<h3[^>]*>(.*?)</h3>', r'### \1', html_content)
-    
-    # 줄바꿈
-    html_content = html_content.replace('<br>', '\n').replace('<br/>', '\n')
-    
-    # 단락
-    html_content = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', html_content)
-    
-    # 볼드
-    html_content = re.sub(r'<strong>(.*?)</strong>', r'**\1**', html_content)
-    html_content = re.sub(r'<b>(.*?)</b>', r'**\1**', html_content)
-    
-    # 이탤릭
-    html_content = re.sub(r'<em>(.*?)</em>', r'*\1*', html_content)
-    html_content = re.sub(r'<i>(.*?)</i>', r'*\1*', html_content)
-    
-    # 나머지 HTML 태그 제거
-    html_content = re.sub(r'<[^>]+>', '', html_content)
-    
-    return html_content.strip()
-
-# 표 추출 함수
-def extract_tables_from_html(html_content):
-    """HTML에서 표 추출"""
-    tables = []
-    table_pattern = r'<table[^>]*>(.*?)</table>'
-    table_matches = re.findall(table_pattern, html_content, re.DOTALL)
-    
-    for table_html in table_matches:
-        rows = []
-        row_pattern = r'<tr[^>]*>(.*?)</tr>'
-        row_matches = re.findall(row_pattern, table_html, re.DOTALL)
-        
-        for row_html in row_matches:
-            cells = []
-            cell_pattern = r'<t[hd][^>]*>(.*?)</t[hd]>'
-            cell_matches = re.findall(cell_pattern, row_html, re.DOTALL)
-            
-            for cell in cell_matches:
-                clean_cell = re.sub(r'<[^>]+>', '', cell).strip()
-                cells.append(clean_cell)
-            
-            if cells:
-                rows.append(cells)
-        
-        if rows:
-            tables.append(rows)
-    
-    return tables
-
-# 안전한 DataFrame 생성 함수
-def safe_create_dataframe(table_data):
-    """안전하게 DataFrame 생성"""
-    try:
-        if not table_data:
-            return pd.DataFrame()
-        
-        # 모든 행의 열 개수 확인
-        max_cols = max(len(row) for row in table_data)
-        
-        # 모든 행을 같은 길이로 맞춤
-        normalized_data = []
-        for row in table_data:
-            normalized_row = row + [''] * (max_cols - len(row))
-            normalized_data.append(normalized_row)
-        
-        # 첫 번째 행을 헤더로 사용할 수 있는지 확인
-        if len(normalized_data) > 1:
-            # 첫 번째 행을 헤더로 사용
-            df = pd.DataFrame(normalized_data[1:], columns=normalized_data[0])
-        else:
-            # 헤더 없이 생성
-            df = pd.DataFrame(normalized_data)
-        
-        return df
-        
-    except Exception as e:
-        st.error(f"DataFrame 생성 오류: {str(e)}")
-        # 오류 발생 시 원본 데이터 그대로 반환
-        return pd.DataFrame(table_data)
+render_scheduler_panel(scheduler)
+render_document_cache_panel(document_cache)
+profiler.mark("사이드바/리소스")
 
 # ─── 문서 파싱 페이지 ───────────────────────────────────────────────────────────
 if page == "문서 파싱":
@@ -150,7 +106,7 @@ if page == "문서 파싱":
         with col1:
             encode_option = st.selectbox(
                 "Base64 인코딩 옵션",
-                ["없음", "표만", "텍스트만", "텍스트와 표", "모든 요소"]
+                list(BASE64_ENCODING_OPTIONS)
             )
         with col2:
             output_format = st.multiselect(
@@ -173,315 +129,297 @@ if page == "문서 파싱":
                 chart_recognition = st.checkbox("차트 인식", value=True)
         
         # API 파라미터 구성
-        data = {
-            "ocr": ocr_mode.split()[0],
-            "model": "document-parse",
-            "coordinates": str(coordinates).lower(),
-            "chart_recognition": str(chart_recognition).lower()
-        }
-        
-        # output_formats 설정
-        if output_format:
-            data["output_formats"] = str(output_format).replace("'", '"')
-        
-        # base64_encoding 설정
-        if encode_option == "텍스트만":
-            data["base64_encoding"] = '["text"]'
-        elif encode_option == "표만":
-            data["base64_encoding"] = '["table"]'
-        elif encode_option == "텍스트와 표":
-            data["base64_encoding"] = '["text","table"]'
-        elif encode_option == "모든 요소":
-            data["base64_encoding"] = '["text","table","figure","chart","diagram","heading1","heading2","heading3","paragraph","list"]'
-        
+        data = build_parse_params(
+            ocr_mode.split()[0], coordinates, chart_recognition, output_format, encode_option
+        )
+
         # 현재 설정 표시
         with st.expander("📋 API 파라미터 확인"):
             st.json(data)
         
+        refresh = st.checkbox("♻️ 캐시 무시하고 다시 파싱", help="같은 파일과 옵션으로 저장된 결과가 있어도 API를 다시 호출하고 캐시를 덮어씁니다")
+
+        # 대용량 PDF: 페이지 단위로 나눠 병렬 파싱 후 병합
+        large_mode = file_ext == "PDF" and st.checkbox(
+            "📚 대용량 모드 (페이지를 나눠 병렬 파싱)",
+            help="수백 페이지 PDF를 청크로 나눠 동시에 파싱하고 끝나는 대로 보여준 뒤 하나의 결과로 합칩니다"
+        )
+        if large_mode:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                pages_per_chunk = st.number_input("청크당 페이지 수", min_value=5, max_value=200, value=50, step=5)
+            with col2:
+                max_workers = st.slider("동시 요청 수", 1, 8, 4)
+            with col3:
+                use_async = st.checkbox("비동기 작업 API 사용", help="청크를 비동기 엔드포인트에 제출하고 완료될 때까지 폴링합니다")
+
+        # 이미지는 업로드 전에 줄여 보낼 수 있음
+        image_prep = render_image_prep_options(get_image_prep_settings(), "parse_image_prep") if is_image(uploaded.name) else None
+
+        # 결과는 세션에 보관 (다운로드/편집으로 다시 실행되어도 유지)
+        results = get_parse_results()
+        result_key = parse_result_key(uploaded.name, get_upload_digest(uploaded), data, image_prep,
+                                      int(pages_per_chunk) if large_mode else None)
+
+        profiler.mark("위젯 구성")
         if st.button("🚀 파싱 실행", type="primary"):
-            with st.spinner(f"{file_ext} 파일 파싱 중..."):
-                files = {"document": (uploaded.name, uploaded.read(), uploaded.type)}
-                resp = requests.post(f"{base_url}/document-digitization", headers=headers, files=files, data=data)
-            
-            if resp.ok:
-                result = resp.json()
-                st.success(f"✅ {file_ext} 파일 파싱 성공!")
-                
-                # 결과 요약
+            result = None
+            chunks = []
+            if large_mode:
+                try:
+                    with st.spinner("PDF 페이지 분할 중..."):
+                        chunks = split_pdf(uploaded, int(pages_per_chunk))
+                except Exception as e:
+                    st.warning(f"⚠️ PDF를 나눌 수 없어 한 번에 파싱합니다: {e}")
+            if chunks:
+                st.info(f"📚 {chunks[-1][1]}쪽을 {len(chunks)}개 청크로 나눠 파싱합니다 (동시 {max_workers}개)")
+                done = render_chunk_progress(
+                    iter_chunk_results(http, api_key, uploaded.name, chunks, data, document_cache, refresh,
+                                       max_workers=max_workers, use_async=use_async, scheduler=scheduler),
+                    len(chunks)
+                )
+                succeeded = [chunk for chunk in done if chunk.ok]
+                for chunk in succeeded:
+                    if not chunk.from_cache:
+                        record_document_usage(chunk.result)
+                if succeeded:
+                    result = merge_chunk_results([(chunk.start_page, chunk.result) for chunk in succeeded])
+                    results.put(result_key, ParsedDocument(result, uploaded.name, all(chunk.from_cache for chunk in succeeded)))
+                    if len(succeeded) < len(done):
+                        st.warning(f"⚠️ {len(done) - len(succeeded)}개 청크가 실패해 해당 페이지가 결과에서 빠졌습니다. 다시 실행하면 성공한 청크는 캐시에서 불러옵니다.")
+                    else:
+                        st.success(f"✅ {len(chunks)}개 청크 파싱 및 병합 완료!")
+                else:
+                    st.error("❌ 모든 청크의 파싱이 실패했습니다.")
+            else:
+                with st.spinner(f"{file_ext} 파일 파싱 중..."):
+                    upload = prepare_upload(UploadSource.from_file(uploaded, uploaded.name, uploaded.type), image_prep)  # 복사 없이 스트리밍 업로드
+                    resp = digitize_document_cached(http, api_key, {"document": upload}, data, document_cache, refresh, scheduler=scheduler)
+
+                if resp.ok:
+                    with span("response_json"):
+                        result = resp.json()
+                    results.put(result_key, ParsedDocument(result, uploaded.name, resp.from_cache))
+                    if resp.from_cache:
+                        st.success(f"⚡ 캐시된 {file_ext} 파싱 결과를 불러왔습니다 (API 호출 없음)")
+                    else:
+                        record_document_usage(result)
+                        st.success(f"✅ {file_ext} 파일 파싱 성공!")
+                else:
+                    st.error(f"❌ 파싱 실패: {resp.status_code}")
+                    try:
+                        error_msg = resp.json()
+                    except:
+                        error_msg = resp.text
+                    st.error(f"오류 메시지: {error_msg}")
+
+                    # 파일 형식별 오류 처리
+                    if file_ext == "HWP":
+                        st.info("""
+                        💡 **HWP 파일 오류 해결 방법:**
+                        1. HWP를 PDF로 변환 후 업로드
+                        2. 한글 프로그램에서 "다른 이름으로 저장" → PDF 선택
+                        3. 온라인 HWP→PDF 변환 서비스 이용
+                        """)
+
+            if result is not None:
+                # 챗봇에서 이 문서로 대화할 수 있도록 검색 인덱스에 추가
+                added_chunks = get_document_index().add_document(f"{uploaded.name}:{uploaded.size}", uploaded.name, result)
+                if added_chunks:
+                    st.info(f"💬 챗봇 문서 검색 인덱스에 {added_chunks}개 구간으로 추가했습니다. 메인 페이지에서 이 문서에 대해 질문할 수 있습니다.")
+                # 문서 검색 페이지의 전문 검색 인덱스 (같은 파일은 교체)
+                get_search_index().add_document(f"parse:{uploaded.name}:{uploaded.size}", uploaded.name, result, "parse")
+
+        profiler.mark("API 호출")
+
+        parsed = results.get(result_key)
+        if parsed is not None:
+            # 결과 요약
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("추출된 요소", len(parsed.elements))
+            with col2:
+                st.metric("처리된 페이지", parsed.pages)
+            with col3:
+                st.metric("요소 타입", len(parsed.categories()))
+
+            # 선택한 보기만 계산/렌더링 (st.tabs는 모든 탭 내용을 매번 만들기 때문에 라디오로 전환)
+            view = st.radio(
+                "결과 보기",
+                ["📄 문서 뷰", "📊 표 추출", "📝 마크다운", "🖼️ 이미지/도표", "📐 레이아웃", "💾 다운로드", "🔍 원본 데이터"],
+                horizontal=True,
+                label_visibility="collapsed"
+            )
+            html_content = parsed.html
+
+            # 문서 뷰
+            if view == "📄 문서 뷰":
+                st.subheader("렌더링된 문서")
+
+                if html_content:
+                    styled_html = f"""
+                    <style>
+                        .parsed-content {{
+                            font-family: 'Noto Sans KR', sans-serif;
+                            line-height: 1.6;
+                            max-width: 900px;
+                            margin: 0 auto;
+                            padding: 30px;
+                            background: white;
+                            border-radius: 10px;
+                            box-shadow: 0 2px 20px rgba(0,0,0,0.1);
+                        }}
+                        .parsed-content h1 {{
+                            color: #1a1a1a;
+                            border-bottom: 3px solid #0066cc;
+                            padding-bottom: 10px;
+                            margin: 30px 0 20px 0;
+                            font-size: 28px;
+                        }}
+                        .parsed-content h2 {{
+                            color: #333;
+                            margin: 25px 0 15px 0;
+                            font-size: 22px;
+                        }}
+                        .parsed-content h3 {{
+                            color: #555;
+                            margin: 20px 0 10px 0;
+                            font-size: 18px;
+                        }}
+                        .parsed-content p {{
+                            margin: 15px 0;
+                            line-height: 1.8;
+                            color: #444;
+                        }}
+                        .parsed-content table {{
+                            border-collapse: collapse;
+                            width: 100%;
+                            margin: 20px 0;
+                            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+                        }}
+                        .parsed-content th, .parsed-content td {{
+                            border: 1px solid #ddd;
+                            padding: 12px;
+                            text-align: left;
+                        }}
+                        .parsed-content th {{
+                            background-color: #0066cc;
+                            color: white;
+                            font-weight: bold;
+                        }}
+                        .parsed-content tr:nth-child(even) {{
+                            background-color: #f8f9fa;
+                        }}
+                        .parsed-content tr:hover {{
+                            background-color: #e9ecef;
+                        }}
+                    </style>
+                    <div class="parsed-content">
+                        {html_content}
+                    </div>
+                    """
+                    st.markdown(styled_html, unsafe_allow_html=True)
+                else:
+                    st.info("HTML 콘텐츠가 없습니다.")
+
+            # 표 추출
+            elif view == "📊 표 추출":
+                st.subheader("추출된 표")
+
+                render_table_list(parsed, "tables")
+
+            # 마크다운
+            elif view == "📝 마크다운":
+                st.subheader("마크다운 변환")
+
+                markdown_content = parsed.markdown()
+
+                if markdown_content:
+                    st.markdown("### 미리보기")
+                    st.markdown(markdown_content)
+
+                    st.markdown("### 편집")
+                    edited_md = st.text_area(
+                        "마크다운 편집",
+                        markdown_content,
+                        height=400
+                    )
+
+                    if edited_md != markdown_content:
+                        st.download_button(
+                            "💾 편집된 마크다운 다운로드",
+                            edited_md,
+                            f"{parsed.stem}_edited.md",
+                            "text/markdown"
+                        )
+                else:
+                    st.info("마크다운 콘텐츠가 없습니다.")
+
+            # 이미지/도표 (썸네일 페이지 단위, 원본은 선택할 때만 디코딩)
+            elif view == "🖼️ 이미지/도표":
+                st.subheader("추출된 이미지 및 도표")
+                render_image_gallery(parsed, "images")
+
+            # 레이아웃 (요소 좌표 상자, 클릭/영역 선택은 좌표 인덱스로 조회)
+            elif view == "📐 레이아웃":
+                st.subheader("요소 레이아웃")
+                render_layout_viewer(parsed, uploaded, "layout")
+
+            # 다운로드
+            elif view == "💾 다운로드":
+                st.subheader("전체 문서 다운로드")
+
                 col1, col2, col3 = st.columns(3)
+
                 with col1:
-                    st.metric("추출된 요소", len(result.get("elements", [])))
-                with col2:
-                    st.metric("처리된 페이지", result.get("usage", {}).get("pages", 0))
-                with col3:
-                    categories = {}
-                    for elem in result.get("elements", []):
-                        cat = elem.get("category", "unknown")
-                        categories[cat] = categories.get(cat, 0) + 1
-                    st.metric("요소 타입", len(categories))
-                
-                # 탭으로 결과 표시
-                tabs = st.tabs(["📄 문서 뷰", "📊 표 추출", "📝 마크다운", "🖼️ 이미지/도표", "💾 다운로드", "🔍 원본 데이터"])
-                
-                # 문서 뷰 탭
-                with tabs[0]:
-                    st.subheader("렌더링된 문서")
-                    
-                    html_content = result.get("content", {}).get("html", "")
                     if html_content:
-                        styled_html = f"""
-                        <style>
-                            .parsed-content {{
-                                font-family: 'Noto Sans KR', sans-serif;
-                                line-height: 1.6;
-                                max-width: 900px;
-                                margin: 0 auto;
-                                padding: 30px;
-                                background: white;
-                                border-radius: 10px;
-                                box-shadow: 0 2px 20px rgba(0,0,0,0.1);
-                            }}
-                            .parsed-content h1 {{ 
-                                color: #1a1a1a; 
-                                border-bottom: 3px solid #0066cc;
-                                padding-bottom: 10px;
-                                margin: 30px 0 20px 0;
-                                font-size: 28px;
-                            }}
-                            .parsed-content h2 {{ 
-                                color: #333;
-                                margin: 25px 0 15px 0;
-                                font-size: 22px;
-                            }}
-                            .parsed-content h3 {{ 
-                                color: #555;
-                                margin: 20px 0 10px 0;
-                                font-size: 18px;
-                            }}
-                            .parsed-content p {{
-                                margin: 15px 0;
-                                line-height: 1.8;
-                                color: #444;
-                            }}
-                            .parsed-content table {{
-                                border-collapse: collapse;
-                                width: 100%;
-                                margin: 20px 0;
-                                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                            }}
-                            .parsed-content th, .parsed-content td {{
-                                border: 1px solid #ddd;
-                                padding: 12px;
-                                text-align: left;
-                            }}
-                            .parsed-content th {{
-                                background-color: #0066cc;
-                                color: white;
-                                font-weight: bold;
-                            }}
-                            .parsed-content tr:nth-child(even) {{
-                                background-color: #f8f9fa;
-                            }}
-                            .parsed-content tr:hover {{
-                                background-color: #e9ecef;
-                            }}
-                        </style>
-                        <div class="parsed-content">
+                        full_html = f"""
+                        <!DOCTYPE html>
+                        <html>
+                        <head>
+                            <meta charset="UTF-8">
+                            <title>{parsed.file_name} - Parsed</title>
+                            <style>
+                                body {{
+                                    font-family: 'Malgun Gothic', sans-serif;
+                                    margin: 40px;
+                                    line-height: 1.6;
+                                }}
+                                table {{ border-collapse: collapse; width: 100%; }}
+                                th, td {{ border: 1px solid #ddd; padding: 8px; }}
+                                th {{ background-color: #4CAF50; color: white; }}
+                            </style>
+                        </head>
+                        <body>
                             {html_content}
-                        </div>
+                        </body>
+                        </html>
                         """
-                        st.markdown(styled_html, unsafe_allow_html=True)
-                    else:
-                        st.info("HTML 콘텐츠가 없습니다.")
-                
-                # 표 추출 탭
-                with tabs[1]:
-                    st.subheader("추출된 표")
-                    
-                    tables = extract_tables_from_html(html_content)
-                    
-                    if tables:
-                        for i, table_data in enumerate(tables):
-                            st.write(f"### 표 {i+1}")
-                            
-                            # 안전하게 DataFrame 생성
-                            df = safe_create_dataframe(table_data)
-                            
-                            if not df.empty:
-                                st.dataframe(df, use_container_width=True)
-                                
-                                col1, col2 = st.columns(2)
-                                with col1:
-                                    csv = df.to_csv(index=False, encoding='utf-8-sig')
-                                    st.download_button(
-                                        f"💾 CSV 다운로드",
-                                        csv.encode('utf-8-sig'),
-                                        f"table_{i+1}.csv",
-                                        "text/csv",
-                                        key=f"csv_{i}"
-                                    )
-                                with col2:
-                                    try:
-                                        # 엑셀 다운로드
-                                        buffer = BytesIO()
-                                        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                                            df.to_excel(writer, index=False, sheet_name=f'Table_{i+1}')
-                                        buffer.seek(0)
-                                        st.download_button(
-                                            f"💾 Excel 다운로드",
-                                            buffer,
-                                            f"table_{i+1}.xlsx",
-                                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                            key=f"excel_{i}"
-                                        )
-                                    except Exception as e:
-                                        st.error(f"Excel 변환 오류: {str(e)}")
-                            else:
-                                st.warning(f"표 {i+1}을 DataFrame으로 변환할 수 없습니다.")
-                                # 원본 데이터 표시
-                                st.text("원본 데이터:")
-                                for row in table_data:
-                                    st.text(" | ".join(row))
-                    else:
-                        st.info("추출된 표가 없습니다.")
-                
-                # 마크다운 탭
-                with tabs[2]:
-                    st.subheader("마크다운 변환")
-                    
-                    markdown_content = result.get("content", {}).get("markdown", "")
-                    
-                    if not markdown_content and html_content:
-                        markdown_content = html_to_markdown(html_content)
-                    
-                    if markdown_content:
-                        st.markdown("### 미리보기")
-                        st.markdown(markdown_content)
-                        
-                        st.markdown("### 편집")
-                        edited_md = st.text_area(
-                            "마크다운 편집", 
-                            markdown_content, 
-                            height=400
+                        st.download_button(
+                            "📄 HTML 다운로드",
+                            full_html,
+                            f"{parsed.stem}_parsed.html",
+                            "text/html"
                         )
-                        
-                        if edited_md != markdown_content:
-                            st.download_button(
-                                "💾 편집된 마크다운 다운로드",
-                                edited_md,
-                                f"{uploaded.name.split('.')[0]}_edited.md",
-                                "text/markdown"
-                            )
-                    else:
-                        st.info("마크다운 콘텐츠가 없습니다.")
-                
-                # 이미지/도표 탭
-                with tabs[3]:
-                    st.subheader("추출된 이미지 및 도표")
-                    
-                    image_elements = []
-                    for elem in result.get("elements", []):
-                        if elem.get("base64_encoding"):
-                            image_elements.append(elem)
-                    
-                    if image_elements:
-                        for i, elem in enumerate(image_elements):
-                            cat = elem.get("category", "unknown")
-                            st.write(f"### {cat.upper()} {i+1}")
-                            
-                            try:
-                                img_data = base64.b64decode(elem["base64_encoding"])
-                                st.image(img_data, use_column_width=True)
-                                
-                                st.download_button(
-                                    f"💾 {cat}_{i+1} 다운로드",
-                                    img_data,
-                                    f"{cat}_{i+1}.png",
-                                    "image/png",
-                                    key=f"img_{i}"
-                                )
-                            except Exception as e:
-                                st.error(f"이미지 디코딩 오류: {str(e)}")
-                            
-                            st.divider()
-                    else:
-                        st.info("Base64 인코딩된 이미지가 없습니다. Base64 인코딩 옵션을 설정해주세요.")
-                
-                # 다운로드 탭
-                with tabs[4]:
-                    st.subheader("전체 문서 다운로드")
-                    
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        if html_content:
-                            full_html = f"""
-                            <!DOCTYPE html>
-                            <html>
-                            <head>
-                                <meta charset="UTF-8">
-                                <title>{uploaded.name} - Parsed</title>
-                                <style>
-                                    body {{ 
-                                        font-family: 'Malgun Gothic', sans-serif; 
-                                        margin: 40px;
-                                        line-height: 1.6;
-                                    }}
-                                    table {{ border-collapse: collapse; width: 100%; }}
-                                    th, td {{ border: 1px solid #ddd; padding: 8px; }}
-                                    th {{ background-color: #4CAF50; color: white; }}
-                                </style>
-                            </head>
-                            <body>
-                                {html_content}
-                            </body>
-                            </html>
-                            """
-                            st.download_button(
-                                "📄 HTML 다운로드",
-                                full_html,
-                                f"{uploaded.name.split('.')[0]}_parsed.html",
-                                "text/html"
-                            )
-                    
-                    with col2:
-                        if markdown_content:
-                            st.download_button(
-                                "📝 마크다운 다운로드",
-                                markdown_content,
-                                f"{uploaded.name.split('.')[0]}_parsed.md",
-                                "text/markdown"
-                            )
-                    
-                    with col3:
+
+                with col2:
+                    markdown_content = parsed.markdown()
+                    if markdown_content:
                         st.download_button(
-                            "🔍 JSON 다운로드",
-                            json.dumps(result, ensure_ascii=False, indent=2),
-                            f"{uploaded.name.split('.')[0]}_parsed.json",
-                            "application/json"
+                            "📝 마크다운 다운로드",
+                            markdown_content,
+                            f"{parsed.stem}_parsed.md",
+                            "text/markdown"
                         )
-                
-                # 원본 데이터 탭
-                with tabs[5]:
-                    st.subheader("원본 JSON 응답")
-                    st.json(result)
-                    
+
+                with col3:
+                    render_json_download(parsed, "json_download")
+
+            # 원본 데이터
             else:
-                st.error(f"❌ 파싱 실패: {resp.status_code}")
-                try:
-                    error_msg = resp.json()
-                except:
-                    error_msg = resp.text
-                st.error(f"오류 메시지: {error_msg}")
-                
-                # 파일 형식별 오류 처리
-                if file_ext == "HWP":
-                    st.info("""
-                    💡 **HWP 파일 오류 해결 방법:**
-                    1. HWP를 PDF로 변환 후 업로드
-                    2. 한글 프로그램에서 "다른 이름으로 저장" → PDF 선택
-                    3. 온라인 HWP→PDF 변환 서비스 이용
-                    """)
+                st.subheader("원본 JSON 응답")
+                render_element_browser(parsed, "elements")
+            profiler.mark(f"결과: {view}")
 
 # ─── OCR 페이지 ─────────────────────────────────────────────────────────────────
 elif page == "OCR":
@@ -501,59 +439,69 @@ elif page == "OCR":
         with col2:
             st.metric("파일 크기", f"{uploaded.size / 1024:.1f} KB")
         
-        files = {"document": (uploaded.name, uploaded.read(), uploaded.type)}
-        
-        data = {
-            "ocr": "force",
-            "model": "document-parse"
-        }
+        data = dict(OCR_PARAMS)
         
+        refresh = st.checkbox("♻️ 캐시 무시하고 다시 실행", help="같은 파일의 저장된 OCR 결과가 있어도 API를 다시 호출합니다")
+        image_prep = render_image_prep_options(get_image_prep_settings(), "ocr_image_prep") if is_image(uploaded.name) else None
+
+        results = get_ocr_results()
+        result_key = parse_result_key(uploaded.name, get_upload_digest(uploaded), data, image_prep)
+        profiler.mark("위젯 구성")
         if st.button("🔍 OCR 실행", type="primary"):
             with st.spinner("텍스트 추출 중..."):
-                resp = requests.post(f"{base_url}/document-digitization", headers=headers, files=files, data=data)
+                upload = prepare_upload(UploadSource.from_file(uploaded, uploaded.name, uploaded.type), image_prep)  # 복사 없이 스트리밍 업로드
+                resp = digitize_document_cached(http, api_key, {"document": upload}, data, document_cache, refresh, scheduler=scheduler)
             
             if resp.ok:
-                result = resp.json()
-                st.success("✅ OCR 완료!")
-                
-                # 텍스트 추출
-                html_content = result.get("content", {}).get("html", "")
-                text_content = result.get("content", {}).get("text", "")
-                
-                if not text_content and html_content:
-                    text_content = html_content.replace('<br>', '\n').replace('<br/>', '\n')
-                    text_content = re.sub('<[^<]+?>', '', text_content)
-                    text_content = re.sub(r'[ \t]+', ' ', text_content).strip()
-                
-                # 통계
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("총 문자 수", f"{len(text_content):,}")
-                with col2:
-                    st.metric("단어 수", f"{len(text_content.split()):,}")
-                with col3:
-                    st.metric("줄 수", f"{len(text_content.splitlines()):,}")
-                
-                # 텍스트 표시
-                st.subheader("추출된 텍스트")
-                st.code(text_content, language=None)
-                
-                # 다운로드
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.download_button(
-                        label="💾 TXT 다운로드",
-                        data=text_content,
-                        file_name=f"{uploaded.name.split('.')[0]}_ocr.txt",
-                        mime="text/plain"
-                    )
-                with col2:
-                    # 워드 형식으로도 저장 가능하도록
-                    st.download_button(
-                        label="💾 복사용 텍스트",
-                        data=text_content,
-                        file_name=f"{uploaded.name.split('.')[0]}_text.txt",
-                        mime="text/plain"
-                    )
+                with span("response_json"):
+                    result = resp.json()
+                results.put(result_key, ParsedDocument(result, uploaded.name, resp.from_cache))
+                get_search_index().add_document(f"ocr:{uploaded.name}:{uploaded.size}", uploaded.name, result, "ocr")
+                if resp.from_cache:
+                    st.success("⚡ 캐시된 OCR 결과를 불러왔습니다 (API 호출 없음)")
+                else:
+                    record_document_usage(result)
+                    st.success("✅ OCR 완료!")
             else:
                 st.error(f"❌ OCR 실패: {resp.status_code} - {resp.text}")
+        profiler.mark("API 호출")
+        
+        parsed = results.get(result_key)
+        if parsed is not None:
+            # 텍스트 추출
+            text_content = parsed.plain_text()
+            
+            # 통계
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("총 문자 수", f"{len(text_content):,}")
+            with col2:
+                st.metric("단어 수", f"{len(text_content.split()):,}")
+            with col3:
+                st.metric("줄 수", f"{len(text_content.splitlines()):,}")
+            
+            # 텍스트 표시
+            st.subheader("추출된 텍스트")
+            st.code(text_content, language=None)
+            
+            # 다운로드
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="💾 TXT 다운로드",
+                    data=text_content,
+                    file_name=f"{parsed.stem}_ocr.txt",
+                    mime="text/plain"
+                )
+            with col2:
+                # 워드 형식으로도 저장 가능하도록
+                st.download_button(
+                    label="💾 복사용 텍스트",
+                    data=text_content,
+                    file_name=f"{parsed.stem}_text.txt",
+                    mime="text/plain"
+                )
+            profiler.mark("결과: 텍스트")
+
+# 이번 실행의 구간별 시간 (?profile=1 또는 secrets [profiler] enabled 이면 사이드바에 표시)
+render_profiler_panel(profiler, profiler_enabled())
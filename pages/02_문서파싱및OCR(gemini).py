@@ -1,16 +1,62 @@
+# 구간별 실행 시간 측정은 import 전부터 시작 (콜드 스타트의 import 시간 포함)
+from telemetry import RerunProfiler, span
+
+profiler = RerunProfiler("02_gemini")
+
 import streamlit as st
-import requests
 import json
-import pandas as pd
-from io import BytesIO
-import base64
-import re
-from docx import Document # DOCX 처리를 위해 추가
+
+from app_resources import (
+    get_document_cache,
+    get_document_index,
+    get_http_session,
+    get_image_prep_settings,
+    get_ocr_results,
+    get_parse_results,
+    get_request_scheduler,
+    get_search_index,
+    get_upload_digest,
+    profiler_enabled,
+    start_metrics_endpoint,
+)
+from document_api import (
+    BASE64_ENCODING_OPTIONS,
+    OCR_PARAMS,
+    build_parse_params,
+    digitize_document_cached,
+    iter_chunk_results,
+    iter_file_results,
+    record_document_usage,
+)
+from document_chunks import merge_chunk_results, split_pdf
+from image_prep import is_image, prepare_image
+from parse_results import ParsedDocument, parse_result_key, text_to_docx_bytes
+from ui_panels import (
+    prepare_upload,
+    render_batch_progress,
+    render_chunk_progress,
+    render_document_cache_panel,
+    render_element_browser,
+    render_image_gallery,
+    render_image_prep_options,
+    render_json_download,
+    render_layout_viewer,
+    render_profiler_panel,
+    render_scheduler_panel,
+    render_table_list,
+    render_texts_bundle_download,
+)
+from upload_stream import UploadSource
+
+profiler.mark("imports")
 
 # 페이지 구성 및 API 설정
 st.set_page_config(page_title="📄 Upstage Document Tool", layout="wide")
 api_key = st.secrets["upstage_api_key"]
-base_url = "https://api.upstage.ai/v1"
+http = get_http_session()  # 프로세스 전역 keep-alive 세션
+scheduler = get_request_scheduler()  # 속도 제한/재시도 공용 스케줄러
+document_cache = get_document_cache()  # 파일 내용 + 옵션 기준 결과 캐시
+start_metrics_endpoint()
 
 # 사이드바 네비게이션
 st.sidebar.title("🔧 기능 선택")
@@ -29,112 +75,9 @@ st.sidebar.info("""
 - PPTX (파워포인트)
 - XLSX (엑셀)
 """)
-
-# 공통 헤더
-headers = {"Authorization": f"Bearer {api_key}"}
-
-# HTML을 마크다운으로 변환하는 함수
-def html_to_markdown(html_content):
-    """HTML을 마크다운으로 변환"""
-    # 제목 변환
-    html_content = re.sub(r'<h1[^>]*>(.*?)</h1>', r'# \1', html_content)
-    html_content = re.sub(r'<h2[^>]*>(.*?)</h2>', r'## \1', html_content)
-    html_content = re.sub(r'<h3[^>]*>(.*?)</h3>', r'### \1', html_content)
-    
-    # 줄바꿈
-    html_content = html_content.replace('<br>', '\n').replace('<br/>', '\n')
-    
-    # 단락
-    html_content = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', html_content)
-    
-    # 볼드
-    html_content = re.sub(r'<strong>(.*?)</strong>', r'**\1**', html_content)
-    html_content = re.sub(r'<b>(.*?)</b>', r'**\1**', html_content)
-    
-    # 이탤릭
-    html_content = re.sub(r'<em>(.*?)</em>', r'*\1*', html_content)
-    html_content = re.sub(r'<i>(.*?)</i>', r'*\1*', html_content)
-    
-    # 나머지 HTML 태그 제거
-    html_content = re.sub(r'<[^>]+>', '', html_content)
-    
-    return html_content.strip()
-
-# 표 추출 함수
-def extract_tables_from_html(html_content):
-    """HTML에서 표 추출"""
-    tables = []
-    table_pattern = r'<table[^>]*>(.*?)</table>'
-    table_matches = re.findall(table_pattern, html_content, re.DOTALL)
-    
-    for table_html in table_matches:
-        rows = []
-        row_pattern = r'<tr[^>]*>(.*?)</tr>'
-        row_matches = re.findall(row_pattern, table_html, re.DOTALL)
-        
-        for row_html in row_matches:
-            cells = []
-            cell_pattern = r'<t[hd][^>]*>(.*?)</t[hd]>'
-            cell_matches = re.findall(cell_pattern, row_html, re.DOTALL)
-            
-            for cell in cell_matches:
-                clean_cell = re.sub(r'<[^>]+>', '', cell).strip()
-                cells.append(clean_cell)
-            
-            if cells:
-                rows.append(cells)
-        
-        if rows:
-            tables.append(rows)
-    
-    return tables
-
-# 안전한 DataFrame 생성 함수
-def safe_create_dataframe(table_data):
-    """안전하게 DataFrame 생성"""
-    try:
-        if not table_data:
-            return pd.DataFrame()
-        
-        max_cols = 0
-        if table_data: # Ensure table_data is not empty before finding max_cols
-            # Filter out empty rows or rows with non-iterable elements before calculating max_cols
-            valid_rows = [row for row in table_data if hasattr(row, '__len__')]
-            if valid_rows:
-                 max_cols = max(len(row) for row in valid_rows)
-            else: # if all rows are invalid or table_data was initially empty after filtering
-                return pd.DataFrame()
-
-
-        normalized_data = []
-        for row in table_data: # Iterate original table_data for normalization
-            if hasattr(row, '__len__'): # Process only if row is iterable
-                 normalized_row = list(row) + [''] * (max_cols - len(row)) # Ensure row is list for extendability
-                 normalized_data.append(normalized_row)
-            # else: skip rows that are not iterable or handle as error/empty
-
-        if not normalized_data: # If no data could be normalized
-            return pd.DataFrame()
-
-        if len(normalized_data) > 1 and len(normalized_data[0]) == max_cols:
-            df = pd.DataFrame(normalized_data[1:], columns=normalized_data[0])
-        else:
-            df = pd.DataFrame(normalized_data)
-        
-        return df
-        
-    except Exception as e:
-        st.error(f"DataFrame 생성 오류: {str(e)}")
-        return pd.DataFrame(table_data) # Fallback to original data if error
-
-# 텍스트를 DOCX 파일 바이트로 변환하는 함수
-def text_to_docx_bytes(text_content):
-    doc = Document()
-    doc.add_paragraph(text_content)
-    bio = BytesIO()
-    doc.save(bio)
-    bio.seek(0)
-    return bio.getvalue()
+render_scheduler_panel(scheduler)
+render_document_cache_panel(document_cache)
+profiler.mark("사이드바/리소스")
 
 # ─── 문서 파싱 페이지 ───────────────────────────────────────────────────────────
 if page == "문서 파싱":
@@ -160,7 +103,7 @@ if page == "문서 파싱":
         with col1_opts:
             encode_option = st.selectbox(
                 "Base64 인코딩 옵션",
-                ["없음", "표만", "텍스트만", "텍스트와 표", "모든 요소"],
+                list(BASE64_ENCODING_OPTIONS),
                 key=f"encode_opt_{uploaded_file.name}"
             )
         with col2_opts:
@@ -184,162 +127,177 @@ if page == "문서 파싱":
             with col2_adv:
                 chart_recognition = st.checkbox("차트 인식", value=True, key=f"chart_recog_{uploaded_file.name}")
         
-        api_data = { # Renamed 'data' to 'api_data'
-            "ocr": ocr_mode.split()[0],
-            "model": "document-parse",
-            "coordinates": str(coordinates).lower(),
-            "chart_recognition": str(chart_recognition).lower()
-        }
-        
-        if output_format:
-            api_data["output_formats"] = str(output_format).replace("'", '"')
-        
-        if encode_option == "텍스트만":
-            api_data["base64_encoding"] = '["text"]'
-        elif encode_option == "표만":
-            api_data["base64_encoding"] = '["table"]'
-        elif encode_option == "텍스트와 표":
-            api_data["base64_encoding"] = '["text","table"]'
-        elif encode_option == "모든 요소":
-            api_data["base64_encoding"] = '["text","table","figure","chart","diagram","heading1","heading2","heading3","paragraph","list"]'
-        
+        api_data = build_parse_params(
+            ocr_mode.split()[0], coordinates, chart_recognition, output_format, encode_option
+        )
+
         with st.expander("📋 API 파라미터 확인"):
             st.json(api_data)
         
+        refresh = st.checkbox("♻️ 캐시 무시하고 다시 파싱", key=f"parse_refresh_{uploaded_file.name}", help="같은 파일과 옵션으로 저장된 결과가 있어도 API를 다시 호출하고 캐시를 덮어씁니다")
+        large_mode = file_ext == "PDF" and st.checkbox( # 대용량 PDF: 페이지 단위로 나눠 병렬 파싱 후 병합
+            "📚 대용량 모드 (페이지를 나눠 병렬 파싱)",
+            key=f"large_mode_{uploaded_file.name}",
+            help="수백 페이지 PDF를 청크로 나눠 동시에 파싱하고 끝나는 대로 보여준 뒤 하나의 결과로 합칩니다"
+        )
+        image_prep = render_image_prep_options(get_image_prep_settings(), f"parse_image_prep_{uploaded_file.name}") if is_image(uploaded_file.name) else None # 업로드 전 이미지 축소
+        if large_mode:
+            lm_col1, lm_col2, lm_col3 = st.columns(3)
+            with lm_col1:
+                pages_per_chunk = st.number_input("청크당 페이지 수", min_value=5, max_value=200, value=50, step=5, key=f"chunk_pages_{uploaded_file.name}")
+            with lm_col2:
+                max_workers = st.slider("동시 요청 수", 1, 8, 4, key=f"chunk_workers_{uploaded_file.name}")
+            with lm_col3:
+                use_async = st.checkbox("비동기 작업 API 사용", key=f"chunk_async_{uploaded_file.name}", help="청크를 비동기 엔드포인트에 제출하고 완료될 때까지 폴링합니다")
+        
+        results = get_parse_results() # 다시 실행되어도 결과 유지
+        result_key = parse_result_key(uploaded_file.name, get_upload_digest(uploaded_file), api_data, image_prep,
+                                      int(pages_per_chunk) if large_mode else None) # 내용 해시 + 옵션 (이미지 축소/청크 크기 포함)
+        
+        profiler.mark("위젯 구성")
         if st.button("🚀 파싱 실행", type="primary", key=f"parse_btn_{uploaded_file.name}"):
-            with st.spinner(f"{file_ext} 파일 파싱 중..."):
-                files_payload = {"document": (uploaded_file.name, uploaded_file.read(), uploaded_file.type)} # Renamed 'files'
-                resp = requests.post(f"{base_url}/document-digitization", headers=headers, files=files_payload, data=api_data)
-            
-            if resp.ok:
-                result = resp.json()
-                st.success(f"✅ {file_ext} 파일 파싱 성공!")
-                
-                res_col1, res_col2, res_col3 = st.columns(3) # Renamed for summary
-                with res_col1:
-                    st.metric("추출된 요소", len(result.get("elements", [])))
-                with res_col2:
-                    st.metric("처리된 페이지", result.get("usage", {}).get("pages", 0))
-                with res_col3:
-                    categories = {}
-                    for elem in result.get("elements", []):
-                        cat = elem.get("category", "unknown")
-                        categories[cat] = categories.get(cat, 0) + 1
-                    st.metric("요소 타입", len(categories))
-                
-                tabs = st.tabs(["📄 문서 뷰", "📊 표 추출", "📝 마크다운", "🖼️ 이미지/도표", "💾 다운로드", "🔍 원본 데이터"])
-                
-                html_content = result.get("content", {}).get("html", "")
-                markdown_content = result.get("content", {}).get("markdown", "")
-                if not markdown_content and html_content:
-                    markdown_content = html_to_markdown(html_content)
-
-                with tabs[0]:
-                    st.subheader("렌더링된 문서")
-                    if html_content:
-                        styled_html = f"""
-                        <style>
-                            .parsed-content {{ font-family: 'Noto Sans KR', sans-serif; line-height: 1.6; max-width: 900px; margin: 0 auto; padding: 30px; background: white; border-radius: 10px; box-shadow: 0 2px 20px rgba(0,0,0,0.1);}}
-                            .parsed-content h1 {{ color: #1a1a1a; border-bottom: 3px solid #0066cc; padding-bottom: 10px; margin: 30px 0 20px 0; font-size: 28px;}}
-                            .parsed-content h2 {{ color: #333; margin: 25px 0 15px 0; font-size: 22px;}}
-                            .parsed-content h3 {{ color: #555; margin: 20px 0 10px 0; font-size: 18px;}}
-                            .parsed-content p {{ margin: 15px 0; line-height: 1.8; color: #444;}}
-                            .parsed-content table {{ border-collapse: collapse; width: 100%; margin: 20px 0; box-shadow: 0 2px 10px rgba(0,0,0,0.1);}}
-                            .parsed-content th, .parsed-content td {{ border: 1px solid #ddd; padding: 12px; text-align: left;}}
-                            .parsed-content th {{ background-color: #0066cc; color: white; font-weight: bold;}}
-                            .parsed-content tr:nth-child(even) {{ background-color: #f8f9fa;}}
-                            .parsed-content tr:hover {{ background-color: #e9ecef;}}
-                        </style>
-                        <div class="parsed-content">{html_content}</div>"""
-                        st.markdown(styled_html, unsafe_allow_html=True)
+            result = None
+            chunks = []
+            if large_mode:
+                try:
+                    with st.spinner("PDF 페이지 분할 중..."):
+                        chunks = split_pdf(uploaded_file, int(pages_per_chunk))
+                except Exception as e:
+                    st.warning(f"⚠️ PDF를 나눌 수 없어 한 번에 파싱합니다: {e}")
+            if chunks:
+                st.info(f"📚 {chunks[-1][1]}쪽을 {len(chunks)}개 청크로 나눠 파싱합니다 (동시 {max_workers}개)")
+                done = render_chunk_progress(
+                    iter_chunk_results(http, api_key, uploaded_file.name, chunks, api_data, document_cache, refresh,
+                                       max_workers=max_workers, use_async=use_async, scheduler=scheduler),
+                    len(chunks)
+                )
+                succeeded = [chunk for chunk in done if chunk.ok]
+                for chunk in succeeded:
+                    if not chunk.from_cache:
+                        record_document_usage(chunk.result)
+                if succeeded:
+                    result = merge_chunk_results([(chunk.start_page, chunk.result) for chunk in succeeded])
+                    results.put(result_key, ParsedDocument(result, uploaded_file.name, all(chunk.from_cache for chunk in succeeded)))
+                    if len(succeeded) < len(done):
+                        st.warning(f"⚠️ {len(done) - len(succeeded)}개 청크가 실패해 해당 페이지가 결과에서 빠졌습니다. 다시 실행하면 성공한 청크는 캐시에서 불러옵니다.")
                     else:
-                        st.info("HTML 콘텐츠가 없습니다.")
+                        st.success(f"✅ {len(chunks)}개 청크 파싱 및 병합 완료!")
+                else:
+                    st.error("❌ 모든 청크의 파싱이 실패했습니다.")
+            else:
+                with st.spinner(f"{file_ext} 파일 파싱 중..."):
+                    files_payload = {"document": prepare_upload(UploadSource.from_file(uploaded_file, uploaded_file.name, uploaded_file.type), image_prep)} # 복사 없이 스트리밍 업로드
+                    resp = digitize_document_cached(http, api_key, files_payload, api_data, document_cache, refresh, scheduler=scheduler)
                 
-                with tabs[1]:
-                    st.subheader("추출된 표")
-                    tables = extract_tables_from_html(html_content)
-                    if tables:
-                        for i, table_data in enumerate(tables):
-                            st.write(f"### 표 {i+1}")
-                            df = safe_create_dataframe(table_data)
-                            if not df.empty:
-                                st.dataframe(df, use_container_width=True)
-                                df_col1, df_col2 = st.columns(2) # Renamed
-                                with df_col1:
-                                    csv_data = df.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig') # Renamed 'csv'
-                                    st.download_button(f"💾 CSV 다운로드", csv_data, f"table_{i+1}.csv", "text/csv", key=f"csv_{i}_{uploaded_file.name}")
-                                with df_col2:
-                                    try:
-                                        buffer = BytesIO()
-                                        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                                            df.to_excel(writer, index=False, sheet_name=f'Table_{i+1}')
-                                        buffer.seek(0)
-                                        st.download_button(f"💾 Excel 다운로드", buffer, f"table_{i+1}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key=f"excel_{i}_{uploaded_file.name}")
-                                    except Exception as e:
-                                        st.error(f"Excel 변환 오류: {str(e)}")
-                            else:
-                                st.warning(f"표 {i+1}을 DataFrame으로 변환할 수 없습니다.")
-                                st.text("원본 데이터:")
-                                for row in table_data:
-                                    st.text(" | ".join(str(cell) for cell in row)) # Ensure cells are strings
+                if resp.ok:
+                    with span("response_json"):
+                        result = resp.json()
+                    results.put(result_key, ParsedDocument(result, uploaded_file.name, resp.from_cache))
+                    if resp.from_cache:
+                        st.success(f"⚡ 캐시된 {file_ext} 파싱 결과를 불러왔습니다 (API 호출 없음)")
                     else:
-                        st.info("추출된 표가 없습니다.")
-                
-                with tabs[2]:
-                    st.subheader("마크다운 변환")
+                        record_document_usage(result)
+                        st.success(f"✅ {file_ext} 파일 파싱 성공!")
+                else:
+                    st.error(f"❌ 파싱 실패: {resp.status_code}")
+                    try:
+                        error_msg = resp.json()
+                    except json.JSONDecodeError: # More specific exception
+                        error_msg = resp.text
+                    st.error(f"오류 메시지: {error_msg}")
+                    if file_ext == "HWP":
+                        st.info("""💡 **HWP 파일 오류 해결 방법:**\n1. HWP를 PDF로 변환 후 업로드\n2. 한글 프로그램에서 "다른 이름으로 저장" → PDF 선택\n3. 온라인 HWP→PDF 변환 서비스 이용""")
+            if result is not None:
+                added_chunks = get_document_index().add_document(f"{uploaded_file.name}:{uploaded_file.size}", uploaded_file.name, result) # 챗봇 문서 검색용
+                if added_chunks:
+                    st.info(f"💬 챗봇 문서 검색 인덱스에 {added_chunks}개 구간으로 추가했습니다. 메인 페이지에서 이 문서에 대해 질문할 수 있습니다.")
+                get_search_index().add_document(f"parse:{uploaded_file.name}:{uploaded_file.size}", uploaded_file.name, result, "parse") # 문서 검색 페이지용
+        profiler.mark("API 호출")
+        
+        parsed = results.get(result_key)
+        if parsed is not None:
+            res_col1, res_col2, res_col3 = st.columns(3) # Renamed for summary
+            with res_col1:
+                st.metric("추출된 요소", len(parsed.elements))
+            with res_col2:
+                st.metric("처리된 페이지", parsed.pages)
+            with res_col3:
+                st.metric("요소 타입", len(parsed.categories()))
+            
+            # 선택한 보기만 렌더링 (st.tabs는 보이지 않는 탭 내용까지 매번 계산함)
+            view = st.radio(
+                "결과 보기",
+                ["📄 문서 뷰", "📊 표 추출", "📝 마크다운", "🖼️ 이미지/도표", "📐 레이아웃", "💾 다운로드", "🔍 원본 데이터"],
+                horizontal=True,
+                label_visibility="collapsed",
+                key=f"result_view_{uploaded_file.name}"
+            )
+            html_content = parsed.html
+
+            if view == "📄 문서 뷰":
+                st.subheader("렌더링된 문서")
+                if html_content:
+                    styled_html = f"""
+                    <style>
+                        .parsed-content {{ font-family: 'Noto Sans KR', sans-serif; line-height: 1.6; max-width: 900px; margin: 0 auto; padding: 30px; background: white; border-radius: 10px; box-shadow: 0 2px 20px rgba(0,0,0,0.1);}}
+                        .parsed-content h1 {{ color: #1a1a1a; border-bottom: 3px solid #0066cc; padding-bottom: 10px; margin: 30px 0 20px 0; font-size: 28px;}}
+                        .parsed-content h2 {{ color: #333; margin: 25px 0 15px 0; font-size: 22px;}}
+                        .parsed-content h3 {{ color: #555; margin: 20px 0 10px 0; font-size: 18px;}}
+                        .parsed-content p {{ margin: 15px 0; line-height: 1.8; color: #444;}}
+                        .parsed-content table {{ border-collapse: collapse; width: 100%; margin: 20px 0; box-shadow: 0 2px 10px rgba(0,0,0,0.1);}}
+                        .parsed-content th, .parsed-content td {{ border: 1px solid #ddd; padding: 12px; text-align: left;}}
+                        .parsed-content th {{ background-color: #0066cc; color: white; font-weight: bold;}}
+                        .parsed-content tr:nth-child(even) {{ background-color: #f8f9fa;}}
+                        .parsed-content tr:hover {{ background-color: #e9ecef;}}
+                    </style>
+                    <div class="parsed-content">{html_content}</div>"""
+                    st.markdown(styled_html, unsafe_allow_html=True)
+                else:
+                    st.info("HTML 콘텐츠가 없습니다.")
+            
+            elif view == "📊 표 추출":
+                st.subheader("추출된 표")
+                render_table_list(parsed, f"tables_{uploaded_file.name}")
+            
+            elif view == "📝 마크다운":
+                st.subheader("마크다운 변환")
+                markdown_content = parsed.markdown()
+                if markdown_content:
+                    st.markdown("### 미리보기")
+                    st.markdown(markdown_content)
+                    st.markdown("### 편집")
+                    edited_md = st.text_area("마크다운 편집", markdown_content, height=400, key=f"md_edit_{uploaded_file.name}")
+                    if edited_md != markdown_content:
+                        st.download_button("💾 편집된 마크다운 다운로드", edited_md.encode('utf-8'), f"{parsed.stem}_edited.md", "text/markdown", key=f"md_download_edited_{uploaded_file.name}")
+                else:
+                    st.info("마크다운 콘텐츠가 없습니다.")
+            
+            elif view == "🖼️ 이미지/도표":
+                st.subheader("추출된 이미지 및 도표")
+                render_image_gallery(parsed, f"images_{uploaded_file.name}") # 썸네일 페이지 + 원본은 선택 시에만
+            
+            elif view == "📐 레이아웃":
+                st.subheader("요소 레이아웃")
+                render_layout_viewer(parsed, uploaded_file, f"layout_{uploaded_file.name}") # 좌표 상자 + 클릭/영역 조회
+            
+            elif view == "💾 다운로드":
+                st.subheader("전체 문서 다운로드")
+                dl_all_col1, dl_all_col2, dl_all_col3 = st.columns(3) # Renamed
+                with dl_all_col1:
+                    if html_content:
+                        full_html = f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>{parsed.file_name} - Parsed</title><style>body {{ font-family: 'Malgun Gothic', sans-serif; margin: 40px; line-height: 1.6;}} table {{ border-collapse: collapse; width: 100%; }} th, td {{ border: 1px solid #ddd; padding: 8px; }} th {{ background-color: #4CAF50; color: white; }}</style></head><body>{html_content}</body></html>"""
+                        st.download_button("📄 HTML 다운로드", full_html.encode('utf-8'), f"{parsed.stem}_parsed.html", "text/html", key=f"html_full_download_{uploaded_file.name}")
+                with dl_all_col2:
+                    markdown_content = parsed.markdown()
                     if markdown_content:
-                        st.markdown("### 미리보기")
-                        st.markdown(markdown_content)
-                        st.markdown("### 편집")
-                        edited_md = st.text_area("마크다운 편집", markdown_content, height=400, key=f"md_edit_{uploaded_file.name}")
-                        if edited_md != markdown_content:
-                            st.download_button("💾 편집된 마크다운 다운로드", edited_md.encode('utf-8'), f"{uploaded_file.name.split('.')[0]}_edited.md", "text/markdown", key=f"md_download_edited_{uploaded_file.name}")
-                    else:
-                        st.info("마크다운 콘텐츠가 없습니다.")
-                
-                with tabs[3]:
-                    st.subheader("추출된 이미지 및 도표")
-                    image_elements = [elem for elem in result.get("elements", []) if elem.get("base64_encoding")]
-                    if image_elements:
-                        for i, elem in enumerate(image_elements):
-                            cat = elem.get("category", "unknown")
-                            st.write(f"### {cat.upper()} {i+1}")
-                            try:
-                                img_data = base64.b64decode(elem["base64_encoding"])
-                                st.image(img_data, use_column_width=True)
-                                st.download_button(f"💾 {cat}_{i+1} 다운로드", img_data, f"{cat}_{i+1}.png", "image/png", key=f"img_{i}_{uploaded_file.name}")
-                            except Exception as e:
-                                st.error(f"이미지 디코딩 오류: {str(e)}")
-                            st.divider()
-                    else:
-                        st.info("Base64 인코딩된 이미지가 없습니다. Base64 인코딩 옵션을 설정해주세요.")
-                
-                with tabs[4]:
-                    st.subheader("전체 문서 다운로드")
-                    dl_all_col1, dl_all_col2, dl_all_col3 = st.columns(3) # Renamed
-                    with dl_all_col1:
-                        if html_content:
-                            full_html = f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>{uploaded_file.name} - Parsed</title><style>body {{ font-family: 'Malgun Gothic', sans-serif; margin: 40px; line-height: 1.6;}} table {{ border-collapse: collapse; width: 100%; }} th, td {{ border: 1px solid #ddd; padding: 8px; }} th {{ background-color: #4CAF50; color: white; }}</style></head><body>{html_content}</body></html>"""
-                            st.download_button("📄 HTML 다운로드", full_html.encode('utf-8'), f"{uploaded_file.name.split('.')[0]}_parsed.html", "text/html", key=f"html_full_download_{uploaded_file.name}")
-                    with dl_all_col2:
-                        if markdown_content:
-                            st.download_button("📝 마크다운 다운로드", markdown_content.encode('utf-8'), f"{uploaded_file.name.split('.')[0]}_parsed.md", "text/markdown", key=f"md_full_download_{uploaded_file.name}")
-                    with dl_all_col3:
-                        json_str = json.dumps(result, ensure_ascii=False, indent=2)
-                        st.download_button("🔍 JSON 다운로드", json_str.encode('utf-8'), f"{uploaded_file.name.split('.')[0]}_parsed.json", "application/json", key=f"json_full_download_{uploaded_file.name}")
-                
-                with tabs[5]:
-                    st.subheader("원본 JSON 응답")
-                    st.json(result)
+                        st.download_button("📝 마크다운 다운로드", markdown_content.encode('utf-8'), f"{parsed.stem}_parsed.md", "text/markdown", key=f"md_full_download_{uploaded_file.name}")
+                with dl_all_col3:
+                    render_json_download(parsed, f"json_full_download_{uploaded_file.name}")
+            
             else:
-                st.error(f"❌ 파싱 실패: {resp.status_code}")
-                try:
-                    error_msg = resp.json()
-                except json.JSONDecodeError: # More specific exception
-                    error_msg = resp.text
-                st.error(f"오류 메시지: {error_msg}")
-                if file_ext == "HWP":
-                    st.info("""💡 **HWP 파일 오류 해결 방법:**\n1. HWP를 PDF로 변환 후 업로드\n2. 한글 프로그램에서 "다른 이름으로 저장" → PDF 선택\n3. 온라인 HWP→PDF 변환 서비스 이용""")
+                st.subheader("원본 JSON 응답")
+                render_element_browser(parsed, f"elements_{uploaded_file.name}")
+            profiler.mark(f"결과: {view}")
 
 # ─── OCR 페이지 (수정됨) ─────────────────────────────────────────────────────────
 elif page == "OCR":
@@ -353,79 +311,87 @@ elif page == "OCR":
     )
     
     if uploaded_files:
-        for uploaded_file_item in uploaded_files: # Changed loop variable name
-            with st.expander(f"📄 {uploaded_file_item.name} ({(uploaded_file_item.size / 1024):.1f} KB) 결과", expanded=True):
-                
-                files_data_ocr = {"document": (uploaded_file_item.name, uploaded_file_item.read(), uploaded_file_item.type)} # Renamed
-                
-                api_params_ocr = { # Renamed
-                    "ocr": "force",
-                    "model": "document-parse"
-                }
+        api_params_ocr = dict(OCR_PARAMS) # Renamed
+        ocr_results = get_ocr_results() # 다시 실행되어도 결과 유지
+        # 일괄/파일별 OCR 공통: 이미지는 업로드 전에 줄여 보낼 수 있음
+        ocr_image_prep = render_image_prep_options(get_image_prep_settings(), "ocr_image_prep") if any(is_image(f.name) for f in uploaded_files) else None
+        # 파일별 결과 키: 내용 해시 + OCR 파라미터 + (이미지일 때만) 축소 설정, 일괄 실행 전에 미리 계산
+        ocr_result_keys = [
+            parse_result_key(f.name, get_upload_digest(f), api_params_ocr, ocr_image_prep if is_image(f.name) else None)
+            for f in uploaded_files
+        ]
+        
+        # ─── 일괄 OCR: 모든 파일을 동시에 제출하고 끝나는 대로 표시 ───
+        st.markdown(f"#### 📦 일괄 OCR ({len(uploaded_files)}개 파일)")
+        batch_col1, batch_col2 = st.columns(2)
+        with batch_col1:
+            batch_workers = st.slider("동시 요청 수", 1, 16, 8, key="ocr_batch_workers")
+        with batch_col2:
+            batch_refresh = st.checkbox("♻️ 캐시 무시하고 다시 실행", key="ocr_batch_refresh")
+        st.caption("실제 속도는 요청 스케줄러의 초당 요청 수 제한(secrets [scheduler] rates.document)을 넘지 않습니다.")
+        
+        profiler.mark("위젯 구성")
+        if st.button("🚀 전체 OCR 실행", type="primary", key="ocr_run_all"):
+            def store_ocr_result(item):
+                if not item.ok:
+                    return ""
+                if not item.from_cache:
+                    record_document_usage(item.result)
+                source = uploaded_files[item.index]
+                parsed_item = ParsedDocument(item.result, item.name, item.from_cache)
+                ocr_results.put(ocr_result_keys[item.index], parsed_item)
+                get_search_index().add_document(f"ocr:{source.name}:{source.size}", source.name, item.result, "ocr")
+                return parsed_item.plain_text()
+            
+            batch_files = [UploadSource.from_file(f, f.name, f.type) for f in uploaded_files] # 파일별로 따로 읽으므로 스레드 간 공유 없음
+            batch_done = render_batch_progress(
+                iter_file_results(http, api_key, batch_files, api_params_ocr, document_cache, batch_refresh,
+                                  max_workers=batch_workers, scheduler=scheduler,
+                                  prepare=(lambda upload: prepare_image(upload, ocr_image_prep)) if ocr_image_prep else None),
+                len(batch_files),
+                on_result=store_ocr_result
+            )
+            batch_failed = [item.name for item in batch_done if not item.ok]
+            if batch_failed:
+                st.warning(f"⚠️ {len(batch_failed)}개 파일 실패: {', '.join(batch_failed[:10])}{' 외' if len(batch_failed) > 10 else ''}. 다시 실행하면 성공한 파일은 캐시에서 불러옵니다.")
+            else:
+                st.success(f"✅ {len(batch_done)}개 파일 OCR 완료!")
+        profiler.mark("API 호출")
+        
+        # 지금 올라와 있는 파일 중 결과가 있는 것만 모아서 합본 다운로드 (버튼을 누른 뒤에만 만듦)
+        named_results = []
+        for f, result_key_item in zip(uploaded_files, ocr_result_keys):
+            parsed_item = ocr_results.get(result_key_item)
+            if parsed_item is not None:
+                named_results.append((f.name, result_key_item, parsed_item))
+        if named_results:
+            st.markdown(f"##### 💾 합본 다운로드 ({len(named_results)}/{len(uploaded_files)}개 파일)")
+            render_texts_bundle_download(named_results, "ocr_bundle")
+        st.divider()
+        profiler.mark("결과: 합본")
+        
+        for uploaded_file_item, ocr_result_key in zip(uploaded_files, ocr_result_keys): # Changed loop variable name
+            # 파일이 많으면 접어서 표시
+            with st.expander(f"📄 {uploaded_file_item.name} ({(uploaded_file_item.size / 1024):.1f} KB) 결과", expanded=len(uploaded_files) <= 3):
                 
                 button_key_ocr = f"ocr_button_{uploaded_file_item.name}_{uploaded_file_item.size}" # Added size for more uniqueness
+                refresh_ocr = st.checkbox("♻️ 캐시 무시하고 다시 실행", key=f"ocr_refresh_{uploaded_file_item.name}_{uploaded_file_item.size}")
+                profiler.mark("결과: 파일별") # 파일별 시간은 여러 파일에 걸쳐 누적
                 if st.button("🔍 OCR 실행", type="primary", key=button_key_ocr):
                     with st.spinner(f"{uploaded_file_item.name} 텍스트 추출 중..."):
-                        resp = requests.post(f"{base_url}/document-digitization", headers=headers, files=files_data_ocr, data=api_params_ocr)
+                        files_data_ocr = {"document": prepare_upload(UploadSource.from_file(uploaded_file_item, uploaded_file_item.name, uploaded_file_item.type), ocr_image_prep)} # 복사 없이 스트리밍 업로드
+                        resp = digitize_document_cached(http, api_key, files_data_ocr, api_params_ocr, document_cache, refresh_ocr, scheduler=scheduler)
                     
                     if resp.ok:
-                        result_ocr = resp.json() # Renamed
-                        st.success(f"✅ {uploaded_file_item.name}: OCR 완료!")
-                        
-                        html_content_ocr = result_ocr.get("content", {}).get("html", "") # Renamed
-                        text_content_ocr = result_ocr.get("content", {}).get("text", "") # Renamed
-                        
-                        if not text_content_ocr and html_content_ocr:
-                            temp_text = html_content_ocr.replace('<br>', '\n').replace('<br/>', '\n')
-                            temp_text = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n', temp_text) 
-                            temp_text = re.sub('<[^<]+?>', '', temp_text) 
-                            text_content_ocr = re.sub(r'[ \t]+', ' ', temp_text).strip()
-                            text_content_ocr = "\n".join([line.strip() for line in text_content_ocr.splitlines() if line.strip()])
-
-                        if text_content_ocr:
-                            ocr_stat_col1, ocr_stat_col2, ocr_stat_col3 = st.columns(3) # Renamed
-                            with ocr_stat_col1:
-                                st.metric("총 문자 수", f"{len(text_content_ocr):,}", key=f"char_cnt_{uploaded_file_item.name}_{uploaded_file_item.size}")
-                            with ocr_stat_col2:
-                                st.metric("단어 수", f"{len(text_content_ocr.split()):,}", key=f"word_cnt_{uploaded_file_item.name}_{uploaded_file_item.size}")
-                            with ocr_stat_col3:
-                                st.metric("줄 수", f"{len(text_content_ocr.splitlines()):,}", key=f"line_cnt_{uploaded_file_item.name}_{uploaded_file_item.size}")
-                            
-                            st.subheader("추출된 텍스트")
-                            st.text_area(
-                                label="추출된 텍스트 내용:", # Changed label from " "
-                                value=text_content_ocr, 
-                                height=300, 
-                                key=f"text_area_{uploaded_file_item.name}_{uploaded_file_item.size}", 
-                                disabled=True
-                            )
-                            
-                            st.markdown("##### 💾 다운로드")
-                            ocr_dl_col1, ocr_dl_col2 = st.columns(2) # Renamed
-                            with ocr_dl_col1:
-                                st.download_button(
-                                    label="TXT 파일 (.txt)",
-                                    data=text_content_ocr.encode('utf-8'),
-                                    file_name=f"{uploaded_file_item.name.split('.')[0]}_ocr.txt",
-                                    mime="text/plain",
-                                    key=f"txt_dl_{uploaded_file_item.name}_{uploaded_file_item.size}"
-                                )
-                            with ocr_dl_col2:
-                                try:
-                                    docx_bytes = text_to_docx_bytes(text_content_ocr)
-                                    st.download_button(
-                                        label="Word 파일 (.docx)",
-                                        data=docx_bytes,
-                                        file_name=f"{uploaded_file_item.name.split('.')[0]}_ocr.docx",
-                                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                        key=f"docx_dl_{uploaded_file_item.name}_{uploaded_file_item.size}"
-                                    )
-                                except Exception as e:
-                                    st.error(f"DOCX 변환 오류: {e}")
+                        with span("response_json"):
+                            result_ocr = resp.json() # Renamed
+                        ocr_results.put(ocr_result_key, ParsedDocument(result_ocr, uploaded_file_item.name, resp.from_cache))
+                        get_search_index().add_document(f"ocr:{uploaded_file_item.name}:{uploaded_file_item.size}", uploaded_file_item.name, result_ocr, "ocr")
+                        if resp.from_cache:
+                            st.success(f"⚡ {uploaded_file_item.name}: 캐시된 OCR 결과를 불러왔습니다 (API 호출 없음)")
                         else:
-                            st.info("추출된 텍스트가 없습니다.")
-                            st.json(result_ocr)
-
+                            record_document_usage(result_ocr)
+                            st.success(f"✅ {uploaded_file_item.name}: OCR 완료!")
                     else:
                         st.error(f"❌ {uploaded_file_item.name}: OCR 실패 (상태 코드: {resp.status_code})")
                         try:
@@ -433,6 +399,59 @@ elif page == "OCR":
                         except json.JSONDecodeError: # More specific exception
                             error_detail = resp.text
                         st.error(f"오류 내용: {error_detail}")
+                profiler.mark("API 호출")
+                
+                parsed_ocr = ocr_results.get(ocr_result_key)
+                if parsed_ocr is not None:
+                    text_content_ocr = parsed_ocr.plain_text()
+
+                    if text_content_ocr:
+                        ocr_stat_col1, ocr_stat_col2, ocr_stat_col3 = st.columns(3) # Renamed
+                        with ocr_stat_col1:
+                            st.metric("총 문자 수", f"{len(text_content_ocr):,}")
+                        with ocr_stat_col2:
+                            st.metric("단어 수", f"{len(text_content_ocr.split()):,}")
+                        with ocr_stat_col3:
+                            st.metric("줄 수", f"{len(text_content_ocr.splitlines()):,}")
+                        
+                        st.subheader("추출된 텍스트")
+                        st.text_area(
+                            label="추출된 텍스트 내용:", # Changed label from " "
+                            value=text_content_ocr, 
+                            height=300, 
+                            key=f"text_area_{uploaded_file_item.name}_{uploaded_file_item.size}", 
+                            disabled=True
+                        )
+                        
+                        st.markdown("##### 💾 다운로드")
+                        ocr_dl_col1, ocr_dl_col2 = st.columns(2) # Renamed
+                        with ocr_dl_col1:
+                            st.download_button(
+                                label="TXT 파일 (.txt)",
+                                data=text_content_ocr.encode('utf-8'),
+                                file_name=f"{parsed_ocr.stem}_ocr.txt",
+                                mime="text/plain",
+                                key=f"txt_dl_{uploaded_file_item.name}_{uploaded_file_item.size}"
+                            )
+                        with ocr_dl_col2:
+                            try:
+                                docx_bytes = parsed_ocr.derived("docx", lambda: text_to_docx_bytes(text_content_ocr))
+                                st.download_button(
+                                    label="Word 파일 (.docx)",
+                                    data=docx_bytes,
+                                    file_name=f"{parsed_ocr.stem}_ocr.docx",
+                                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                                    key=f"docx_dl_{uploaded_file_item.name}_{uploaded_file_item.size}"
+                                )
+                            except Exception as e:
+                                st.error(f"DOCX 변환 오류: {e}")
+                    else:
+                        st.info("추출된 텍스트가 없습니다.")
+                        render_element_browser(parsed_ocr, f"ocr_elements_{uploaded_file_item.name}_{uploaded_file_item.size}")
                 st.divider()
+                profiler.mark("결과: 파일별")
     else:
         st.info("OCR을 실행할 파일을 업로드해주세요.")
+
+# 이번 실행의 구간별 시간 (?profile=1 또는 secrets [profiler] enabled 이면 사이드바에 표시)
+render_profiler_panel(profiler, profiler_enabled())
@@ -0,0 +1,95 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from app_resources import start_metrics_endpoint
+from telemetry import TELEMETRY, histogram_quantile
+
+# 페이지 구성
+st.set_page_config(page_title="📊 관리자 지표", layout="wide")
+metrics_server = start_metrics_endpoint()
+
+# secrets에 admin_password가 있으면 비밀번호 확인
+admin_password = st.secrets.get("admin_password")
+if admin_password and st.session_state.get("admin_authenticated") is not True:
+    password = st.text_input("관리자 비밀번호", type="password")
+    if password != admin_password:
+        if password:
+            st.error("비밀번호가 올바르지 않습니다.")
+        st.stop()
+    st.session_state.admin_authenticated = True
+
+st.title("📊 요청 지표")
+if metrics_server is not None:
+    host, port = metrics_server.server_address[:2]
+    st.caption(f"Prometheus 수집 주소: http://{host}:{port}/metrics")
+else:
+    st.caption("secrets [telemetry] metrics_port 를 설정하면 /metrics 엔드포인트가 열립니다.")
+
+col1, col2 = st.columns([1, 5])
+with col1:
+    if st.button("🔄 새로고침"):
+        pass  # 버튼 클릭 자체로 스크립트가 다시 실행됨
+with col2:
+    if st.button("🗑️ 지표 초기화"):
+        TELEMETRY.reset()
+        st.success("수집된 값을 초기화했습니다.")
+
+
+def _format_labels(labels):
+    return ", ".join(f"{k}={v}" for k, v in labels) or "-"
+
+
+# 카운터
+counter_rows = [
+    {"지표": counter.name, "라벨": _format_labels(labels), "값": value}
+    for counter in TELEMETRY.counters.values()
+    for labels, value in sorted(counter.snapshot().items())
+]
+st.subheader("🔢 카운터")
+if counter_rows:
+    st.dataframe(pd.DataFrame(counter_rows), use_container_width=True, hide_index=True)
+else:
+    st.caption("아직 기록된 값이 없습니다.")
+
+# 히스토그램: 지표별 요약 표 + 선택한 시계열의 버킷 분포
+st.subheader("⏱️ 히스토그램")
+for histogram in TELEMETRY.histograms.values():
+    snapshot = histogram.snapshot()
+    if not snapshot:
+        continue
+    st.markdown(f"**{histogram.name}** — {histogram.help}")
+    rows = []
+    for labels, data in sorted(snapshot.items()):
+        rows.append({
+            "라벨": _format_labels(labels),
+            "개수": data["count"],
+            "평균": data["sum"] / data["count"] if data["count"] else 0.0,
+            "p50(근사)": histogram_quantile(data["buckets"], 0.5),
+            "p95(근사)": histogram_quantile(data["buckets"], 0.95),
+        })
+    st.dataframe(pd.DataFrame(rows).round(4), use_container_width=True, hide_index=True)
+
+    label_options = [row["라벨"] for row in rows]
+    selected = st.selectbox("분포 보기", label_options, key=f"hist_{histogram.name}")
+    data = snapshot[sorted(snapshot)[label_options.index(selected)]]
+    # 누적 개수를 버킷별 개수로 되돌려 막대 그래프로 표시
+    bars, previous = [], 0
+    for bound, count in data["buckets"]:
+        bars.append({"상한(le)": "+Inf" if bound == float("inf") else f"{bound:g}", "개수": count - previous})
+        previous = count
+    fig = px.bar(pd.DataFrame(bars), x="상한(le)", y="개수")
+    fig.update_layout(height=260, margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+
+# Prometheus 텍스트 내보내기
+st.subheader("📤 Prometheus 텍스트")
+prometheus_text = TELEMETRY.prometheus_text()
+st.download_button(
+    label="📥 metrics.txt 다운로드",
+    data=prometheus_text,
+    file_name="metrics.txt",
+    mime="text/plain"
+)
+with st.expander("원문 보기"):
+    st.code(prometheus_text, language="text")
@@ -0,0 +1,69 @@
+import time
+
+import streamlit as st
+
+from app_resources import get_search_index, start_metrics_endpoint
+
+# 페이지 구성
+st.set_page_config(page_title="🔎 문서 검색", layout="wide")
+start_metrics_endpoint()
+index = get_search_index()  # 모든 세션이 공유하는 전문 검색 인덱스
+
+SOURCES = {"전체": None, "문서 파싱": "parse", "OCR": "ocr"}
+SOURCE_LABELS = {"parse": "문서 파싱", "ocr": "OCR"}
+
+st.title("🔎 문서 검색")
+doc_count, page_count, passage_count = index.usage()
+st.caption(f"문서 파싱/OCR 페이지에서 처리한 결과 전체를 검색합니다 · 문서 {doc_count:,}개 · {page_count:,}쪽 · 구간 {passage_count:,}개")
+
+col1, col2, col3 = st.columns([4, 2, 1])
+with col1:
+    query = st.text_input("검색어", placeholder="예: 계약 해지 조항")
+with col2:
+    source_label = st.radio("대상", list(SOURCES), horizontal=True)
+with col3:
+    limit = st.selectbox("결과 수", [20, 50, 100])
+
+if query.strip():
+    start = time.perf_counter()
+    hits = index.search(query, limit, SOURCES[source_label])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"{len(hits)}건 · {elapsed_ms:.1f}ms")
+    if not hits:
+        st.info("검색 결과가 없습니다. 한 글자 단어보다 두 글자 이상의 단어가 정확합니다.")
+    for hit in hits:
+        page = f" · {hit.page}쪽" if hit.page else ""
+        st.markdown(f"**📄 {hit.file_name}**{page} · {SOURCE_LABELS.get(hit.source, hit.source)}")
+        st.markdown(hit.snippet)
+        st.divider()
+elif not doc_count:
+    st.info("아직 색인된 문서가 없습니다. 문서 파싱 또는 OCR 을 실행하면 자동으로 추가됩니다.")
+
+with st.expander(f"📚 색인된 문서 ({doc_count:,}개)"):
+    documents = index.documents(limit=200)
+    if documents:
+        st.dataframe(
+            [
+                {
+                    "파일": doc["file_name"],
+                    "종류": SOURCE_LABELS.get(doc["source"], doc["source"]),
+                    "쪽": doc["pages"],
+                    "구간": doc["passages"],
+                    "색인 시각": time.strftime("%Y-%m-%d %H:%M", time.localtime(doc["indexed_at"])),
+                }
+                for doc in documents
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+        labels = {doc["doc_id"]: f"{doc['file_name']} ({SOURCE_LABELS.get(doc['source'], doc['source'])})" for doc in documents}
+        remove_col1, remove_col2 = st.columns([3, 1])
+        with remove_col1:
+            doc_id = st.selectbox("문서 제거", list(labels), format_func=labels.get, index=None, placeholder="제거할 문서 선택")
+        with remove_col2:
+            if st.button("🗑️ 제거", disabled=doc_id is None):
+                index.remove_document(doc_id)
+                st.rerun()
+        if st.button("🗑️ 색인 전체 삭제"):
+            index.clear()
+            st.rerun()
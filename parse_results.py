@@ -0,0 +1,286 @@
+# parse_results.py
+"""파싱/OCR 결과와 파생 산출물의 지연 계산 (Streamlit 비의존)
+
+페이지는 API 응답을 ParsedDocument로 감싸 세션에 보관하고,
+화면에 보이는 뷰가 필요로 하는 산출물(DataFrame, CSV, 전체 표 Excel, Word, 마크다운,
+이미지 썸네일/원본, 이미지 ZIP, 좌표 인덱스, JSON 파일)만 처음 요청될 때 만들어 재사용한다.
+다운로드 버튼 클릭이나 텍스트 편집으로 스크립트가 다시 실행되어도
+API 호출이나 재계산이 일어나지 않는다.
+요소는 열 단위 ElementStore 로 옮겨 보관하고 원본 응답 dict 는 들고 있지 않는다.
+"""
+import base64
+import dataclasses
+import json
+import re
+import tempfile
+import zipfile
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image
+
+from document_cache import normalize_params
+from element_index import SpatialIndex
+from element_store import ElementStore
+from html_markdown import html_to_markdown
+from html_tables import extract_tables_from_html, safe_create_dataframe, write_tables_workbook
+from telemetry import span, timed
+
+_PARAGRAPH_PATTERN = re.compile(r'<p[^>]*>(.*?)</p>', re.DOTALL)
+_TAG_PATTERN = re.compile(r'<[^<]+?>')
+_SPACES_PATTERN = re.compile(r'[ \t]+')
+
+THUMBNAIL_SIZE = 320  # 썸네일 긴 변(px)
+JSON_SPOOL_SIZE = 1024 * 1024  # JSON 다운로드 파일을 메모리에 둘 상한
+
+
+def _image_extension(data):
+    if data.startswith(b"\x89PNG"):
+        return "png"
+    if data.startswith(b"\xff\xd8"):
+        return "jpg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return "png"
+
+
+def make_thumbnail(image_bytes, max_size=THUMBNAIL_SIZE):
+    """긴 변이 max_size 이하인 JPEG 썸네일 바이트 (투명 배경은 흰색으로)"""
+    with Image.open(BytesIO(image_bytes)) as image:
+        image.draft("RGB", (max_size, max_size))  # JPEG 는 디코딩 단계에서 바로 축소
+        image.thumbnail((max_size, max_size))
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+@timed("docx_export")
+def text_to_docx_bytes(text_content):
+    """텍스트를 문단 하나짜리 Word(.docx) 바이트로 변환"""
+    from docx import Document  # Word 파일을 만들 때만 로드
+
+    doc = Document()
+    doc.add_paragraph(text_content)
+    bio = BytesIO()
+    doc.save(bio)
+    return bio.getvalue()
+
+
+def parse_result_key(file_name, file_hash, data, image_prep=None, pages_per_chunk=None):
+    """세션 내 결과 키: 파일 이름 + 내용 SHA-256 + 정규화된 요청 파라미터 + 결과를 바꾸는 처리 옵션
+
+    이름과 크기가 같은 다른 파일이 섞이지 않도록 내용 해시를 쓰고,
+    요청 밖에서 정하는 이미지 축소 설정(ImagePrepSettings)과 대용량 모드 청크 크기도 키에 넣는다.
+    """
+    params = json.dumps(normalize_params(data), ensure_ascii=False, sort_keys=True)
+    options = json.dumps(
+        {"image_prep": dataclasses.asdict(image_prep) if image_prep else None, "pages_per_chunk": pages_per_chunk},
+        sort_keys=True
+    )
+    return f"{file_name}:{file_hash}:{params}:{options}"
+
+
+class ParsedDocument:
+    """document-digitization 응답 하나와 그 파생 산출물 (처음 접근할 때 계산 후 메모이즈)"""
+
+    def __init__(self, result, file_name, from_cache=False):
+        # elements 는 열 단위 ElementStore 로 옮기고 원본 dict 는 들고 있지 않음
+        self.meta = {key: value for key, value in result.items() if key != "elements"}
+        self.elements = ElementStore(result.get("elements", []))
+        self._keys = list(result)
+        self.file_name = file_name
+        self.from_cache = from_cache
+        self.result_key = file_name  # 세션 결과 키 (SessionResults.put 이 parse_result_key 로 채움)
+        self._memo = {}
+
+    def derived(self, key, build):
+        """key에 해당하는 산출물이 없을 때만 build()로 만들어 보관 (페이지 고유 산출물에도 사용)"""
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    @property
+    def stem(self):
+        return self.file_name.split('.')[0]
+
+    @property
+    def html(self):
+        return self.meta.get("content", {}).get("html", "")
+
+    @property
+    def pages(self):
+        return self.meta.get("usage", {}).get("pages", 0)
+
+    def categories(self):
+        """요소 카테고리별 개수"""
+        return self.derived("categories", self.elements.category_counts)
+
+    def markdown(self):
+        """응답의 markdown, 없으면 HTML에서 변환"""
+        def build():
+            markdown_content = self.meta.get("content", {}).get("markdown", "")
+            if not markdown_content and self.html:
+                markdown_content = html_to_markdown(self.html)
+            return markdown_content
+        return self.derived("markdown", build)
+
+    def plain_text(self):
+        """OCR 결과 텍스트 (text가 없으면 HTML 태그를 걷어내고 빈 줄 정리)"""
+        def build():
+            text_content = self.meta.get("content", {}).get("text", "")
+            if not text_content and self.html:
+                temp_text = self.html.replace('<br>', '\n').replace('<br/>', '\n')
+                temp_text = _PARAGRAPH_PATTERN.sub(r'\1\n', temp_text)
+                temp_text = _TAG_PATTERN.sub('', temp_text)
+                text_content = _SPACES_PATTERN.sub(' ', temp_text).strip()
+                text_content = "\n".join(line.strip() for line in text_content.splitlines() if line.strip())
+            return text_content
+        return self.derived("plain_text", build)
+
+    def tables(self):
+        return self.derived("tables", lambda: extract_tables_from_html(self.html))
+
+    def dataframe(self, index):
+        return self.derived(("dataframe", index), lambda: safe_create_dataframe(self.tables()[index]))
+
+    def csv_bytes(self, index):
+        return self.derived(
+            ("csv", index),
+            lambda: self.dataframe(index).to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
+        )
+
+    def tables_workbook_bytes(self):
+        """모든 표를 시트 하나씩 담은 xlsx 바이트 (요청될 때 한 번만 만듦)"""
+        def build():
+            buffer = BytesIO()
+            with span("excel_export"):
+                write_tables_workbook(self.tables(), buffer)
+            return buffer.getvalue()
+        return self.derived("tables_workbook", build)
+
+    def spatial_index(self):
+        """요소 좌표의 페이지별 격자 인덱스 (레이아웃 보기/영역 질의용)"""
+        return self.derived("spatial_index", lambda: SpatialIndex(self.elements.boxes()))
+
+    def image_elements(self):
+        """base64 이미지가 있는 요소의 요약 (index 는 elements 안의 위치, 이미지 자체는 담지 않음)"""
+        store = self.elements
+        return self.derived("image_elements", lambda: [
+            {"index": i, "id": store.element_id(i), "category": store.category(i), "page": store.page(i)}
+            for i in store.base64_indices()
+        ])
+
+    def _decode_image(self, index):
+        return self.elements.image_bytes(self.image_elements()[index]["index"])
+
+    def image_bytes(self, index):
+        """원본 해상도 이미지 (보거나 내려받을 때만 디코딩)"""
+        return self.derived(("image", index), lambda: self._decode_image(index))
+
+    def thumbnail_bytes(self, index, max_size=THUMBNAIL_SIZE):
+        """목록용 축소 이미지 (원본 디코딩 결과는 보관하지 않고 썸네일만 보관)"""
+        return self.derived(("thumbnail", index, max_size), lambda: make_thumbnail(self._decode_image(index), max_size))
+
+    def image_file_name(self, index):
+        elem = self.image_elements()[index]
+        extension = _image_extension(base64.b64decode(self.elements.base64_head(elem["index"])))
+        return f"{elem['category']}_{index + 1}_p{elem['page'] or 0}.{extension}"
+
+    def images_zip_bytes(self, categories=None):
+        """카테고리(None 이면 전체) 이미지를 하나씩 디코딩해 바로 ZIP 에 기록 (이미 압축된 형식이라 무압축 저장)"""
+        categories = tuple(sorted(categories)) if categories else None
+
+        def build():
+            buffer = BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+                for i, elem in enumerate(self.image_elements()):
+                    if categories is None or elem["category"] in categories:
+                        archive.writestr(self.image_file_name(i), self._decode_image(i))
+            return buffer.getvalue()
+        return self.derived(("images_zip", categories), build)
+
+    def iter_json(self, indent=2):
+        """응답 전체를 json.dumps(result, ensure_ascii=False, indent=indent) 와 같은 텍스트 조각으로
+
+        원본 dict 를 다시 만들지 않고 요소를 하나씩 직렬화한다 (base64 도 그때 읽음).
+        """
+        if not self._keys:
+            yield "{}"
+            return
+        pad = " " * indent
+        yield "{"
+        for n, key in enumerate(self._keys):
+            yield ("," if n else "") + "\n" + pad + json.dumps(key, ensure_ascii=False) + ": "
+            if key == "elements":
+                yield from self.elements.iter_json(indent, level=1)
+            else:
+                yield json.dumps(self.meta[key], ensure_ascii=False, indent=indent).replace("\n", "\n" + pad)
+        yield "\n}"
+
+    def json_file(self):
+        """iter_json 을 조각 단위로 기록한 임시 파일 (JSON 다운로드용, 요청될 때 한 번만 만듦)
+
+        JSON_SPOOL_SIZE 를 넘으면 디스크로 넘어가므로 결과를 세션에 보관해도 메모리에 남지 않는다.
+        """
+        def build():
+            spool = tempfile.SpooledTemporaryFile(max_size=JSON_SPOOL_SIZE)
+            with span("json_export"):
+                for chunk in self.iter_json():
+                    spool.write(chunk.encode("utf-8"))
+            return spool
+        spool = self.derived("json_file", build)
+        spool.seek(0)
+        return spool
+
+
+class SessionResults:
+    """세션에 보관하는 최근 결과 (키 -> ParsedDocument), 오래된 것부터 maxsize 개를 넘으면 버림"""
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key, parsed):
+        parsed.result_key = key
+        self._items[key] = parsed
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def combined_text(named_texts):
+    """[(파일 이름, 텍스트), ...] 를 파일 구분선과 함께 하나의 텍스트로 합침"""
+    return "\n\n".join(f"===== {name} =====\n{text}" for name, text in named_texts)
+
+
+def texts_zip_bytes(named_texts, suffix="_ocr.txt"):
+    """파일별 텍스트를 {이름}{suffix} 로 담고 전체 합본(all{suffix})을 더한 ZIP 바이트"""
+    buffer = BytesIO()
+    used = set()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in named_texts:
+            stem = name.rsplit('.', 1)[0] or name
+            entry, n = f"{stem}{suffix}", 1
+            while entry in used:  # 이름이 같은 파일이 여러 개면 번호를 붙임
+                n += 1
+                entry = f"{stem} ({n}){suffix}"
+            used.add(entry)
+            archive.writestr(entry, text)
+        archive.writestr(f"all{suffix}", combined_text(named_texts))
+    return buffer.getvalue()
@@ -0,0 +1,285 @@
+# request_scheduler.py
+"""Upstage API 호출 공용 스케줄러 (Streamlit 비의존)
+
+- 엔드포인트별 토큰 버킷으로 초당 요청 수 제한
+- 전체 동시 요청 수 제한 (세마포어, 스트리밍 응답은 다 읽거나 닫을 때까지 슬롯 유지)
+- 429/5xx/연결 오류 시 지수 백오프 + 지터로 재시도, Retry-After 존중
+- 429를 받으면 해당 엔드포인트 버킷 전체를 Retry-After 만큼 멈춰
+  모든 사용자가 같은 순간에 재시도하지 않도록 한다
+"""
+import random
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# 상태 코드 없이 재시도할 수 있는 네트워크 오류
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+
+def is_retryable_exception(e):
+    """네트워크 오류 여부 (openai.APIConnectionError 는 APITimeoutError 포함)
+
+    openai 는 채팅 클라이언트를 만들 때 로드되므로 여기서 import 하지 않는다.
+    로드되지 않았다면 openai 예외도 생길 수 없다.
+    """
+    if isinstance(e, RETRYABLE_EXCEPTIONS):
+        return True
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(e, openai.APIConnectionError)
+
+
+def parse_retry_after(headers):
+    """Retry-After(초 또는 HTTP 날짜) / retry-after-ms 헤더를 초 단위로 변환"""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable_status(status_code):
+    return status_code == 429 or (status_code is not None and status_code >= 500)
+
+
+class TokenBucket:
+    """초당 rate개, 최대 capacity개까지 쌓이는 토큰 버킷"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """토큰 하나를 예약하고 기다려야 할 시간(초)을 반환
+
+        토큰을 음수까지 미리 빌려 쓰므로 먼저 온 요청이 먼저 나간다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds):
+        """서버가 Retry-After를 요구하면 버킷 전체를 그 시간만큼 멈춤"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+@dataclass
+class EndpointStats:
+    queued: int = 0          # 현재 대기 중인 요청 수 (큐 깊이)
+    in_flight: int = 0
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    wait_times: deque = field(default_factory=lambda: deque(maxlen=500))
+
+    def snapshot(self):
+        waits = sorted(self.wait_times)
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+            "wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+
+@dataclass
+class SchedulerSettings:
+    """엔드포인트별 속도 제한과 재시도 설정"""
+    rates: dict = field(default_factory=lambda: {"chat": 5.0, "document": 2.0})   # 초당 요청 수
+    bursts: dict = field(default_factory=lambda: {"chat": 10, "document": 4})     # 버킷 크기
+    max_concurrency: int = 16
+    max_retries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        mapping = dict(mapping or {})
+        known = {k: mapping[k] for k in cls.__dataclass_fields__ if k in mapping}
+        settings = cls(**known)
+        # secrets에는 일부 엔드포인트만 적어도 되도록 기본값과 합침
+        settings.rates = {**cls().rates, **dict(settings.rates)}
+        settings.bursts = {**cls().bursts, **dict(settings.bursts)}
+        return settings
+
+
+class HeldStream:
+    """스케줄러 슬롯을 잡고 있는 스트리밍 응답 (끝까지 읽거나 close() 하면 슬롯을 돌려줌)
+
+    그 밖의 속성은 감싼 스트림의 것을 그대로 보여준다.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        """감싼 스트림을 닫고 슬롯을 돌려줌 (여러 번 호출해도 한 번만)"""
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            if hasattr(self._stream, "close"):
+                self._stream.close()
+        finally:
+            release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class RequestScheduler:
+    """모든 Upstage 호출이 거쳐 가는 공용 스케줄러"""
+
+    def __init__(self, settings=None):
+        self.settings = settings or SchedulerSettings()
+        self._semaphore = threading.BoundedSemaphore(self.settings.max_concurrency)
+        self._buckets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint):
+        with self._lock:
+            if endpoint not in self._buckets:
+                rate = self.settings.rates.get(endpoint, 5.0)
+                burst = self.settings.bursts.get(endpoint, max(int(rate), 1))
+                self._buckets[endpoint] = TokenBucket(rate, burst)
+                self._stats[endpoint] = EndpointStats()
+            return self._buckets[endpoint], self._stats[endpoint]
+
+    def _update(self, stats, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(stats, name, getattr(stats, name) + delta)
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """full jitter 지수 백오프, Retry-After가 있으면 그보다 짧게 기다리지 않음"""
+        ceiling = min(self.settings.max_delay, self.settings.base_delay * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = min(retry_after, self.settings.max_delay) + random.uniform(0, self.settings.base_delay)
+        return delay
+
+    def _acquire(self, bucket, stats):
+        """버킷 토큰과 동시 실행 슬롯을 얻을 때까지 대기하고 대기 시간을 반환"""
+        enqueued = time.monotonic()
+        self._update(stats, queued=1)
+        try:
+            wait = bucket.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            self._semaphore.acquire()
+        finally:
+            self._update(stats, queued=-1)
+        waited = time.monotonic() - enqueued
+        with self._lock:
+            stats.wait_times.append(waited)
+        return waited
+
+    def _release_slot(self, stats):
+        self._update(stats, in_flight=-1)
+        self._semaphore.release()
+
+    def call(self, endpoint, fn, timings=None, hold=False):
+        """fn()을 속도 제한/동시성 제한 아래에서 실행하고 필요하면 재시도
+
+        fn이 응답 객체(status_code 속성)를 돌려주면 429/5xx일 때 재시도하고,
+        재시도를 모두 소진하면 마지막 응답을 그대로 반환한다.
+        예외는 재시도 가능한 경우에만 재시도하고, 소진하면 다시 던진다.
+        hold=True 면 fn()이 돌려준 스트림을 HeldStream 으로 감싸 반환하고,
+        동시 실행 슬롯은 스트림을 끝까지 읽거나 close() 할 때 돌려준다.
+        """
+        bucket, stats = self._endpoint(endpoint)
+        self._update(stats, requests=1)
+        for attempt in range(self.settings.max_retries + 1):
+            waited = self._acquire(bucket, stats)
+            if timings is not None:
+                timings["queue_wait"] = timings.get("queue_wait", 0.0) + waited
+            self._update(stats, in_flight=1)
+            last_attempt = attempt == self.settings.max_retries
+            release = True
+            try:
+                result = fn()
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                retryable = is_retryable_exception(e) or is_retryable_status(status)
+                if not retryable or last_attempt:
+                    self._update(stats, failures=1)
+                    raise
+                response = getattr(e, "response", None)
+                retry_after = parse_retry_after(getattr(response, "headers", None)) if status == 429 else None
+            else:
+                status = getattr(result, "status_code", None)
+                if not is_retryable_status(status) or last_attempt:
+                    if is_retryable_status(status):
+                        self._update(stats, failures=1)
+                    if hold:
+                        release = False  # 슬롯은 스트림이 끝날 때 돌려줌
+                        return HeldStream(result, lambda: self._release_slot(stats))
+                    return result
+                retry_after = parse_retry_after(result.headers) if status == 429 else None
+                # 버릴 응답의 커넥션은 바로 풀로 돌려보냄
+                if hasattr(result, "close"):
+                    result.close()
+            finally:
+                if release:
+                    self._release_slot(stats)
+
+            if retry_after is not None:
+                bucket.pause(retry_after)
+            self._update(stats, retries=1)
+            if timings is not None:
+                timings["retries"] = timings.get("retries", 0) + 1
+            time.sleep(self.backoff_delay(attempt, retry_after))
+
+    def snapshot(self):
+        """엔드포인트별 큐 깊이/대기 시간/재시도 통계"""
+        with self._lock:
+            endpoints = list(self._stats.items())
+        return {name: stats.snapshot() for name, stats in endpoints}
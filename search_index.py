@@ -0,0 +1,248 @@
+# search_index.py
+"""파싱/OCR 결과 전체에 대한 영구 전문(full-text) 검색 인덱스 (Streamlit 비의존)
+
+페이지 01/02 에서 새 결과가 나올 때마다 문서를 페이지 단위 구간(doc_retrieval.chunk_document)으로
+나눠 SQLite FTS5 역색인에 추가한다. 프로세스를 다시 띄워도 색인이 남고 세션/페이지가 공유한다.
+- 토큰화: 한글이 들어간 어절은 글자 bigram, 그 밖의 단어는 그대로 (조사/어미가 붙어도 부분 일치)
+  FTS5 는 공백으로 이어 붙인 토큰만 보고, 원문은 passages 테이블에 따로 둔다 (contentless FTS)
+- 질의: 단어마다 bigram 구(phrase)로 만들어 AND, bm25 순위 상위 limit 개
+  질의어 끝의 흔한 조사(을/를, 은/는, 에서 등)는 뗀 어간 구와 OR 로 묶어 "해지를" 로 "해지는" 도 찾음
+  (목록에 없는 어미나 활용형은 맞추지 않음)
+- 결과: 파일 이름, 페이지, 점수, 질의어를 강조한 발췌문
+같은 doc_id 를 다시 넣으면 이전 구간을 지우고 새로 색인한다.
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from doc_retrieval import chunk_document
+from telemetry import span
+
+_WORD_PATTERN = re.compile(r'\w+')
+_HANGUL_PATTERN = re.compile(r'[가-힣]')
+SNIPPET_CHARS = 160  # 발췌문 길이 (글자)
+# 질의어 끝에서 떼어 볼 조사 (긴 것부터 검사)
+PARTICLES = sorted(
+    ["은", "는", "이", "가", "을", "를", "에", "의", "도", "와", "과", "로", "으로", "에서", "에게", "께서",
+     "까지", "부터", "보다", "처럼", "만", "이나", "나", "랑", "이랑", "하고", "에는", "에서는", "으로는", "로는"],
+    key=len, reverse=True,
+)
+
+
+def index_tokens(text):
+    """색인/질의 공용 토큰: 한글 어절은 글자 bigram, 그 밖의 단어는 소문자 그대로"""
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if _HANGUL_PATTERN.search(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def strip_particle(word):
+    """한글 단어 끝의 조사를 뗀 어간 (어간이 두 글자 이상 남을 때만), 없으면 None"""
+    if not _HANGUL_PATTERN.search(word):
+        return None
+    for particle in PARTICLES:
+        if word.endswith(particle) and len(word) - len(particle) >= 2:
+            return word[:-len(particle)]
+    return None
+
+
+def build_match_query(query):
+    """질의 문자열을 FTS5 MATCH 식으로 (단어마다 토큰 구를 AND), 검색할 단어가 없으면 None
+
+    한 글자 한글 단어는 bigram 이 없으므로 그 글자로 시작하는 토큰의 접두어 검색으로 대신한다.
+    조사가 붙은 단어는 (단어 구 OR 어간 구) 로 묶어 다른 조사가 붙은 형태도 찾는다
+    (원래 단어와 그대로 일치하면 토큰이 더 많이 맞아 bm25 순위가 앞선다).
+    """
+    terms = []
+    for word in _WORD_PATTERN.findall(query.lower()):
+        if _HANGUL_PATTERN.search(word) and len(word) == 1:
+            terms.append(f'"{word}"*')
+            continue
+        phrase = '"' + " ".join(index_tokens(word)) + '"'
+        stem = strip_particle(word)
+        if stem:
+            phrase = f'({phrase} OR "{" ".join(index_tokens(stem))}")'
+        terms.append(phrase)
+    return " AND ".join(terms) or None
+
+
+def make_snippet(text, query, width=SNIPPET_CHARS):
+    """질의어가 가장 많이 모인 곳 주변 width 글자를 잘라 질의어를 **굵게** 표시한 발췌문"""
+    words = set()
+    for word in _WORD_PATTERN.findall(query.lower()):
+        words.add(word)
+        stem = strip_particle(word)
+        if stem:
+            words.add(stem)  # 다른 조사가 붙은 형태도 강조
+    words = sorted(words, key=len, reverse=True)
+    if not words:
+        return text[:width]
+    pattern = re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE)
+    # 질의어 위치를 훑으며 width * 2/3 창 안의 서로 다른 질의어 수가 가장 많은 창의 시작점을 찾음
+    matches = [(m.start(), m.group(0).lower()) for m in pattern.finditer(text)]
+    window = Counter()
+    best, best_count, left = 0, 0, 0
+    for position, word in matches:
+        window[word] += 1
+        while position - matches[left][0] >= width * 2 // 3:
+            window[matches[left][1]] -= 1
+            if not window[matches[left][1]]:
+                del window[matches[left][1]]
+            left += 1
+        if len(window) > best_count:
+            best, best_count = matches[left][0], len(window)
+    start = max(best - width // 3, 0)
+    end = min(start + width, len(text))
+    excerpt = " ".join(text[start:end].split())
+    excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", excerpt)
+    return ("…" if start else "") + excerpt + ("…" if end < len(text) else "")
+
+
+@dataclass
+class SearchHit:
+    """검색 결과 구간 하나 (score 는 bm25, 작을수록 관련도가 높음)"""
+    doc_id: str
+    file_name: str
+    source: str
+    page: int
+    score: float
+    snippet: str
+
+
+class FullTextIndex:
+    """문서 여러 개의 구간을 담는 SQLite FTS5 역색인 (문서 단위로 점진적 추가/교체/삭제)
+
+    - max_chars: 색인 구간 길이 (같은 페이지의 연속된 요소를 이 길이까지 묶음)
+    FTS 의 source 열에 "parse"/"ocr" 을 함께 색인해 종류 제한도 MATCH 안에서 처리한다.
+    """
+
+    def __init__(self, path, max_chars=2000):
+        self.path = path
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                source TEXT NOT NULL,
+                pages INTEGER NOT NULL,
+                passages INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                page INTEGER,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS passages_doc ON passages (doc_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(tokens, source, content='');
+            """
+        )
+        self._conn.commit()
+
+    def _delete(self, doc_id):
+        # contentless FTS 는 색인했던 값을 그대로 넘겨야 지워지므로 원문에서 토큰을 다시 만듦
+        rows = self._conn.execute(
+            "SELECT p.id, p.text, d.source FROM passages p JOIN documents d ON d.doc_id = p.doc_id WHERE p.doc_id = ?",
+            (doc_id,),
+        ).fetchall()
+        self._conn.executemany(
+            "INSERT INTO passages_fts (passages_fts, rowid, tokens, source) VALUES ('delete', ?, ?, ?)",
+            [(passage_id, " ".join(index_tokens(text)), source) for passage_id, text, source in rows],
+        )
+        self._conn.execute("DELETE FROM passages WHERE doc_id = ?", (doc_id,))
+        self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def add_document(self, doc_id, file_name, result, source="parse"):
+        """응답(dict)을 구간으로 나눠 색인 (같은 doc_id 는 교체), 색인한 구간 수 반환"""
+        chunks = chunk_document(doc_id, file_name, result, self.max_chars)
+        pages = (result.get("usage") or {}).get("pages") or 0
+        with span("fulltext_index"), self._lock:
+            self._delete(doc_id)
+            for chunk in chunks:
+                cursor = self._conn.execute(
+                    "INSERT INTO passages (doc_id, page, text) VALUES (?, ?, ?)",
+                    (doc_id, chunk.pages[0] if chunk.pages else None, chunk.text),
+                )
+                self._conn.execute(
+                    "INSERT INTO passages_fts (rowid, tokens, source) VALUES (?, ?, ?)",
+                    (cursor.lastrowid, " ".join(index_tokens(chunk.text)), source),
+                )
+            self._conn.execute(
+                "INSERT INTO documents (doc_id, file_name, source, pages, passages, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, file_name, source, pages, len(chunks), time.time()),
+            )
+            self._conn.commit()
+        return len(chunks)
+
+    def remove_document(self, doc_id):
+        with self._lock:
+            self._delete(doc_id)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM passages")
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("INSERT INTO passages_fts (passages_fts) VALUES ('delete-all')")
+            self._conn.commit()
+
+    def search(self, query, limit=20, source=None):
+        """관련도 순 상위 limit 개 SearchHit (source 로 "parse"/"ocr" 결과만 검색 가능)"""
+        match = build_match_query(query)
+        if match is None:
+            return []
+        match = f"tokens : ({match})"
+        if source:
+            match += f' AND source : "{source}"'
+        # 순위는 FTS 테이블만으로 매기고 (source 열 가중치 0), 상위 limit 개만 원문/문서 정보를 읽음
+        with span("fulltext_search"), self._lock:
+            ranked = self._conn.execute(
+                "SELECT rowid, bm25(passages_fts, 1.0, 0.0) AS score FROM passages_fts "
+                "WHERE passages_fts MATCH ? ORDER BY score LIMIT ?",
+                (match, limit),
+            ).fetchall()
+            rows = {
+                row[0]: row[1:] for row in self._conn.execute(
+                    "SELECT p.id, p.doc_id, d.file_name, d.source, p.page, p.text "
+                    f"FROM passages p JOIN documents d ON d.doc_id = p.doc_id WHERE p.id IN ({','.join('?' * len(ranked))})",
+                    [passage_id for passage_id, _ in ranked],
+                )
+            }
+        hits = []
+        for passage_id, score in ranked:
+            doc_id, file_name, doc_source, page, text = rows[passage_id]
+            hits.append(SearchHit(doc_id, file_name, doc_source, page, score, make_snippet(text, query)))
+        return hits
+
+    def documents(self, limit=50):
+        """최근 색인 순 문서 요약 (doc_id, 파일 이름, 종류, 페이지 수, 구간 수, 색인 시각)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, file_name, source, pages, passages, indexed_at "
+                "FROM documents ORDER BY indexed_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"doc_id": doc_id, "file_name": name, "source": source, "pages": pages,
+             "passages": passages, "indexed_at": indexed_at}
+            for doc_id, name, source, pages, passages, indexed_at in rows
+        ]
+
+    def usage(self):
+        """(문서 수, 페이지 수 합, 구간 수 합)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(passages), 0) FROM documents"
+            ).fetchone()
@@ -0,0 +1,154 @@
+# solar_chat.py
+"""Solar 채팅 호출 (Streamlit 비의존)
+
+main.py 와 부하 테스트(loadtest)가 같은 코드 경로를 쓰도록
+클라이언트와 응답 캐시를 인자로 받는다.
+"""
+import time
+
+from completion_cache import make_cache_key
+from context_window import format_for_summary
+from telemetry import TELEMETRY
+
+MODEL = "solar-pro"
+
+
+def _record_cache(timings, status):
+    TELEMETRY.inc("upstage_chat_cache_total", result=status)
+    if timings is not None:
+        timings["cache"] = status
+
+
+def _record_request(mode, start, ttft, status):
+    """채팅 API 호출 지연 시간/첫 토큰 시간을 지표로 기록"""
+    TELEMETRY.observe("upstage_request_seconds", time.perf_counter() - start, endpoint="chat", mode=mode, status=status)
+    if ttft is not None:
+        TELEMETRY.observe("upstage_chat_ttft_seconds", ttft, mode=mode)
+
+
+def _create_completion(client, scheduler, timings, **kwargs):
+    """스케줄러가 있으면 속도 제한/재시도를 거쳐 completions.create 호출
+
+    stream=True 면 스트림을 다 읽거나 닫을 때까지 스케줄러의 동시 실행 슬롯을 유지한다.
+    """
+    if scheduler is None:
+        return client.chat.completions.create(**kwargs)
+    return scheduler.call("chat", lambda: client.chat.completions.create(**kwargs), timings,
+                          hold=kwargs.get("stream", False))
+
+
+def chat_with_solar(client, messages, cache=None, timings=None, use_cache=True, model=MODEL, scheduler=None):
+    """Solar 응답을 한 번에 받아 반환 (cache가 있으면 앞단에서 조회)"""
+    start = time.perf_counter()
+    key = make_cache_key(model, messages)
+    if cache is not None and use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record_cache(timings, "hit")
+            if timings is not None:
+                timings["ttft"] = timings["total"] = time.perf_counter() - start
+            return cached
+        _record_cache(timings, "miss")
+    elif cache is not None:
+        cache.record_bypass()
+        _record_cache(timings, "bypass")
+    request_start = time.perf_counter()
+    try:
+        response = _create_completion(
+            client, scheduler, timings,
+            model=model,
+            messages=messages
+        )
+    except Exception:
+        _record_request("blocking", request_start, None, "error")
+        raise
+    # 비스트리밍 모드에서는 첫 토큰과 전체 응답이 동시에 도착
+    _record_request("blocking", request_start, time.perf_counter() - request_start, "ok")
+    if timings is not None:
+        timings["ttft"] = timings["total"] = time.perf_counter() - start
+    reply = response.choices[0].message.content
+    if cache is not None and reply:
+        cache.set(key, reply)
+    return reply
+
+
+def stream_chat_with_solar(client, messages, cache=None, timings=None, use_cache=True, model=MODEL, scheduler=None):
+    """Solar 응답을 토큰 단위로 스트리밍 (timings에 TTFT/총 지연 시간 기록)"""
+    start = time.perf_counter()
+    key = make_cache_key(model, messages)
+    if cache is not None and use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            # 캐시 적중 시 네트워크 왕복 없이 전체 응답을 한 번에 반환
+            _record_cache(timings, "hit")
+            if timings is not None:
+                timings["ttft"] = timings["total"] = time.perf_counter() - start
+            yield cached
+            return
+        _record_cache(timings, "miss")
+    elif cache is not None:
+        cache.record_bypass()
+        _record_cache(timings, "bypass")
+    request_start = time.perf_counter()
+    first_token_at = None
+    parts = []
+    stream = None
+    try:
+        # 재시도는 첫 토큰 전(스트림 연결 시점)까지만 적용
+        stream = _create_completion(
+            client, scheduler, timings,
+            model=model,
+            messages=messages,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                if timings is not None:
+                    timings["ttft"] = first_token_at - start
+            parts.append(delta)
+            yield delta
+    except Exception:
+        _record_request("stream", request_start, None, "error")
+        raise
+    finally:
+        # 중간에 읽기를 그만둬도 커넥션과 스케줄러 슬롯을 바로 돌려줌
+        if stream is not None and hasattr(stream, "close"):
+            stream.close()
+    _record_request("stream", request_start, first_token_at and first_token_at - request_start, "ok")
+    if timings is not None:
+        timings["total"] = time.perf_counter() - start
+    # 스트림을 끝까지 받은 경우에만 캐시에 저장
+    if cache is not None and parts:
+        cache.set(key, "".join(parts))
+
+
+def summarize_history(client, previous_summary, new_messages, cache=None, model=MODEL, scheduler=None):
+    """밀려난 메시지를 기존 요약에 덧붙여 누적 요약을 갱신"""
+    prompt = (
+        "다음은 지금까지의 대화 요약과 그 이후에 이어진 대화입니다. "
+        "중요한 사실, 사용자의 요청과 결정 사항을 빠짐없이 담아 "
+        "하나의 간결한 요약(200단어 이내)으로 갱신하세요.\n\n"
+        f"[기존 요약]\n{previous_summary or '(없음)'}\n\n"
+        f"[이어진 대화]\n{format_for_summary(new_messages)}"
+    )
+    return chat_with_solar(client, [{"role": "user", "content": prompt}], cache, model=model, scheduler=scheduler)
+
+
+def embed_texts(client, texts, kind, scheduler=None, batch_size=100):
+    """Upstage 임베딩 (kind: "query" 또는 "passage")"""
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+
+        def create():
+            return client.embeddings.create(model=f"embedding-{kind}", input=batch)
+
+        response = create() if scheduler is None else scheduler.call("embedding", create)
+        vectors.extend(item.embedding for item in response.data)
+    return vectors
@@ -0,0 +1,278 @@
+# telemetry.py
+"""요청 단위 계측 (Streamlit 비의존)
+
+프로세스 전역 레지스트리 TELEMETRY 에 히스토그램/카운터를 모으고
+Prometheus 텍스트 형식으로 내보낸다.
+- span(): 구간 실행 시간을 히스토그램에 기록하는 컨텍스트 매니저
+- timed(): 함수 전체를 span으로 감싸는 데코레이터
+- RerunProfiler: 페이지 스크립트 실행 한 번을 구간(import, 위젯 구성, API 호출, 결과 뷰)별로 나눠 기록
+- start_metrics_server(): /metrics 를 제공하는 HTTP 서버를 백그라운드로 실행
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 지연 시간(초) 버킷: 수 ms ~ 대용량 문서 파싱 수 분
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# 바이트 버킷: 1KB ~ 256MB (4배 간격)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+
+class Histogram:
+    """라벨 조합별 누적 버킷 히스토그램"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.series = {}  # 라벨 튜플 -> [버킷별 개수..., 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        """라벨별 {"buckets": [(상한, 누적 개수)], "sum", "count"}"""
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self.series.items()]
+        result = {}
+        for labels, series in items:
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-2]):
+                running += count
+                cumulative.append((bound, running))
+            result[labels] = {"buckets": cumulative, "sum": series[-2], "count": series[-1]}
+        return result
+
+
+class Counter:
+    """라벨 조합별 단조 증가 카운터"""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, labels=()):
+        with self._lock:
+            self.series[labels] = self.series.get(labels, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.series)
+
+
+def histogram_quantile(buckets, q):
+    """누적 버킷 [(상한, 누적 개수)] 에서 q 분위수를 버킷 내 선형 보간으로 근사"""
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return 0.0
+    rank = q * total
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return lower_bound  # 마지막 유한 상한을 넘는 값은 상한으로 표시
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label_value(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in pairs) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Telemetry:
+    """히스토그램/카운터 레지스트리"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def histogram(self, name, help_text="", buckets=LATENCY_BUCKETS):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(name, help_text, buckets)
+            return self.histograms[name]
+
+    def counter(self, name, help_text=""):
+        with self._lock:
+            if name not in self.counters:
+                self.counters[name] = Counter(name, help_text)
+            return self.counters[name]
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        self.histogram(name, buckets=buckets).observe(value, _labels_key(labels))
+
+    def inc(self, name, value=1, **labels):
+        self.counter(name).inc(value, _labels_key(labels))
+
+    @contextmanager
+    def span(self, name, **labels):
+        """구간 실행 시간을 upstage_span_seconds{span=name} 에 기록 (예외 시 status=error)"""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe("upstage_span_seconds", time.perf_counter() - start, span=name, status=status, **labels)
+
+    def prometheus_text(self):
+        """Prometheus text exposition 형식으로 모든 지표를 직렬화"""
+        with self._lock:
+            histograms = list(self.histograms.values())
+            counters = list(self.counters.values())
+        lines = []
+        for counter in counters:
+            lines.append(f"# HELP {counter.name} {counter.help or counter.name}")
+            lines.append(f"# TYPE {counter.name} counter")
+            for labels, value in counter.snapshot().items():
+                lines.append(f"{counter.name}{_format_labels(labels)} {value}")
+        for histogram in histograms:
+            lines.append(f"# HELP {histogram.name} {histogram.help or histogram.name}")
+            lines.append(f"# TYPE {histogram.name} histogram")
+            for labels, data in histogram.snapshot().items():
+                for bound, count in data["buckets"]:
+                    lines.append(f"{histogram.name}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {count}")
+                lines.append(f"{histogram.name}_sum{_format_labels(labels)} {data['sum']}")
+                lines.append(f"{histogram.name}_count{_format_labels(labels)} {data['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """수집한 값만 비움 (지표 정의와 설명은 유지)"""
+        with self._lock:
+            metrics = list(self.histograms.values()) + list(self.counters.values())
+        for metric in metrics:
+            with metric._lock:
+                metric.series.clear()
+
+
+TELEMETRY = Telemetry()
+
+# 자주 쓰는 지표의 설명
+TELEMETRY.histogram("upstage_request_seconds", "Upstage API 요청 지연 시간 (초)")
+TELEMETRY.histogram("upstage_chat_ttft_seconds", "채팅 첫 토큰까지의 시간 (초)")
+TELEMETRY.histogram("upstage_request_upload_bytes", "document-digitization 업로드 크기", BYTES_BUCKETS)
+TELEMETRY.histogram("upstage_request_response_bytes", "Upstage API 응답 크기", BYTES_BUCKETS)
+TELEMETRY.histogram("upstage_span_seconds", "로컬 후처리 구간 실행 시간 (초)")
+TELEMETRY.counter("upstage_pages_processed_total", "document-digitization 처리 페이지 수 (usage.pages)")
+TELEMETRY.counter("upstage_document_cache_total", "document-digitization 결과 캐시 조회 (hit/miss/refresh)")
+TELEMETRY.histogram("streamlit_rerun_seconds", "페이지 스크립트 실행 한 번의 구간별 시간 (초, section=total 은 전체)")
+
+
+def span(name, **labels):
+    return TELEMETRY.span(name, **labels)
+
+
+def timed(name):
+    """함수 호출 전체를 span(name)으로 계측하는 데코레이터"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TELEMETRY.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RerunProfiler:
+    """페이지 스크립트 실행(rerun) 한 번의 구간별 벽시계 시간
+
+    mark(name) 는 직전 체크포인트부터 지금까지를 name 구간에 더하고,
+    section(name) 은 with 블록 안의 시간만 name 구간에 더한다 (그 사이 시간은 "기타").
+    finish() 는 streamlit_rerun_seconds{page, section} 에 기록하고 (구간 목록, 전체 시간) 을 돌려준다.
+    모듈 import 는 첫 실행 뒤 캐시되므로 "imports" 구간은 주로 콜드 스타트에서 크다.
+    """
+
+    def __init__(self, page, telemetry=TELEMETRY):
+        self.page = page
+        self.telemetry = telemetry
+        self.sections = {}  # 구간 이름 -> 누적 초 (처음 기록된 순서)
+        self._start = self._last = time.perf_counter()
+        self._finished = None
+
+    def _add(self, name, seconds):
+        self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self._add(name, now - self._last)
+        self._last = now
+
+    @contextmanager
+    def section(self, name):
+        self.mark("기타")
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    def finish(self):
+        """구간 기록을 마치고 지표에 반영 ([(구간, 초), ...], 전체 초), 두 번째 호출부터는 같은 값"""
+        if self._finished is None:
+            self.mark("기타")
+            total = self._last - self._start
+            sections = [(name, seconds) for name, seconds in self.sections.items()
+                        if name != "기타" or seconds >= 0.0005]
+            for name, seconds in sections:
+                self.telemetry.observe("streamlit_rerun_seconds", seconds, page=self.page, section=name)
+            self.telemetry.observe("streamlit_rerun_seconds", total, page=self.page, section="total")
+            self._finished = (sections, total)
+        return self._finished
+
+
+def start_metrics_server(port, host="0.0.0.0", telemetry=TELEMETRY):
+    """GET /metrics 로 Prometheus 텍스트를 제공하는 HTTP 서버를 데몬 스레드로 시작"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
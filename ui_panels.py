@@ -0,0 +1,615 @@
+# ui_panels.py
+"""여러 페이지가 공통으로 쓰는 사이드바 패널과 진행 상황 표시"""
+import base64
+import dataclasses
+import math
+import mimetypes
+import time
+
+import streamlit as st
+
+from element_index import IMAGE_EXTENSIONS, crop_region, element_text, page_size
+from image_prep import describe, prepare_image
+from parse_results import ParsedDocument, combined_text, make_thumbnail, texts_zip_bytes
+
+# 레이아웃 보기
+LAYOUT_COLORS = ["#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2", "#17becf"]
+LAYOUT_IMAGE_SIZE = 1600         # 배경 이미지 긴 변(px)
+DEFAULT_PAGE_SIZE = (595, 842)   # 크기를 알 수 없는 형식은 A4 비율
+CROP_CATEGORIES = ("table", "figure", "chart")
+MAX_CROPS = 12                   # 영역 선택 시 미리 보여줄 잘라내기 수
+
+
+def render_scheduler_panel(scheduler):
+    """요청 스케줄러의 엔드포인트별 큐 깊이/대기 시간/재시도 현황"""
+    with st.sidebar.expander("🚦 요청 스케줄러"):
+        snapshot = scheduler.snapshot()
+        if not snapshot:
+            st.caption("아직 호출 기록이 없습니다.")
+            return
+        st.dataframe(
+            [
+                {
+                    "엔드포인트": name,
+                    "대기": stats["queued"],
+                    "진행 중": stats["in_flight"],
+                    "요청": stats["requests"],
+                    "재시도": stats["retries"],
+                    "실패": stats["failures"],
+                    "대기 p50(s)": round(stats["wait_p50"], 3),
+                    "대기 p95(s)": round(stats["wait_p95"], 3),
+                }
+                for name, stats in snapshot.items()
+            ],
+            use_container_width=True
+        )
+
+
+def render_document_cache_panel(cache):
+    """문서 파싱 결과 캐시의 적중/용량 현황과 비우기 버튼"""
+    with st.sidebar.expander("🗂️ 파싱 결과 캐시"):
+        count, raw_bytes, stored_bytes = cache.usage()
+        stats = cache.stats
+        lookups = stats["hits"] + stats["misses"]
+        st.metric("적중률", f"{stats['hits'] / lookups:.0%}" if lookups else "-")
+        st.caption(
+            f"항목 {count}개 · 원본 {raw_bytes / 1024 / 1024:.1f}MB → 저장 {stored_bytes / 1024 / 1024:.1f}MB "
+            f"(상한 {cache.max_bytes / 1024 / 1024:.0f}MB) · 적중 {stats['hits']} · 미스 {stats['misses']} · "
+            f"LRU 삭제 {stats['evictions']}"
+        )
+        entries = cache.entries(limit=10)
+        if entries:
+            st.dataframe(
+                [
+                    {"파일": e["file_name"], "옵션": e["params"], "저장(KB)": round(e["stored_bytes"] / 1024, 1)}
+                    for e in entries
+                ],
+                use_container_width=True
+            )
+            labels = {e["key"]: f"{e['file_name']} ({e['key'][:8]})" for e in entries}
+            selected = st.selectbox("항목 선택", list(labels), format_func=labels.get, key="document_cache_entry")
+            if st.button("선택 항목 삭제", key="document_cache_delete"):
+                cache.delete(selected)
+                st.success("선택한 캐시 항목을 삭제했습니다.")
+        if st.button("캐시 비우기", key="document_cache_clear"):
+            cache.clear()
+            st.success("파싱 결과 캐시를 비웠습니다.")
+
+
+def render_profiler_panel(profiler, enabled, history_size=20):
+    """이번 실행의 구간별 시간을 지표에 기록하고, enabled 면 사이드바에 최근 실행과 함께 표시
+
+    페이지 맨 끝에서 호출한다 (이 패널을 그리는 시간은 다음 실행의 "기타"에 들어가지 않고 빠짐).
+    """
+    sections, total = profiler.finish()
+    history = st.session_state.setdefault(f"profiler_history_{profiler.page}", [])
+    history.append({"시각": time.strftime("%H:%M:%S"), "전체(ms)": round(total * 1000, 1),
+                    **{name: round(seconds * 1000, 1) for name, seconds in sections}})
+    del history[:-history_size]
+    if not enabled:
+        return
+    with st.sidebar.expander("⏱️ 실행 구간별 시간", expanded=True):
+        st.caption(f"이번 실행 {total * 1000:.0f}ms · import 는 첫 실행 뒤 캐시되어 콜드 스타트에서만 큼")
+        st.dataframe(
+            [
+                {"구간": name, "시간(ms)": round(seconds * 1000, 1), "비율": f"{seconds / total:.0%}" if total else "-"}
+                for name, seconds in sorted(sections, key=lambda item: item[1], reverse=True)
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+        if len(history) > 1:
+            st.caption(f"최근 {len(history)}회 실행 (ms)")
+            st.dataframe(history[::-1], use_container_width=True, hide_index=True)
+
+
+def render_chunk_progress(chunk_results, total):
+    """대용량 모드의 청크 결과를 끝나는 대로 보여주고 모두 모아 반환
+
+    chunk_results 는 document_api.iter_chunk_results 가 돌려주는 ChunkResult 이터레이터.
+    """
+    progress = st.progress(0.0, text=f"0/{total} 청크 완료")
+    done = []
+    for chunk in chunk_results:
+        done.append(chunk)
+        label = f"{chunk.start_page}~{chunk.end_page}쪽"
+        progress.progress(len(done) / total, text=f"{len(done)}/{total} 청크 완료 (방금: {label})")
+        if chunk.ok:
+            partial = ParsedDocument(chunk.result, label)
+            source = " · 캐시" if chunk.from_cache else ""
+            with st.expander(f"✅ {label} · 요소 {len(partial.elements)}개{source}"):
+                st.text(partial.plain_text()[:2000] or "(텍스트 없음)")
+        else:
+            st.error(f"❌ {label} 파싱 실패: {chunk.error}")
+    return done
+
+
+def render_batch_progress(file_results, total, on_result=None):
+    """일괄 OCR 결과를 끝나는 대로 파일별 상태표/처리량/실패와 함께 보여주고 모두 모아 반환
+
+    file_results 는 document_api.iter_file_results 가 돌려주는 FileResult 이터레이터,
+    on_result(file_result) 는 결과마다 호출되어 텍스트를 돌려준다 (세션 저장 등).
+    """
+    progress = st.progress(0.0, text=f"0/{total} 파일 완료")
+    summary = st.empty()
+    table = st.empty()
+    rows = []
+    done = []
+    failures = 0
+    saved_bytes, saved_seconds = 0, 0.0
+    start = time.perf_counter()
+    for item in file_results:
+        done.append(item)
+        text = on_result(item) if on_result else ""
+        if not item.ok:
+            failures += 1
+        prepared = item.prepared if item.prepared is not None and item.prepared.applied else None
+        if prepared is not None:
+            saved_bytes += prepared.saved_bytes
+            saved_seconds += prepared.seconds_saved
+        elapsed = time.perf_counter() - start
+        rows.append({
+            "파일": item.name,
+            "상태": "❌ 실패" if not item.ok else "⚡ 캐시" if item.from_cache else "✅ 완료",
+            "글자 수": len(text or ""),
+            "소요(s)": round(item.seconds, 2),
+            "축소": f"-{prepared.saved_ratio:.0%}" if prepared else "",
+            "오류": item.error or "",
+        })
+        progress.progress(len(done) / total, text=f"{len(done)}/{total} 파일 완료 (방금: {item.name})")
+        summary.caption(
+            f"경과 {elapsed:.1f}s · 처리량 {len(done) / elapsed if elapsed else 0:.2f} 파일/s · "
+            f"성공 {len(done) - failures} · 실패 {failures}"
+            + (f" · 이미지 축소로 {saved_bytes / 1024 / 1024:.1f}MB, 업로드 약 {saved_seconds:.1f}초 절약" if saved_bytes else "")
+        )
+        table.dataframe(rows, use_container_width=True)
+    return done
+
+
+def render_image_prep_options(defaults, key_prefix):
+    """업로드 전 이미지 축소 옵션 (기본값은 secrets [image_prep]), 끄면 None"""
+    enabled = st.checkbox(
+        "🖼️ 업로드 전 이미지 축소", key=f"{key_prefix}_enabled",
+        help="사진/고해상도 스캔을 목표 해상도로 줄이고 방향 보정/메타데이터 제거 후 JPEG 로 다시 압축해 보냅니다"
+    )
+    if not enabled:
+        return None
+    col1, col2 = st.columns(2)
+    with col1:
+        target_dpi = st.slider("목표 해상도 (DPI, A4 기준)", 100, 400, int(defaults.target_dpi), 50, key=f"{key_prefix}_dpi")
+    with col2:
+        jpeg_quality = st.slider("JPEG 품질", 50, 95, int(defaults.jpeg_quality), 5, key=f"{key_prefix}_quality")
+    return dataclasses.replace(defaults, target_dpi=target_dpi, jpeg_quality=jpeg_quality)
+
+
+def prepare_upload(upload, settings):
+    """settings 가 있으면 이미지 업로드를 축소한 UploadSource 를 돌려주고 결과를 한 줄로 표시"""
+    prepared = prepare_image(upload, settings) if settings is not None else None
+    if prepared is None:
+        return upload
+    st.caption(describe(prepared))
+    return prepared.upload
+
+
+def _paginate(count, key_prefix, page_sizes, unit):
+    """페이지당 개수/페이지 번호 위젯을 그리고 현재 페이지에 해당하는 인덱스 range 반환"""
+    nav_col1, nav_col2 = st.columns(2)
+    with nav_col1:
+        page_size = st.selectbox(f"페이지당 {unit} 수", page_sizes, key=f"{key_prefix}_page_size")
+    total_pages = math.ceil(count / page_size)
+    page_key = f"{key_prefix}_page"
+    if st.session_state.get(page_key, 1) > total_pages:  # 페이지당 수를 늘려 전체 페이지가 줄어든 경우
+        st.session_state[page_key] = total_pages
+    with nav_col2:
+        page = st.number_input(f"페이지 (전체 {total_pages})", min_value=1, max_value=total_pages, key=page_key)
+    start = (page - 1) * page_size
+    return range(start, min(start + page_size, count))
+
+
+def render_image_gallery(parsed, key_prefix, columns=4):
+    """base64 이미지 요소를 페이지 단위 썸네일로 보여주고, 고른 이미지만 원본으로 표시 + 종류별 ZIP
+
+    한 번에 브라우저로 보내는 것은 현재 페이지의 썸네일과 선택한 원본 하나뿐이다.
+    """
+    image_elements = parsed.image_elements()
+    if not image_elements:
+        st.info("Base64 인코딩된 이미지가 없습니다. Base64 인코딩 옵션을 설정해주세요.")
+        return
+
+    counts = {}
+    for elem in image_elements:
+        cat = elem.get("category", "unknown")
+        counts[cat] = counts.get(cat, 0) + 1
+
+    def label(index):
+        elem = image_elements[index]
+        return f"{elem.get('category', 'unknown')} {index + 1} (p{elem.get('page', '-')})"
+
+    st.caption(f"이미지 {len(image_elements)}개 · " + " · ".join(f"{cat} {n}" for cat, n in counts.items()))
+
+    # 종류별 ZIP: 버튼을 누른 뒤에만 만들고, 만든 ZIP 은 결과에 보관
+    categories = sorted(counts)
+    default = [cat for cat in categories if cat in ("figure", "chart", "table")] or categories
+    zip_col1, zip_col2 = st.columns([3, 1])
+    with zip_col1:
+        selected = st.multiselect("ZIP에 담을 종류", categories, default=default, key=f"{key_prefix}_zip_categories")
+    with zip_col2:
+        st.write("")
+        prepare = st.button("📦 ZIP 만들기", key=f"{key_prefix}_zip_prepare", disabled=not selected)
+    ready_key = f"{key_prefix}_zip_ready"
+    zip_id = (parsed.result_key, tuple(sorted(selected)))
+    if prepare:
+        st.session_state[ready_key] = zip_id
+    if selected and st.session_state.get(ready_key) == zip_id:
+        with st.spinner("ZIP 만드는 중..."):
+            zip_bytes = parsed.images_zip_bytes(selected)
+        st.download_button(
+            f"💾 이미지 ZIP 다운로드 ({len(zip_bytes) / 1024 / 1024:.1f}MB)",
+            zip_bytes,
+            f"{parsed.stem}_images.zip",
+            "application/zip",
+            key=f"{key_prefix}_zip_download"
+        )
+
+    # 썸네일 (페이지 단위)
+    grid = st.columns(columns)
+    for offset, index in enumerate(_paginate(len(image_elements), key_prefix, [12, 24, 48], "이미지")):
+        with grid[offset % columns]:
+            try:
+                st.image(parsed.thumbnail_bytes(index), caption=label(index))
+            except Exception as e:
+                st.error(f"{label(index)} 이미지 디코딩 오류: {str(e)}")
+
+    # 원본 (선택한 것만 디코딩)
+    st.divider()
+    chosen = st.selectbox("원본 크기로 보기", range(len(image_elements)), index=None, format_func=label,
+                          placeholder="이미지를 선택하세요", key=f"{key_prefix}_full")
+    if chosen is not None:
+        try:
+            img_data = parsed.image_bytes(chosen)
+            st.image(img_data)
+            file_name = parsed.image_file_name(chosen)
+            st.download_button(
+                f"💾 {label(chosen)} 다운로드",
+                img_data,
+                file_name,
+                mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+                key=f"{key_prefix}_full_download"
+            )
+        except Exception as e:
+            st.error(f"이미지 디코딩 오류: {str(e)}")
+
+
+def render_table_list(parsed, key_prefix):
+    """추출된 표를 페이지 단위로 보여주고, 전체 표 Excel 은 요청할 때 한 번만 만듦
+
+    화면에 보이는 표만 DataFrame/CSV 로 변환하고, Excel 은 표마다 만들지 않고
+    모든 표를 시트로 담은 통합 문서 하나를 버튼을 누른 뒤에 스트리밍으로 기록한다.
+    """
+    tables = parsed.tables()
+    if not tables:
+        st.info("추출된 표가 없습니다.")
+        return
+
+    cells = sum(table.n_rows * len(table.data) for table in tables)
+    st.caption(f"표 {len(tables)}개 · 셀 {cells:,}개")
+
+    # 전체 표 Excel: 버튼을 누른 뒤에만 만들고, 만든 파일은 결과에 보관
+    ready_key = f"{key_prefix}_excel_ready"
+    if st.button("📦 전체 표 Excel 만들기", key=f"{key_prefix}_excel_prepare"):
+        st.session_state[ready_key] = parsed.result_key
+    if st.session_state.get(ready_key) == parsed.result_key:
+        try:
+            with st.spinner("Excel 만드는 중..."):
+                workbook = parsed.tables_workbook_bytes()
+            st.download_button(
+                f"💾 전체 표 Excel 다운로드 (시트 {len(tables)}개, {len(workbook) / 1024 / 1024:.1f}MB)",
+                workbook,
+                f"{parsed.stem}_tables.xlsx",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                key=f"{key_prefix}_excel_download"
+            )
+        except Exception as e:
+            st.error(f"Excel 변환 오류: {str(e)}")
+
+    for i in _paginate(len(tables), key_prefix, [5, 10, 20], "표"):
+        st.write(f"### 표 {i+1}")
+
+        # 안전하게 DataFrame 생성
+        df = parsed.dataframe(i)
+
+        if not df.empty:
+            st.dataframe(df, use_container_width=True)
+            st.download_button(
+                f"💾 CSV 다운로드",
+                parsed.csv_bytes(i),
+                f"table_{i+1}.csv",
+                "text/csv",
+                key=f"{key_prefix}_csv_{i}"
+            )
+        else:
+            st.warning(f"표 {i+1}을 DataFrame으로 변환할 수 없습니다.")
+            # 원본 데이터 표시
+            st.text("원본 데이터:")
+            for row in tables[i].rows():
+                st.text(" | ".join(row))
+
+
+def _layout_background(parsed, source, page):
+    """이미지 업로드의 페이지 배경 (표시용으로 축소한 data URI), 그 밖의 형식은 None"""
+    def build():
+        if parsed.file_name.rsplit(".", 1)[-1].lower() not in IMAGE_EXTENSIONS:
+            return None
+        source.seek(0)
+        thumbnail = make_thumbnail(source.read(), LAYOUT_IMAGE_SIZE)
+        return "data:image/jpeg;base64," + base64.b64encode(thumbnail).decode("ascii")
+    return parsed.derived(("layout_background", page), build)
+
+
+def _layout_figure(boxes, width, height, background):
+    """종류별 상자 외곽선(선 트레이스 하나) + 클릭용 중심점(점 트레이스 하나)"""
+    import plotly.graph_objects as go  # 레이아웃 보기를 열 때만 로드
+
+    fig = go.Figure()
+    by_category = {}
+    for box in boxes:
+        by_category.setdefault(box.category, []).append(box)
+    for number, (category, cat_boxes) in enumerate(sorted(by_category.items())):
+        color = LAYOUT_COLORS[number % len(LAYOUT_COLORS)]
+        xs, ys = [], []
+        for box in cat_boxes:
+            x0, y0, x1, y1 = box.x0 * width, box.y0 * height, box.x1 * width, box.y1 * height
+            xs += [x0, x1, x1, x0, x0, None]
+            ys += [y0, y0, y1, y1, y0, None]
+        fig.add_trace(go.Scattergl(
+            x=xs, y=ys, mode="lines", line={"color": color, "width": 1},
+            name=f"{category} ({len(cat_boxes)})", legendgroup=category, hoverinfo="skip"
+        ))
+        fig.add_trace(go.Scattergl(
+            x=[(box.x0 + box.x1) / 2 * width for box in cat_boxes],
+            y=[(box.y0 + box.y1) / 2 * height for box in cat_boxes],
+            mode="markers", marker={"color": color, "size": 7, "opacity": 0.6},
+            customdata=[box.index for box in cat_boxes],
+            hovertext=[f"{category} #{box.id}" for box in cat_boxes], hoverinfo="text",
+            legendgroup=category, showlegend=False
+        ))
+    if background:
+        fig.add_layout_image(source=background, xref="x", yref="y", x=0, y=0, sizex=width, sizey=height,
+                             sizing="stretch", layer="below")
+    fig.update_xaxes(range=[0, width], visible=False, constrain="domain")
+    fig.update_yaxes(range=[height, 0], visible=False, scaleanchor="x")
+    fig.update_layout(height=800, margin={"l": 0, "r": 0, "t": 0, "b": 0}, plot_bgcolor="white",
+                      dragmode="select", legend={"orientation": "h"})
+    return fig
+
+
+def _render_crop(parsed, source, box, key):
+    """요소/영역 잘라내기 미리보기와 다운로드 (원본 파일에서 만들고 결과에 보관)"""
+    try:
+        crop = parsed.derived(("crop", box.page, box.bbox),
+                              lambda: crop_region(source, parsed.file_name, box.page, box.bbox))
+    except Exception as e:
+        st.error(f"영역 잘라내기 오류: {str(e)}")
+        return
+    if crop is None:
+        return
+    data, extension = crop
+    if extension != "pdf":
+        st.image(data)
+    st.download_button(
+        f"💾 잘라낸 영역 ({extension.upper()})",
+        data,
+        f"{parsed.stem}_p{box.page}_{box.category}_{box.id}.{extension}",
+        mimetypes.guess_type(f"crop.{extension}")[0],
+        key=key
+    )
+
+
+def render_layout_viewer(parsed, source, key_prefix):
+    """요소 좌표를 페이지 위에 종류별 상자로 겹쳐 보여주고, 클릭한 요소와 상자로 고른 영역을 조회
+
+    source 는 파싱한 원본 파일(업로드 파일 등 되감을 수 있는 스트림). 한 번에 그리는 것은
+    선택한 페이지의 상자뿐이고, 질의는 parsed.spatial_index() 의 격자 인덱스로 처리한다.
+    """
+    index = parsed.spatial_index()
+    if not len(index):
+        st.info("요소 좌표가 없습니다. 고급 옵션에서 '좌표 정보 포함'을 켜고 다시 파싱해주세요.")
+        return
+
+    categories = sorted({box.category for page in index.pages for box in index.boxes(page)})
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page = st.selectbox("페이지", index.pages, key=f"{key_prefix}_page")
+    with col2:
+        shown = st.multiselect("표시할 종류", categories, default=categories, key=f"{key_prefix}_categories")
+    boxes = [box for box in index.boxes(page) if box.category in shown]
+
+    try:
+        size = parsed.derived(("page_size", page), lambda: page_size(source, parsed.file_name, page))
+    except Exception:
+        size = None
+    width, height = size or DEFAULT_PAGE_SIZE
+    background = _layout_background(parsed, source, page)
+    if not background:
+        st.caption("페이지 이미지 없이 요소 상자만 표시합니다 (PDF 영역은 PDF 로 잘라냅니다).")
+    st.caption(f"{page}쪽 요소 {len(boxes)}개 · 점을 클릭하면 요소 정보, 상자로 드래그하면 영역 안의 요소를 보여줍니다.")
+
+    # 남은 선택을 비울 때 올리는 위젯 키 세대 (그림 선택은 코드에서 값을 바꿀 수 없음)
+    generation_key = f"{key_prefix}_selection_generation"
+    selection_generation = st.session_state.get(generation_key, 0)
+    event = st.plotly_chart(
+        _layout_figure(boxes, width, height, background),
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode=("points", "box"),
+        key=f"{key_prefix}_chart_{selection_generation}"
+    )
+    selection = (event or {}).get("selection") or {}
+
+    # 상자 선택: 영역 질의 -> 요소 목록 + 표/그림 잘라내기
+    regions = selection.get("box") or []
+    if regions:
+        region = regions[-1]
+        x0, x1 = sorted(region["x"])[0] / width, sorted(region["x"])[-1] / width
+        y0, y1 = sorted(region["y"])[0] / height, sorted(region["y"])[-1] / height
+        found = index.query_region(page, x0, y0, x1, y1, shown)
+        st.markdown(f"#### 선택 영역의 요소 {len(found)}개")
+        if found:
+            st.dataframe(
+                [
+                    {"종류": box.category, "id": box.id, "내용": element_text(parsed.elements[box.index])[:80]}
+                    for box in found
+                ],
+                use_container_width=True
+            )
+        crops = [box for box in found if box.category in CROP_CATEGORIES][:MAX_CROPS]
+        for box in crops:
+            with st.expander(f"✂️ {box.category} #{box.id}"):
+                _render_crop(parsed, source, box, key=f"{key_prefix}_crop_{box.index}")
+
+    # 요소 클릭 (또는 목록에서 선택): 상세 정보
+    clicked = [point.get("customdata") for point in selection.get("points") or [] if point.get("customdata") is not None]
+    labels = {box.index: f"{box.category} #{box.id}" for box in boxes}
+    chosen = st.selectbox("요소 선택", list(labels), index=None, format_func=labels.get,
+                          placeholder="그림에서 점을 클릭하거나 목록에서 고르세요",
+                          key=f"{key_prefix}_element_{selection_generation}")
+    if not regions and len(clicked) == 1:
+        chosen = clicked[0][0] if isinstance(clicked[0], list) else clicked[0]
+    box = None if chosen is None else next((box for box in index.boxes(page) if box.index == chosen), None)
+    if chosen is not None and box is None:
+        # 쪽/문서를 바꾼 뒤 남은 선택(목록 또는 그림 클릭)은 지금 쪽에 없으므로 상세는 건너뛰고,
+        # 위젯 키 세대를 바꿔 다음 실행부터 선택이 빈 위젯으로 다시 그림
+        st.session_state[generation_key] = selection_generation + 1
+    if box is not None:
+        elem = parsed.elements[chosen]
+        st.markdown(
+            f"**{box.category}** · id {box.id} · {box.page}쪽 · "
+            f"({box.x0:.3f}, {box.y0:.3f}) – ({box.x1:.3f}, {box.y1:.3f})"
+        )
+        st.text(element_text(elem)[:2000] or "(텍스트 없음)")
+        _render_crop(parsed, source, box, key=f"{key_prefix}_element_crop")
+
+
+def _shorten(value, limit=200):
+    """긴 문자열을 앞부분과 길이만 남김 (메타데이터 미리보기용)"""
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}… ({len(value):,}자)"
+    if isinstance(value, dict):
+        return {key: _shorten(item, limit) for key, item in value.items()}
+    return value
+
+
+def render_element_browser(parsed, key_prefix):
+    """요소를 종류/쪽/텍스트로 걸러 페이지 단위 표로 보여주고, 고른 요소 하나만 JSON 으로 표시
+
+    응답 전체를 st.json 으로 보내지 않고, base64 이미지는 길이만 보여준다.
+    """
+    store = parsed.elements
+    st.caption(f"요소 {len(store):,}개 · 보관 메모리 약 {store.memory_bytes() / 1024 / 1024:.1f}MB")
+    with st.expander("응답 메타데이터"):
+        st.json(_shorten(parsed.meta))
+    if not len(store):
+        st.info("요소가 없습니다.")
+        return
+
+    categories = sorted(parsed.categories())
+    pages = parsed.derived("element_pages", lambda: sorted({store.page(i) or 0 for i in range(len(store))}))
+    col1, col2, col3 = st.columns([2, 1, 2])
+    with col1:
+        selected = st.multiselect("종류", categories, default=categories, key=f"{key_prefix}_categories")
+    with col2:
+        page = st.selectbox("쪽", ["전체"] + pages, key=f"{key_prefix}_page_filter")
+    with col3:
+        query = st.text_input("텍스트 검색", key=f"{key_prefix}_query").strip().lower()
+
+    # 숫자/코드 열로 먼저 거르고, 텍스트 검색은 남은 요소만
+    selected = set(selected)
+    matches = [
+        i for i in range(len(store))
+        if store.category(i) in selected and (page == "전체" or (store.page(i) or 0) == page)
+    ]
+    if query:
+        matches = [i for i in matches if query in store.text(i).lower()]
+    if not matches:
+        st.info("조건에 맞는 요소가 없습니다.")
+        return
+
+    shown = [matches[i] for i in _paginate(len(matches), key_prefix, [20, 50, 100], "요소")]
+    rows = []
+    for i in shown:
+        bbox = store.bbox(i)
+        rows.append({
+            "id": store.element_id(i),
+            "종류": store.category(i),
+            "쪽": store.page(i),
+            "좌표": "({:.3f}, {:.3f}) – ({:.3f}, {:.3f})".format(*bbox) if bbox else "",
+            "base64": f"{store.base64_size(i):,}자" if store.has_base64(i) else "",
+            "내용": store.text(i)[:100],
+        })
+    st.caption(f"조건에 맞는 요소 {len(matches):,}개")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    labels = {i: f"{store.category(i)} #{store.element_id(i)} (p{store.page(i)})" for i in shown}
+    chosen = st.selectbox("요소 자세히 보기", list(labels), index=None, format_func=labels.get,
+                          placeholder="요소를 선택하세요", key=f"{key_prefix}_element")
+    if chosen is not None:
+        elem = store.element(chosen, include_base64=False)
+        if store.has_base64(chosen):
+            elem["base64_encoding"] = f"<base64 {store.base64_size(chosen):,}자 · 이미지 보기에서 확인>"
+        st.json(elem)
+
+
+def render_json_download(parsed, key_prefix, label="🔍 JSON 다운로드"):
+    """전체 응답 JSON 을 버튼을 누른 뒤에만 요소 단위로 기록해 내려받게 함
+
+    파일 내용은 버튼을 누른 직후의 실행에서만 읽어 다운로드 버튼에 넘기고 바로 준비 상태를 지운다
+    (이후 다른 위젯으로 다시 실행될 때마다 JSON 전체를 메모리로 읽지 않도록, 다시 받으려면 다시 만들기).
+    """
+    ready_key = f"{key_prefix}_ready"
+    if st.session_state.get(ready_key) != parsed.result_key:
+        if st.button("🔍 JSON 만들기", key=f"{key_prefix}_prepare"):
+            st.session_state[ready_key] = parsed.result_key
+            st.rerun()
+        return
+    del st.session_state[ready_key]
+    with st.spinner("JSON 만드는 중..."):
+        data = parsed.json_file().read()
+    st.download_button(label, data, f"{parsed.stem}_parsed.json", "application/json", key=f"{key_prefix}_download")
+
+
+def render_texts_bundle_download(named_results, key_prefix):
+    """여러 OCR 결과 [(파일 이름, 결과 키, ParsedDocument), ...] 의 ZIP/TXT 합본을 버튼을 누른 뒤에만 만들어 내려받게 함
+
+    합본은 결과 키 조합에 대해 한 번만 만들어 세션에 보관한다 (같은 키를 다시 실행해 결과가 바뀌면 새로 만듦).
+    """
+    bundle_id = tuple(result_key for _, result_key, _ in named_results)
+    ready_key = f"{key_prefix}_ready"
+    if st.session_state.get(ready_key) != bundle_id:
+        if st.button("📦 합본 만들기", key=f"{key_prefix}_prepare"):
+            st.session_state[ready_key] = bundle_id
+            st.rerun()
+        return
+    parsed_items = [parsed for _, _, parsed in named_results]
+    bundle = st.session_state.get(f"{key_prefix}_data")
+    if bundle is None or bundle[0] != bundle_id or any(a is not b for a, b in zip(bundle[1], parsed_items)):
+        with st.spinner("합본 만드는 중..."):
+            named_texts = [(name, parsed.plain_text()) for name, _, parsed in named_results]
+            bundle = (bundle_id, parsed_items, texts_zip_bytes(named_texts), combined_text(named_texts).encode("utf-8"))
+        st.session_state[f"{key_prefix}_data"] = bundle
+    zip_col, txt_col = st.columns(2)
+    with zip_col:
+        st.download_button(
+            label="ZIP 파일 (파일별 .txt + 합본)",
+            data=bundle[2],
+            file_name="ocr_results.zip",
+            mime="application/zip",
+            key=f"{key_prefix}_zip_download"
+        )
+    with txt_col:
+        st.download_button(
+            label="TXT 합본 (.txt)",
+            data=bundle[3],
+            file_name="ocr_results.txt",
+            mime="text/plain",
+            key=f"{key_prefix}_txt_download"
+        )
@@ -0,0 +1,132 @@
+# upload_stream.py
+"""업로드 파일을 통째로 읽지 않고 multipart 본문을 스트리밍으로 보내는 도구 (Streamlit 비의존)
+
+requests 의 files= 는 파일 바이트와 multipart 본문 전체를 메모리에 만든 뒤 보내고,
+재시도할 때마다 다시 만든다. 여기서는
+- UploadSource: 되감을 수 있는 스트림을 복사 없이 감싸고, 되감을 수 없는 스트림만
+  SpooledTemporaryFile 에 청크 단위로 복사한다 (spool_threshold 를 넘으면 디스크로).
+- MultipartBody: 필드/파일 머리글 + 파일 스트림 + 끝 경계를 이어 읽는 file-like 객체.
+  길이를 미리 알 수 있으므로 requests 는 Content-Length 를 붙여 청크 단위로 보낸다.
+재시도 때는 같은 UploadSource 로 MultipartBody 를 새로 만들어 파일을 처음부터 다시 읽는다.
+디스크 파일(from_path)은 처음 읽을 때 열고 close() 로 닫는다.
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import uuid
+from io import BytesIO
+
+CHUNK_SIZE = 1024 * 1024
+SPOOL_THRESHOLD = 8 * 1024 * 1024
+
+
+class UploadSource:
+    """업로드할 파일 하나 (이름, MIME, 크기, 되감을 수 있는 바이너리 스트림)"""
+
+    def __init__(self, name, stream, mime=None, size=None, path=None):
+        self.name = name
+        self.mime = mime or "application/octet-stream"
+        self.path = path
+        self._stream = stream
+        if size is None:
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+        self.size = size
+        self._sha256 = None
+
+    @property
+    def stream(self):
+        if self._stream is None:  # from_path: 처음 읽을 때 연다
+            self._stream = open(self.path, "rb")
+        return self._stream
+
+    @classmethod
+    def from_file(cls, fileobj, name=None, mime=None, spool_threshold=SPOOL_THRESHOLD):
+        """seekable 스트림(Streamlit UploadedFile, 열린 파일 등)은 그대로 감싸고, 아니면 임시 파일로 스풀"""
+        name = name or os.path.basename(getattr(fileobj, "name", "") or "") or "document"
+        if getattr(fileobj, "seekable", lambda: False)():
+            return cls(name, fileobj, mime)
+        spool = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+        shutil.copyfileobj(fileobj, spool, CHUNK_SIZE)
+        return cls(name, spool, mime)
+
+    @classmethod
+    def from_bytes(cls, name, data, mime=None):
+        return cls(name, BytesIO(data), mime, len(data))
+
+    @classmethod
+    def from_path(cls, path, name=None, mime=None):
+        """디스크 파일: 크기만 먼저 읽고 파일은 처음 읽을 때 열어서, 파일 수천 개를 넘겨도 핸들은 처리 중인 것만 쓴다"""
+        name = name or os.path.basename(path)
+        return cls(name, None, mime or mimetypes.guess_type(name)[0], os.path.getsize(path), path)
+
+    def close(self):
+        """from_path 로 연 파일을 닫음 (다시 읽으면 또 연다)"""
+        if self.path is not None and self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """처음부터 chunk_size 씩 읽음 (호출할 때마다 되감음)"""
+        self.stream.seek(0)
+        while True:
+            chunk = self.stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    @property
+    def sha256(self):
+        """내용의 SHA-256 (처음 필요할 때 청크 단위로 한 번만 계산)"""
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            for chunk in self.iter_chunks():
+                digest.update(chunk)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+
+def _header_value(value):
+    # HTML5 multipart 규칙: 따옴표/줄바꿈만 퍼센트 인코딩하고 나머지는 UTF-8 그대로
+    return value.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+class MultipartBody:
+    """multipart/form-data 본문을 청크 단위로 읽어 내는 file-like 객체"""
+
+    def __init__(self, fields, file_field, upload, boundary=None):
+        boundary = boundary or uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = []
+        for key, value in (fields or {}).items():
+            head.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{_header_value(key)}"\r\n\r\n{value}\r\n'
+            )
+        head.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{_header_value(file_field)}"; '
+            f'filename="{_header_value(upload.name)}"\r\nContent-Type: {upload.mime}\r\n\r\n'
+        )
+        head = "".join(head).encode("utf-8")
+        tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+        upload.stream.seek(0)
+        self._segments = [BytesIO(head), upload.stream, BytesIO(tail)]
+        self._length = len(head) + upload.size + len(tail)
+        self._current = 0
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b"".join(iter(lambda: self.read(CHUNK_SIZE), b""))
+        while self._current < len(self._segments):
+            chunk = self._segments[self._current].read(size)
+            if chunk:
+                return chunk
+            self._current += 1
+        return b""
+
+    def __iter__(self):
+        return iter(lambda: self.read(CHUNK_SIZE), b"")
@@ -0,0 +1,90 @@
+# upstage_http.py
+"""Upstage API 공용 HTTP 계층 (Streamlit 비의존)
+
+채팅(OpenAI 호환)과 문서 파싱/OCR(document-digitization) 요청이
+keep-alive 커넥션 풀을 공유하도록 세션/클라이언트를 만든다.
+프로세스 전역 캐싱은 app_resources.py 에서 st.cache_resource 로 처리한다.
+"""
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://api.upstage.ai/v1"
+
+
+@dataclass
+class HttpSettings:
+    """커넥션 풀 크기와 타임아웃 설정"""
+    pool_connections: int = 4      # 호스트별 풀 개수
+    pool_maxsize: int = 32         # 풀당 유지할 최대 커넥션 수
+    connect_timeout: float = 10.0
+    read_timeout: float = 300.0    # 대용량 문서 파싱을 고려해 넉넉하게
+    gzip: bool = True
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """secrets 등의 dict에서 알려진 키만 골라 설정 생성"""
+        mapping = dict(mapping or {})
+        known = {k: mapping[k] for k in cls.__dataclass_fields__ if k in mapping}
+        return cls(**known)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """timeout을 지정하지 않은 요청에 기본 타임아웃을 적용하는 어댑터"""
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _default_headers(settings):
+    headers = {"Connection": "keep-alive"}
+    if settings.gzip:
+        headers["Accept-Encoding"] = "gzip, deflate"
+    return headers
+
+
+def create_session(settings=None):
+    """keep-alive 커넥션 풀을 가진 requests 세션 생성"""
+    settings = settings or HttpSettings()
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=settings.pool_connections,
+        pool_maxsize=settings.pool_maxsize,
+        timeout=settings.timeout,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(_default_headers(settings))
+    return session
+
+
+def create_openai_client(api_key, settings=None, base_url=BASE_URL, max_retries=2):
+    """커넥션 풀을 공유하는 OpenAI 호환 Solar 클라이언트 생성
+
+    RequestScheduler가 재시도를 맡는 경우 max_retries=0 으로 중복 재시도를 막는다.
+    openai/httpx 는 import 가 무거워 채팅 클라이언트를 처음 만들 때 로드한다 (문서 페이지는 쓰지 않음).
+    """
+    import httpx
+    from openai import OpenAI
+
+    settings = settings or HttpSettings()
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=settings.pool_maxsize,
+            max_keepalive_connections=settings.pool_maxsize,
+        ),
+        timeout=httpx.Timeout(settings.read_timeout, connect=settings.connect_timeout),
+        headers=_default_headers(settings),
+    )
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=max_retries)